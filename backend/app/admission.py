@@ -0,0 +1,177 @@
+"""Admission control sized to the database pool.
+
+Each worker admits at most DB_POOL_SIZE + DB_MAX_OVERFLOW API requests at
+a time, the number that can hold a pooled connection. Any further requests
+wait in a bounded queue per route class. When a slot frees up, it goes to
+the highest-priority waiter:
+
+* ``write``: POST/PUT/PATCH/DELETE, e.g. approve and reject
+* ``light``: cheap reads (single request, profile, config)
+* ``heavy``: search and the audit/stats reports, which may only use
+  ADMISSION_HEAVY_SHARE of the slots, so a burst of searches can't starve
+  decisions
+
+A request whose class queue is full, or that waits longer than
+ADMISSION_MAX_WAIT_SECONDS, gets 503 with Retry-After straight away instead
+of blocking on pool checkout until DB_POOL_TIMEOUT.
+"""
+
+import asyncio
+from collections import deque
+import logging
+import re
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WRITE = "write"
+LIGHT = "light"
+HEAVY = "heavy"
+# Order in which freed slots are handed to waiters
+PRIORITY = (WRITE, LIGHT, HEAVY)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+HEAVY_ROUTES = (
+    re.compile(r"^/api/requests/?$"),
+    re.compile(r"^/api/audit/"),
+    re.compile(r"^/api/admin/stats"),
+)
+# The event stream releases its connection before streaming
+EXEMPT_PATHS = {"/api/requests/events"}
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Route class of an API request, or None when it isn't limited"""
+    if not path.startswith("/api/") or path in EXEMPT_PATHS or method == "OPTIONS":
+        return None
+    if method in WRITE_METHODS:
+        return WRITE
+    if any(pattern.match(path) for pattern in HEAVY_ROUTES):
+        return HEAVY
+    return LIGHT
+
+
+class AdmissionController:
+    """Per-worker slots with per-class limits and bounded priority queues"""
+
+    def __init__(self, capacity: int, heavy_share: float, queue_size: int, max_wait: float):
+        self.capacity = max(capacity, 1)
+        self.limits = {
+            WRITE: self.capacity,
+            LIGHT: self.capacity,
+            HEAVY: max(1, int(self.capacity * heavy_share)),
+        }
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_use = 0
+        self.active = {name: 0 for name in PRIORITY}
+        self.rejected = {name: 0 for name in PRIORITY}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY}
+
+    def _has_slot(self, name: str) -> bool:
+        return self.in_use < self.capacity and self.active[name] < self.limits[name]
+
+    def _take(self, name: str) -> None:
+        self.in_use += 1
+        self.active[name] += 1
+
+    async def acquire(self, name: str) -> bool:
+        """Take a slot for a request of this class; False when it should be shed"""
+        waiters = self._waiters[name]
+        if not waiters and self._has_slot(name):
+            self._take(name)
+            return True
+        if len(waiters) >= self.queue_size:
+            self.rejected[name] += 1
+            return False
+
+        granted = asyncio.get_running_loop().create_future()
+        waiters.append(granted)
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if granted.done() and not granted.cancelled():
+                self.release(name)
+            else:
+                self._abandon(name, granted)
+            raise
+
+        if granted.done() and not granted.cancelled():
+            return True
+        self._abandon(name, granted)
+        self.rejected[name] += 1
+        return False
+
+    def release(self, name: str) -> None:
+        self.in_use -= 1
+        self.active[name] -= 1
+        for waiting in PRIORITY:
+            waiters = self._waiters[waiting]
+            while waiters and self._has_slot(waiting):
+                granted = waiters.popleft()
+                if not granted.done():
+                    self._take(waiting)
+                    granted.set_result(None)
+
+    def _abandon(self, name: str, granted: asyncio.Future) -> None:
+        granted.cancel()
+        try:
+            self._waiters[name].remove(granted)
+        except ValueError:
+            pass
+
+    def status(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "classes": {
+                name: {
+                    "limit": self.limits[name],
+                    "active": self.active[name],
+                    "queued": len(self._waiters[name]),
+                    "rejected": self.rejected[name],
+                }
+                for name in PRIORITY
+            },
+        }
+
+
+controller = AdmissionController(
+    capacity=settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+    heavy_share=settings.ADMISSION_HEAVY_SHARE,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+)
+
+
+class AdmissionMiddleware:
+    """Sheds API requests with 503 once this worker's pool budget is spent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await controller.acquire(name):
+            await JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+            )(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(name)
@@ -0,0 +1,90 @@
+"""Hot/cold split: move finished requests to ``access_requests_archive``.
+
+Rejected and closed requests whose ``updated_at`` is older than
+ARCHIVE_AFTER_DAYS are copied to the archive and deleted from
+``access_requests`` in batches, so the hot table (and all of its indexes)
+only holds live and recently finished requests. Their audit entries keep
+pointing at them through ``audit_logs.archived_access_request_id``.
+
+Each batch is one transaction claimed with ``FOR UPDATE SKIP LOCKED`` (via
+the partial index on ``updated_at``), so workers split the work.
+"""
+
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import delete, insert, select, update
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on batches per run, so one run can't monopolise a worker thread
+MAX_BATCHES_PER_RUN = 20
+
+TERMINAL_STATUSES = (models.RequestStatus.REJECTED, models.RequestStatus.CLOSED)
+
+
+def archive_batch(db, batch_size: int, older_than: datetime) -> int:
+    """Archive one batch of finished requests; returns how many were moved"""
+    AccessRequest = models.AccessRequest
+    ids = db.execute(
+        select(AccessRequest.id)
+        .where(AccessRequest.status.in_(TERMINAL_STATUSES), AccessRequest.updated_at < older_than)
+        .order_by(AccessRequest.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return 0
+
+    columns = models.ARCHIVED_COLUMNS
+    db.execute(
+        insert(models.ArchivedAccessRequest).from_select(
+            columns,
+            select(*[getattr(AccessRequest, name) for name in columns]).where(AccessRequest.id.in_(ids))
+        )
+    )
+    # Re-point rows that reference the request before it leaves the hot table
+    db.execute(
+        update(models.AuditLog)
+        .where(models.AuditLog.access_request_id.in_(ids))
+        .values(
+            archived_access_request_id=models.AuditLog.access_request_id,
+            access_request_id=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(models.NotificationOutbox)
+        .where(models.NotificationOutbox.access_request_id.in_(ids))
+        .values(access_request_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(AccessRequest)
+        .where(AccessRequest.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return len(ids)
+
+
+def archive_finished() -> int:
+    """Archive finished requests older than ARCHIVE_AFTER_DAYS in bounded batches"""
+    if settings.ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    older_than = datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    total = 0
+    with SessionLocal() as db:
+        for _ in range(MAX_BATCHES_PER_RUN):
+            moved = archive_batch(db, settings.ARCHIVE_BATCH_SIZE, older_than)
+            total += moved
+            if moved < settings.ARCHIVE_BATCH_SIZE:
+                break
+    if total:
+        logger.info(f"Archived {total} finished access requests")
+    return total
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, List, Mapping, Optional
+from datetime import date, datetime
+import enum
 from fastapi import Request
 
 from app import crud, models
@@ -18,7 +20,8 @@ class AuditService:
         request: Optional[Request] = None,
         access_request_id: Optional[int] = None,
         old_value: Optional[str] = None,
-        new_value: Optional[str] = None
+        new_value: Optional[str] = None,
+        changes: Optional[Dict[str, List[Any]]] = None
     ) -> models.AuditLog:
         """Log user action to audit log"""
         ip_address = get_ip_from_request(request) if request else "unknown"
@@ -35,9 +38,20 @@ class AuditService:
             user_agent=user_agent,
             access_request_id=access_request_id,
             old_value=old_value,
-            new_value=new_value
+            new_value=new_value,
+            changes=changes or None
         )
     
+    @staticmethod
+    def diff(obj: Any, updates: Mapping[str, Any]) -> Dict[str, List[Any]]:
+        """Field-level diff of applying ``updates`` to ``obj``: {field: [old, new]} for changed fields only"""
+        changes = {}
+        for field, new in updates.items():
+            old = getattr(obj, field, None)
+            if old != new:
+                changes[field] = [_json_value(old), _json_value(new)]
+        return changes
+    
     @staticmethod
     def log_request_created(
         db: Session,
@@ -64,7 +78,8 @@ class AuditService:
         user_id: int,
         request_id: int,
         request_number: str,
-        http_request: Optional[Request] = None
+        http_request: Optional[Request] = None,
+        changes: Optional[Dict[str, List[Any]]] = None
     ):
         """Log request approval"""
         return AuditService.log_action(
@@ -75,7 +90,8 @@ class AuditService:
             resource_id=request_number,
             details=f"Approved access request",
             request=http_request,
-            access_request_id=request_id
+            access_request_id=request_id,
+            changes=changes
         )
     
     @staticmethod
@@ -85,7 +101,8 @@ class AuditService:
         request_id: int,
         request_number: str,
         reason: str,
-        http_request: Optional[Request] = None
+        http_request: Optional[Request] = None,
+        changes: Optional[Dict[str, List[Any]]] = None
     ):
         """Log request rejection"""
         return AuditService.log_action(
@@ -96,5 +113,14 @@ class AuditService:
             resource_id=request_number,
             details=f"Rejected access request: {reason}",
             request=http_request,
-            access_request_id=request_id
+            access_request_id=request_id,
+            changes=changes
         )
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
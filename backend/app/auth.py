@@ -2,7 +2,9 @@ from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from typing import Optional, Dict
+import httpx
 import logging
+import time
 from app.config import settings
 from datetime import datetime
 
@@ -10,6 +12,59 @@ logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
 
+class JWKSCache:
+    """Realm signing keys, fetched from Keycloak and cached for JWKS_CACHE_SECONDS.
+
+    An unknown kid (e.g. after key rotation) triggers a refresh at most once
+    per miss_interval_seconds, so tokens with made-up kids can't hammer Keycloak.
+    """
+
+    def __init__(self, ttl_seconds: int, miss_interval_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.miss_interval_seconds = miss_interval_seconds
+        self.keys: Dict[str, dict] = {}
+        self.fetched_at: Optional[float] = None
+
+    @property
+    def url(self) -> str:
+        return (
+            f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM}"
+            "/protocol/openid-connect/certs"
+        )
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.ttl_seconds
+
+    def refresh_sync(self) -> None:
+        """Blocking refresh, for warm-up before the event loop exists"""
+        with httpx.Client(timeout=5.0) as client:
+            response = client.get(self.url)
+            response.raise_for_status()
+        self._store(response.json())
+
+    async def refresh(self) -> None:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+        self._store(response.json())
+
+    async def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        if not self.is_fresh:
+            await self.refresh()
+        elif kid not in self.keys and time.monotonic() - self.fetched_at >= self.miss_interval_seconds:
+            await self.refresh()
+        return self.keys.get(kid)
+
+    def _store(self, jwks: dict) -> None:
+        self.keys = {key.get("kid"): key for key in jwks.get("keys", [])}
+        self.fetched_at = time.monotonic()
+        logger.info(f"Loaded {len(self.keys)} signing keys from {self.url}")
+
+
+jwks_cache = JWKSCache(settings.JWKS_CACHE_SECONDS, settings.JWKS_MISS_REFRESH_SECONDS)
+
+
 async def get_current_user(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
@@ -26,9 +81,25 @@ async def get_current_user(
     token = credentials.credentials
     
     try:
-        # For Keycloak, we verify the token signature
-        # In production, you should fetch the public key from Keycloak
-        payload = jwt.get_unverified_claims(token)
+        if settings.VERIFY_TOKEN_SIGNATURE:
+            header = jwt.get_unverified_header(token)
+            try:
+                key = await jwks_cache.get_key(header.get("kid"))
+            except httpx.HTTPError as e:
+                logger.error(f"Failed to fetch JWKS: {e}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication server unavailable",
+                )
+            if key is None:
+                raise JWTError("Unknown signing key")
+            payload = jwt.decode(
+                token, key, algorithms=[key.get("alg", "RS256")],
+                options={"verify_aud": False}
+            )
+        else:
+            # Signature verification is opt-in (VERIFY_TOKEN_SIGNATURE)
+            payload = jwt.get_unverified_claims(token)
         
         username: str = payload.get("preferred_username")
         if username is None:
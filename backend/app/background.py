@@ -0,0 +1,41 @@
+"""Periodic background jobs run inside each worker's lifespan.
+
+Jobs are plain blocking callables executed in a thread, so they can use the
+regular (synchronous) SQLAlchemy sessions. Jobs that must not run on several
+workers at once guard themselves with ``database.locked_session``.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobs:
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, name: str, interval_seconds: float, job: Callable[[], object]) -> None:
+        """Run ``job`` every ``interval_seconds`` until stop()"""
+        self._tasks[name] = asyncio.create_task(self._run(name, interval_seconds, job), name=name)
+        logger.info(f"Started background job {name} (every {interval_seconds}s)")
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self, name: str, interval_seconds: float, job: Callable[[], object]) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background job {name} failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+jobs = BackgroundJobs()
@@ -0,0 +1,175 @@
+"""Traffic capture for production-shaped load tests.
+
+With TRAFFIC_CAPTURE_ENABLED, every API request is appended as one JSON line
+to ``TRAFFIC_CAPTURE_DIR/traffic-<pid>.jsonl`` (one file per worker, rotated
+at TRAFFIC_CAPTURE_MAX_BYTES)::
+
+    {"ts": 1767254400.12, "method": "GET", "route": "/api/requests/",
+     "params": {"query": {"kind": "ip_prefix", "length": 7}, "skip": "50"},
+     "body": null, "status": 200, "duration_ms": 18.4,
+     "request_bytes": 0, "response_bytes": 20514}
+
+Only shapes are kept: path ids become the route template, ``query`` and
+``network`` are reduced to their search kind (``search.classify``) and
+length, ``text`` to its word count, and other values to their length unless
+they are in SAFE_PARAMS. JSON bodies keep their field names, list and string
+lengths, and SAFE_FIELDS. Lines are written by a background thread.
+
+Replay them with ``python -m benchmarks.replay``.
+"""
+
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import os
+from pathlib import Path
+import queue
+import time
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.search import classify
+
+logger = logging.getLogger(__name__)
+
+# Query parameters whose values carry no identifying data
+SAFE_PARAMS = {"skip", "limit", "status", "include_archived", "granularity", "start", "end", "protocol", "field", "resource_type"}
+# Search inputs, recorded as the kind of lookup they ask for
+SEARCH_PARAMS = {"query", "network"}
+ID_PARAMS = {"access_request_id"}
+# Body fields kept verbatim
+SAFE_FIELDS = {"decision", "protocol", "port", "role", "is_active"}
+# Larger bodies are only counted, not parsed
+MAX_BODY_BYTES = 64 * 1024
+
+_listener: Optional[QueueListener] = None
+traffic_log = logging.getLogger("app.capture.traffic")
+
+
+def start_writer() -> None:
+    """Route traffic_log through a queue to this worker's rotating file"""
+    global _listener
+    if _listener is not None:
+        return
+    directory = Path(settings.TRAFFIC_CAPTURE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        directory / f"traffic-{os.getpid()}.jsonl",
+        maxBytes=settings.TRAFFIC_CAPTURE_MAX_BYTES,
+        backupCount=settings.TRAFFIC_CAPTURE_BACKUPS,
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    traffic_log.addHandler(QueueHandler(records))
+    traffic_log.setLevel(logging.INFO)
+    traffic_log.propagate = False
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def route_template(scope) -> str:
+    """Path with its parameters (or bare numeric segments) replaced by placeholders"""
+    names = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    segments = []
+    for segment in scope["path"].split("/"):
+        if segment in names:
+            segment = "{" + names[segment] + "}"
+        elif segment.isdigit():
+            segment = "{id}"
+        segments.append(segment)
+    return "/".join(segments)
+
+
+def param_shape(name: str, value: str):
+    if name in SAFE_PARAMS:
+        return value
+    if name in SEARCH_PARAMS:
+        return {"kind": classify(value).kind.value, "length": len(value)}
+    if name in ID_PARAMS:
+        return {"kind": "id"}
+    if name == "text":
+        return {"words": len(value.split())}
+    return {"length": len(value)}
+
+
+def body_shape(body: bytes):
+    if not body:
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {"bytes": len(body)}
+    if not isinstance(data, dict):
+        return {"bytes": len(body)}
+    shape = {}
+    for key, value in data.items():
+        if key in SAFE_FIELDS:
+            shape[key] = value
+        elif isinstance(value, (list, str)):
+            shape[key] = {"length": len(value)}
+        else:
+            shape[key] = {"type": type(value).__name__}
+    return shape
+
+
+class TrafficCaptureMiddleware:
+    """Records the anonymised shape, timing and size of each API request"""
+
+    def __init__(self, app):
+        self.app = app
+        start_writer()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        started = time.perf_counter()
+        body = bytearray()
+        request_bytes = 0
+        status_code = None
+        response_bytes = 0
+
+        async def capture_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                request_bytes += len(chunk)
+                if request_bytes <= MAX_BODY_BYTES:
+                    body.extend(chunk)
+            return message
+
+        async def capture_send(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            try:
+                query_string = scope.get("query_string", b"").decode("latin-1")
+                traffic_log.info(json.dumps({
+                    "ts": round(started_at, 3),
+                    "method": scope["method"],
+                    "route": route_template(scope),
+                    "params": {
+                        name: param_shape(name, value)
+                        for name, value in parse_qsl(query_string, keep_blank_values=True)
+                    },
+                    "body": body_shape(bytes(body)) if request_bytes <= MAX_BODY_BYTES else {"bytes": request_bytes},
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "request_bytes": request_bytes,
+                    "response_bytes": response_bytes,
+                }, separators=(",", ":")))
+            except Exception as e:
+                logger.warning(f"Could not record request shape: {e}")
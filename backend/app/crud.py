@@ -1,14 +1,59 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from datetime import datetime
-from typing import Optional, List
+from sqlalchemy.orm import Session, aliased, load_only, selectinload, joinedload, undefer_group
+from sqlalchemy import and_, or_, select, func, update, insert, cast, literal, union_all, Float
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import CIDR
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, List, Tuple
 import logging
 
-from app import models, schemas
-from app.utils import generate_request_number
+from app import events, models, notifications, schemas, search as search_planner
+from app.database import pipeline
+from app.numbering import request_numbers
 
 logger = logging.getLogger(__name__)
 
+# Column loading profiles for AccessRequest ORM queries. List pages are served
+# by search_rows, which selects only the list columns as Core rows; the ORM
+# list queries left (claim_next, search) use the list profile so the deferred
+# text group is never fetched for them. The detail profile pulls it (and both
+# users) in the same round-trip.
+REQUEST_LIST_PROFILE = (
+    load_only(
+        models.AccessRequest.id,
+        models.AccessRequest.request_number,
+        models.AccessRequest.user_id,
+        models.AccessRequest.approver_id,
+        models.AccessRequest.source_ip,
+        models.AccessRequest.destination_ip,
+        models.AccessRequest.destination_hostname,
+        models.AccessRequest.port,
+        models.AccessRequest.protocol,
+        models.AccessRequest.status,
+        models.AccessRequest.created_at,
+        models.AccessRequest.updated_at,
+    ),
+    selectinload(models.AccessRequest.user),
+    selectinload(models.AccessRequest.approver),
+)
+REQUEST_DETAIL_PROFILE = (
+    undefer_group(models.REQUEST_TEXT_GROUP),
+    joinedload(models.AccessRequest.user),
+    joinedload(models.AccessRequest.approver),
+)
+
+
+def upsert_insert(db: Session, table):
+    """INSERT construct supporting ON CONFLICT for the session's dialect"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 
 class UserCRUD:
     @staticmethod
@@ -60,13 +105,120 @@ class UserCRUD:
             db.commit()
             db.refresh(user)
         return user
+    
+    @staticmethod
+    def upsert_many(db: Session, users: List[dict]) -> int:
+        """Insert or update users by keycloak_id in one statement (caller commits).
+
+        A user recreated in Keycloak under an existing username takes over that
+        row (re-keyed, so its requests stay attached). Rows whose username or
+        email still belongs to another user are skipped and logged.
+        """
+        users = UserCRUD._resolve_conflicts(db, users)
+        if not users:
+            return 0
+        stmt = upsert_insert(db, models.User).values(users)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.User.keycloak_id],
+            set_={
+                "username": stmt.excluded.username,
+                "email": stmt.excluded.email,
+                "first_name": stmt.excluded.first_name,
+                "last_name": stmt.excluded.last_name,
+                "role": stmt.excluded.role,
+                "is_active": stmt.excluded.is_active,
+                "updated_at": func.now(),
+            }
+        )
+        db.execute(stmt)
+        return len(users)
+
+    @staticmethod
+    def _resolve_conflicts(db: Session, users: List[dict]) -> List[dict]:
+        """Re-key rows taken over by a recreated user; drop rows that would violate a unique key"""
+        if not users:
+            return []
+        keycloak_ids = {user["keycloak_id"] for user in users}
+        usernames = {user["username"] for user in users if user.get("username")}
+        emails = {user["email"] for user in users if user.get("email")}
+        existing = db.query(
+            models.User.id, models.User.keycloak_id, models.User.username, models.User.email
+        ).filter(or_(
+            models.User.keycloak_id.in_(keycloak_ids),
+            models.User.username.in_(usernames),
+            models.User.email.in_(emails),
+        )).all()
+        by_keycloak_id = {row.keycloak_id: row.id for row in existing}
+        by_username = {row.username: row for row in existing if row.username}
+        by_email = {row.email: row.id for row in existing if row.email}
+
+        resolved = []
+        seen_usernames, seen_emails = set(), set()
+        for user in users:
+            username, email = user.get("username"), user.get("email")
+            if (username and username in seen_usernames) or (email and email in seen_emails):
+                logger.warning(f"Skipping Keycloak user {user['keycloak_id']}: duplicate username or email in batch")
+                continue
+
+            user_id = by_keycloak_id.get(user["keycloak_id"])
+            owner = by_username.get(username)
+            if owner is not None and owner.id != user_id:
+                if user_id is not None or owner.keycloak_id in keycloak_ids:
+                    logger.warning(
+                        f"Skipping Keycloak user {user['keycloak_id']}: username {username} belongs to user {owner.id}"
+                    )
+                    continue
+                db.query(models.User).filter(models.User.id == owner.id).update(
+                    {models.User.keycloak_id: user["keycloak_id"]}, synchronize_session=False
+                )
+                logger.info(f"Re-keyed user {owner.id} ({username}) from {owner.keycloak_id} to {user['keycloak_id']}")
+                user_id = owner.id
+
+            if email and by_email.get(email, user_id) != user_id:
+                logger.warning(
+                    f"Skipping Keycloak user {user['keycloak_id']}: email {email} belongs to user {by_email[email]}"
+                )
+                continue
+
+            if username:
+                seen_usernames.add(username)
+            if email:
+                seen_emails.add(email)
+            resolved.append(user)
+        return resolved
+
+    @staticmethod
+    def deactivate_missing(db: Session, keycloak_ids: Iterable[str]) -> int:
+        """Mark active users whose keycloak_id is not in keycloak_ids inactive (caller commits)"""
+        return db.query(models.User).filter(
+            models.User.is_active == True,
+            models.User.keycloak_id.isnot(None),
+            models.User.keycloak_id.notin_(list(keycloak_ids)),
+        ).update({models.User.is_active: False}, synchronize_session=False)
+
+
+class ConfigurationCRUD:
+    @staticmethod
+    def get_value(db: Session, key: str) -> Optional[str]:
+        return db.query(models.Configuration.value).filter(
+            models.Configuration.key == key
+        ).scalar()
+    
+    @staticmethod
+    def set_value(db: Session, key: str, value: str, description: Optional[str] = None) -> None:
+        """Insert or update a configuration value (caller commits)"""
+        stmt = upsert_insert(db, models.Configuration).values(key=key, value=value, description=description)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.Configuration.key],
+            set_={"value": stmt.excluded.value, "updated_at": func.now()}
+        ))
 
 
 class AccessRequestCRUD:
     @staticmethod
     def create(db: Session, user_id: int, request_data: schemas.AccessRequestCreate) -> models.AccessRequest:
         """Create new access request"""
-        request_number = generate_request_number()
+        request_number = request_numbers.allocate(db)
         
         access_request = models.AccessRequest(
             request_number=request_number,
@@ -81,45 +233,46 @@ class AccessRequestCRUD:
             status=models.RequestStatus.CREATED
         )
         db.add(access_request)
+        db.flush()
+        notifications.enqueue(db, "created", [access_request])
+        with pipeline(db):
+            events.publish(db, "created", [access_request])
+            RequestActivityRollupCRUD.bump(db, [
+                RequestActivityRollupCRUD.created(datetime.utcnow(), access_request.protocol)
+            ])
         db.commit()
         db.refresh(access_request)
         logger.info(f"Created access request: {access_request.request_number}")
         return access_request
     
     @staticmethod
-    def get_by_id(db: Session, request_id: int) -> Optional[models.AccessRequest]:
-        return db.query(models.AccessRequest).filter(
+    def get_by_id(db: Session, request_id: int, include_archived: bool = False) -> Optional[models.AccessRequest]:
+        request = db.query(models.AccessRequest).options(*REQUEST_DETAIL_PROFILE).filter(
             models.AccessRequest.id == request_id
         ).first()
+        if request is None and include_archived:
+            return AccessRequestCRUD._get_archived(db, models.ArchivedAccessRequest.id == request_id)
+        return request
     
     @staticmethod
-    def get_by_number(db: Session, request_number: str) -> Optional[models.AccessRequest]:
-        return db.query(models.AccessRequest).filter(
+    def get_by_number(db: Session, request_number: str, include_archived: bool = False) -> Optional[models.AccessRequest]:
+        request = db.query(models.AccessRequest).options(*REQUEST_DETAIL_PROFILE).filter(
             models.AccessRequest.request_number == request_number
         ).first()
+        if request is None and include_archived:
+            return AccessRequestCRUD._get_archived(db, models.ArchivedAccessRequest.request_number == request_number)
+        return request
     
     @staticmethod
-    def get_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[models.AccessRequest]:
-        return db.query(models.AccessRequest).filter(
-            models.AccessRequest.user_id == user_id
-        ).order_by(models.AccessRequest.created_at.desc()).offset(skip).limit(limit).all()
-    
-    @staticmethod
-    def get_pending(db: Session, skip: int = 0, limit: int = 100) -> List[models.AccessRequest]:
-        """Get all pending requests for approval"""
-        return db.query(models.AccessRequest).filter(
-            models.AccessRequest.status == models.RequestStatus.PENDING_APPROVAL
-        ).order_by(models.AccessRequest.created_at.asc()).offset(skip).limit(limit).all()
-    
-    @staticmethod
-    def get_all(db: Session, skip: int = 0, limit: int = 100) -> List[models.AccessRequest]:
-        return db.query(models.AccessRequest).order_by(
-            models.AccessRequest.created_at.desc()
-        ).offset(skip).limit(limit).all()
+    def _get_archived(db: Session, criterion) -> Optional[models.ArchivedAccessRequest]:
+        return db.query(models.ArchivedAccessRequest).options(
+            joinedload(models.ArchivedAccessRequest.user),
+            joinedload(models.ArchivedAccessRequest.approver)
+        ).filter(criterion).first()
     
     @staticmethod
     def update(db: Session, request_id: int, request_update: schemas.AccessRequestUpdate) -> Optional[models.AccessRequest]:
-        request = db.query(models.AccessRequest).filter(
+        request = db.query(models.AccessRequest).options(*REQUEST_DETAIL_PROFILE).filter(
             models.AccessRequest.id == request_id
         ).first()
         
@@ -134,9 +287,15 @@ class AccessRequestCRUD:
         return request
     
     @staticmethod
-    def approve(db: Session, request_id: int, approver_id: int, comment: Optional[str] = None) -> Optional[models.AccessRequest]:
+    def approve(
+        db: Session,
+        request_id: int,
+        approver_id: int,
+        comment: Optional[str] = None,
+        expires_at: Optional[datetime] = None
+    ) -> Optional[models.AccessRequest]:
         """Approve access request"""
-        request = db.query(models.AccessRequest).filter(
+        request = db.query(models.AccessRequest).options(*REQUEST_DETAIL_PROFILE).filter(
             models.AccessRequest.id == request_id
         ).first()
         
@@ -145,6 +304,15 @@ class AccessRequestCRUD:
             request.approver_id = approver_id
             request.approval_comment = comment
             request.approved_at = datetime.utcnow()
+            request.expires_at = expires_at
+            request.claimed_by_id = None
+            request.claim_expires_at = None
+            notifications.enqueue(db, "approved", [request], comment)
+            with pipeline(db):
+                events.publish(db, "approved", [request])
+                RequestActivityRollupCRUD.bump(db, [RequestActivityRollupCRUD.decided(
+                    request.status, request.protocol, request.created_at, request.approved_at
+                )])
             db.commit()
             db.refresh(request)
             logger.info(f"Approved access request: {request.request_number}")
@@ -154,7 +322,7 @@ class AccessRequestCRUD:
     @staticmethod
     def reject(db: Session, request_id: int, approver_id: int, reason: str) -> Optional[models.AccessRequest]:
         """Reject access request"""
-        request = db.query(models.AccessRequest).filter(
+        request = db.query(models.AccessRequest).options(*REQUEST_DETAIL_PROFILE).filter(
             models.AccessRequest.id == request_id
         ).first()
         
@@ -163,43 +331,517 @@ class AccessRequestCRUD:
             request.approver_id = approver_id
             request.rejection_reason = reason
             request.rejected_at = datetime.utcnow()
+            request.claimed_by_id = None
+            request.claim_expires_at = None
+            notifications.enqueue(db, "rejected", [request], reason)
+            with pipeline(db):
+                events.publish(db, "rejected", [request])
+                RequestActivityRollupCRUD.bump(db, [RequestActivityRollupCRUD.decided(
+                    request.status, request.protocol, request.created_at, request.rejected_at
+                )])
             db.commit()
             db.refresh(request)
             logger.info(f"Rejected access request: {request.request_number}")
         
         return request
     
+    @staticmethod
+    def bulk_decide(
+        db: Session,
+        request_ids: List[int],
+        approver_id: int,
+        decision: schemas.BulkDecision,
+        comment: Optional[str],
+        ip_address: str,
+        user_agent: str,
+        expires_at: Optional[datetime] = None
+    ) -> List[dict]:
+        """Approve or reject many requests with one conditional UPDATE.
+
+        Only requests still in CREATED status (and not leased to another
+        approver) are decided. Audit rows go in as one multi-row INSERT and
+        everything commits together. Returns one outcome dict per ID.
+        """
+        request_ids = list(dict.fromkeys(request_ids))
+        now = datetime.utcnow()
+        
+        if decision == schemas.BulkDecision.APPROVE:
+            values = {
+                "status": models.RequestStatus.APPROVED,
+                "approval_comment": comment,
+                "approved_at": now,
+                "expires_at": expires_at,
+            }
+            action, outcome = "approved", "approved"
+        else:
+            values = {
+                "status": models.RequestStatus.REJECTED,
+                "rejection_reason": comment,
+                "rejected_at": now,
+            }
+            action, outcome = "rejected", "rejected"
+        values.update(approver_id=approver_id, claimed_by_id=None, claim_expires_at=None)
+        
+        decided = db.execute(
+            update(models.AccessRequest)
+            .where(
+                models.AccessRequest.id.in_(request_ids),
+                models.AccessRequest.status == models.RequestStatus.CREATED,
+                or_(
+                    models.AccessRequest.claimed_by_id.is_(None),
+                    models.AccessRequest.claimed_by_id == approver_id,
+                    models.AccessRequest.claim_expires_at < now,
+                )
+            )
+            .values(**values)
+            .returning(
+                models.AccessRequest.id,
+                models.AccessRequest.request_number,
+                models.AccessRequest.user_id,
+                models.AccessRequest.status,
+                models.AccessRequest.protocol,
+                models.AccessRequest.created_at,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        if decided:
+            details = f"{action.capitalize()} access request (bulk)"
+            if decision == schemas.BulkDecision.REJECT:
+                details = f"Rejected access request (bulk): {comment}"
+            # Only CREATED rows matched the UPDATE, so the old values are known
+            changes = {
+                "status": [models.RequestStatus.CREATED.value, values["status"].value],
+                "approver_id": [None, approver_id],
+            }
+            # Read first: its result is needed, which would break the pipeline below
+            notifications.enqueue(db, action, decided, comment)
+            with pipeline(db):
+                AuditLogCRUD.create_many(db, [
+                    {
+                        "user_id": approver_id,
+                        "access_request_id": row.id,
+                        "action": action,
+                        "resource_type": "access_request",
+                        "resource_id": row.request_number,
+                        "details": details,
+                        "changes": changes,
+                        "ip_address": ip_address,
+                        "user_agent": user_agent,
+                    }
+                    for row in decided
+                ])
+                events.publish(db, action, decided)
+                RequestActivityRollupCRUD.bump(db, [
+                    RequestActivityRollupCRUD.decided(row.status, row.protocol, row.created_at, now)
+                    for row in decided
+                ])
+        db.commit()
+        
+        results = {
+            row.id: {"request_id": row.id, "outcome": outcome, "request_number": row.request_number}
+            for row in decided
+        }
+        
+        # Explain why the rest were left alone
+        missing = [request_id for request_id in request_ids if request_id not in results]
+        if missing:
+            remaining = db.execute(
+                select(
+                    models.AccessRequest.id,
+                    models.AccessRequest.request_number,
+                    models.AccessRequest.status,
+                ).where(models.AccessRequest.id.in_(missing))
+            ).all()
+            for row in remaining:
+                if row.status != models.RequestStatus.CREATED:
+                    detail = f"Request is in {row.status.value} status"
+                else:
+                    detail = "Request is claimed by another approver"
+                results[row.id] = {
+                    "request_id": row.id,
+                    "outcome": "skipped",
+                    "request_number": row.request_number,
+                    "detail": detail,
+                }
+        
+        logger.info(f"Bulk {action} {len(decided)} of {len(request_ids)} access requests")
+        return [
+            results.get(request_id, {"request_id": request_id, "outcome": "not_found", "detail": "Request not found"})
+            for request_id in request_ids
+        ]
+    
+    @staticmethod
+    def claim_next(db: Session, approver_id: int, limit: int, lease_seconds: int) -> tuple[List[models.AccessRequest], datetime]:
+        """Lease the next open requests to an approver.
+
+        Rows locked by a concurrent claim are skipped rather than waited on, so
+        approvers never receive the same request. Expired leases and leases
+        already held by this approver are handed out again.
+        """
+        now = datetime.utcnow()
+        lease_expires_at = now + timedelta(seconds=lease_seconds)
+        
+        ids = db.query(models.AccessRequest.id).filter(
+            models.AccessRequest.status.in_([
+                models.RequestStatus.CREATED,
+                models.RequestStatus.PENDING_APPROVAL,
+            ]),
+            or_(
+                models.AccessRequest.claimed_by_id.is_(None),
+                models.AccessRequest.claimed_by_id == approver_id,
+                models.AccessRequest.claim_expires_at < now,
+            )
+        ).order_by(
+            models.AccessRequest.created_at.asc()
+        ).limit(limit).with_for_update(skip_locked=True).all()
+        ids = [row.id for row in ids]
+        
+        if ids:
+            db.query(models.AccessRequest).filter(
+                models.AccessRequest.id.in_(ids)
+            ).update({
+                models.AccessRequest.claimed_by_id: approver_id,
+                models.AccessRequest.claim_expires_at: lease_expires_at,
+            }, synchronize_session=False)
+        db.commit()
+        
+        requests = db.query(models.AccessRequest).options(*REQUEST_LIST_PROFILE).filter(
+            models.AccessRequest.id.in_(ids)
+        ).order_by(models.AccessRequest.created_at.asc()).all() if ids else []
+        logger.info(f"Approver {approver_id} claimed {len(requests)} access requests")
+        return requests, lease_expires_at
+    
+    @staticmethod
+    def release(db: Session, request_id: int, approver_id: int) -> bool:
+        """Give up an approver's lease on a request"""
+        released = db.query(models.AccessRequest).filter(
+            models.AccessRequest.id == request_id,
+            models.AccessRequest.claimed_by_id == approver_id
+        ).update({
+            models.AccessRequest.claimed_by_id: None,
+            models.AccessRequest.claim_expires_at: None,
+        }, synchronize_session=False)
+        db.commit()
+        return released > 0
+    
+    @staticmethod
+    def is_claimed_by_other(request: models.AccessRequest, approver_id: int) -> bool:
+        """Whether another approver holds an unexpired lease on the request"""
+        if request.claimed_by_id is None or request.claimed_by_id == approver_id:
+            return False
+        expires_at = request.claim_expires_at
+        if expires_at is None:
+            return False
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at > datetime.now(timezone.utc)
+    
+    @staticmethod
+    def query_filter(db: Session, query: str, entity=models.AccessRequest):
+        """Filter for a search query, routed to an index-friendly lookup where possible"""
+        plan = search_planner.classify(query)
+        logger.debug(f"Search query planned as {plan.kind.value}")
+        return search_planner.build_filter(plan, db.get_bind().dialect.name, entity)
+    
+    @staticmethod
+    def _search_filters(
+        db: Session,
+        entity,
+        query: Optional[str],
+        status: Optional[models.RequestStatus],
+        text_query: Optional[str]
+    ) -> tuple[list, Optional[object]]:
+        """WHERE clauses for a search over ``entity``, and the ts_rank expression when ranking"""
+        filters = []
+        if query:
+            filters.append(AccessRequestCRUD.query_filter(db, query, entity))
+        if status:
+            filters.append(entity.status == status)
+        rank = None
+        if text_query:
+            text_filter, rank = search_planner.text_search(text_query, db.get_bind().dialect.name, entity)
+            filters.append(text_filter)
+        return filters, rank
+    
     @staticmethod
     def search(
         db: Session,
         query: Optional[str] = None,
         status: Optional[models.RequestStatus] = None,
         skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        text_query: Optional[str] = None
     ) -> tuple[List[models.AccessRequest], int]:
-        """Search access requests"""
-        q = db.query(models.AccessRequest)
-        
-        if query:
-            # Search by request number, username, or IP
-            q = q.filter(or_(
-                models.AccessRequest.request_number.ilike(f"%{query}%"),
-                models.AccessRequest.source_ip.ilike(f"%{query}%"),
-                models.AccessRequest.destination_ip.ilike(f"%{query}%")
-            ))
-        
-        if status:
-            q = q.filter(models.AccessRequest.status == status)
+        """Search access requests as ORM objects (hot table only); the API uses search_rows"""
+        filters, rank = AccessRequestCRUD._search_filters(db, models.AccessRequest, query, status, text_query)
+        q = db.query(models.AccessRequest).filter(*filters)
         
         total = q.count()
-        requests = q.order_by(
-            models.AccessRequest.created_at.desc()
+        requests = q.options(*REQUEST_LIST_PROFILE).order_by(
+            *AccessRequestCRUD._search_order(rank)
         ).offset(skip).limit(limit).all()
         
         return requests, total
+    
+    @staticmethod
+    def _search_order(rank=None, created_at=models.AccessRequest.created_at) -> list:
+        """Best full-text matches first when ranking, newest first otherwise"""
+        newest = created_at.desc()
+        return [rank.desc(), newest] if rank is not None else [newest]
+    
+    @staticmethod
+    def search_rows(
+        db: Session,
+        query: Optional[str] = None,
+        status: Optional[models.RequestStatus] = None,
+        skip: int = 0,
+        limit: int = 50,
+        text_query: Optional[str] = None,
+        include_archived: bool = False
+    ) -> tuple[List[dict], int]:
+        """Search access requests as plain rows shaped like schemas.AccessRequestList.
+
+        Selects only the listed columns (plus requester and approver) as Core
+        rows, so no ORM objects are hydrated for list pages. Only the hot table
+        is searched unless ``include_archived``, which unions in the archive.
+        """
+        if include_archived:
+            source = AccessRequestCRUD._union_with_archive(db, query, status, text_query)
+            column = lambda name: source.c[name]
+            filters = []
+            rank = source.c.search_rank if text_query else None
+        else:
+            source = models.AccessRequest
+            column = lambda name: getattr(models.AccessRequest, name)
+            filters, rank = AccessRequestCRUD._search_filters(db, source, query, status, text_query)
+        
+        total = db.execute(
+            select(func.count()).select_from(source).where(*filters)
+        ).scalar_one()
+        
+        requester = aliased(models.User)
+        approver = aliased(models.User)
+        stmt = (
+            select(
+                *[column(name) for name in _LIST_COLUMNS],
+                *[getattr(requester, name).label(f"user__{name}") for name in _USER_COLUMNS],
+                *[getattr(approver, name).label(f"approver__{name}") for name in _USER_COLUMNS],
+            )
+            .select_from(source)
+            .join(requester, column("user_id") == requester.id)
+            .outerjoin(approver, column("approver_id") == approver.id)
+            .where(*filters)
+            .order_by(*AccessRequestCRUD._search_order(rank, column("created_at")))
+            .offset(skip)
+            .limit(limit)
+        )
+        rows = [_nest_list_row(row) for row in db.execute(stmt).mappings()]
+        
+        return rows, total
+    
+    @staticmethod
+    def _union_with_archive(
+        db: Session,
+        query: Optional[str],
+        status: Optional[models.RequestStatus],
+        text_query: Optional[str]
+    ):
+        """Matching list rows from access_requests UNION ALL access_requests_archive"""
+        parts = []
+        for entity in (models.AccessRequest, models.ArchivedAccessRequest):
+            filters, rank = AccessRequestCRUD._search_filters(db, entity, query, status, text_query)
+            columns = [getattr(entity, name) for name in (*_LIST_COLUMNS, "user_id", "approver_id")]
+            if text_query:
+                # The archive has no search_vector; its matches rank after ranked hot rows
+                columns.append((rank if rank is not None else literal(0.0, Float)).label("search_rank"))
+            parts.append(select(*columns).where(*filters))
+        return union_all(*parts).subquery("requests")
+    
+    @staticmethod
+    def count_by_status(db: Session) -> Dict[models.RequestStatus, int]:
+        """Requests per status, hot table and archive together"""
+        counts: Dict[models.RequestStatus, int] = {}
+        for entity in (models.AccessRequest, models.ArchivedAccessRequest):
+            for status, count in db.execute(select(entity.status, func.count()).group_by(entity.status)):
+                counts[status] = counts.get(status, 0) + count
+        return counts
+
+
+_LIST_COLUMNS = (
+    "id", "request_number", "source_ip", "destination_ip", "destination_hostname",
+    "port", "protocol", "status", "created_at", "updated_at",
+)
+_USER_COLUMNS = (
+    "id", "keycloak_id", "username", "email", "first_name", "last_name",
+    "role", "is_active", "created_at", "updated_at",
+)
+
+
+def _nest_list_row(row) -> dict:
+    """Fold flat ``user__*``/``approver__*`` labels into nested user dicts"""
+    item = {name: row[name] for name in _LIST_COLUMNS}
+    item["user"] = {name: row[f"user__{name}"] for name in _USER_COLUMNS}
+    if row["approver__id"] is None:
+        item["approver"] = None
+    else:
+        item["approver"] = {name: row[f"approver__{name}"] for name in _USER_COLUMNS}
+    return item
+
+
+class RequestActivityRollupCRUD:
+    COUNTERS = ("created_count", "approved_count", "rejected_count", "approval_latency_seconds")
+    
+    @staticmethod
+    def created(created_at: datetime, protocol: models.Protocol) -> dict:
+        """Rollup increment for a new request"""
+        return {"bucket_date": _utc_naive(created_at).date(), "protocol": protocol, "created_count": 1}
+    
+    @staticmethod
+    def decided(
+        status: models.RequestStatus,
+        protocol: models.Protocol,
+        created_at: datetime,
+        decided_at: datetime
+    ) -> dict:
+        """Rollup increment for an approval or rejection"""
+        decided_at = _utc_naive(decided_at)
+        delta = {"bucket_date": decided_at.date(), "protocol": protocol}
+        if status == models.RequestStatus.APPROVED:
+            delta["approved_count"] = 1
+            delta["approval_latency_seconds"] = (decided_at - _utc_naive(created_at)).total_seconds()
+        else:
+            delta["rejected_count"] = 1
+        return delta
+    
+    @staticmethod
+    def bump(db: Session, deltas: Iterable[dict]) -> None:
+        """Add increments to their buckets with one upsert (caller commits, in the same transaction as the change)"""
+        merged: Dict[Tuple[date, models.Protocol], dict] = {}
+        for delta in deltas:
+            key = (delta["bucket_date"], delta["protocol"])
+            bucket = merged.setdefault(key, {
+                "bucket_date": key[0], "protocol": key[1],
+                **dict.fromkeys(RequestActivityRollupCRUD.COUNTERS, 0)
+            })
+            for counter in RequestActivityRollupCRUD.COUNTERS:
+                bucket[counter] += delta.get(counter, 0)
+        if not merged:
+            return
+        
+        table = models.RequestActivityRollup
+        # Fixed key order, so concurrent bulk decisions lock bucket rows in the same order
+        rows = [merged[key] for key in sorted(merged, key=lambda k: (k[0], k[1].value))]
+        stmt = upsert_insert(db, table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.bucket_date, table.protocol],
+            set_={
+                counter: getattr(table, counter) + getattr(stmt.excluded, counter)
+                for counter in RequestActivityRollupCRUD.COUNTERS
+            }
+        )
+        db.execute(stmt)
+    
+    @staticmethod
+    def get_range(
+        db: Session,
+        start: date,
+        end: date,
+        protocol: Optional[models.Protocol] = None
+    ) -> List[models.RequestActivityRollup]:
+        q = db.query(models.RequestActivityRollup).filter(
+            models.RequestActivityRollup.bucket_date >= start,
+            models.RequestActivityRollup.bucket_date <= end
+        )
+        if protocol:
+            q = q.filter(models.RequestActivityRollup.protocol == protocol)
+        return q.order_by(models.RequestActivityRollup.bucket_date).all()
+
+
+class IdempotencyKeyCRUD:
+    @staticmethod
+    def get(db: Session, key_hash: str) -> Optional[models.IdempotencyKey]:
+        """Unexpired entry for a key (primary key lookup)"""
+        return db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key_hash == key_hash,
+            models.IdempotencyKey.expires_at > datetime.utcnow()
+        ).first()
+    
+    @staticmethod
+    def claim(db: Session, key_hash: str, request_hash: str, lock_seconds: int) -> bool:
+        """Reserve a key for a request about to run; False if another request holds it"""
+        now = datetime.utcnow()
+        table = models.IdempotencyKey
+        stmt = upsert_insert(db, table).values(
+            key_hash=key_hash,
+            request_hash=request_hash,
+            expires_at=now + timedelta(seconds=lock_seconds)
+        )
+        # An expired entry (finished long ago, or left behind by a crashed worker) is taken over
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.key_hash],
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "status_code": None,
+                "content_type": None,
+                "body": None,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=table.expires_at <= now
+        ).returning(table.key_hash)
+        claimed = db.execute(stmt).first() is not None
+        db.commit()
+        return claimed
+    
+    @staticmethod
+    def complete(
+        db: Session,
+        key_hash: str,
+        status_code: int,
+        content_type: Optional[str],
+        body: bytes,
+        ttl_seconds: int
+    ) -> None:
+        """Store the response to replay for the key"""
+        db.execute(
+            update(models.IdempotencyKey)
+            .where(models.IdempotencyKey.key_hash == key_hash)
+            .values(
+                status_code=status_code,
+                content_type=content_type,
+                body=body,
+                expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds)
+            )
+        )
+        db.commit()
+    
+    @staticmethod
+    def release(db: Session, key_hash: str) -> None:
+        """Forget a key whose request failed, so a retry runs again"""
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key_hash == key_hash
+        ).delete(synchronize_session=False)
+        db.commit()
+    
+    @staticmethod
+    def purge_expired(db: Session, batch_size: int) -> int:
+        """Delete one batch of expired keys; returns how many were deleted"""
+        expired = (
+            select(models.IdempotencyKey.key_hash)
+            .where(models.IdempotencyKey.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+        )
+        deleted = db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key_hash.in_(expired)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
 
 
 class AuditLogCRUD:
+    # Diff fields whose values are addresses, so they can be filtered by network
+    NETWORK_FIELDS = {"source_ip", "destination_ip"}
+
     @staticmethod
     def create(
         db: Session,
@@ -212,7 +854,8 @@ class AuditLogCRUD:
         user_agent: str,
         access_request_id: Optional[int] = None,
         old_value: Optional[str] = None,
-        new_value: Optional[str] = None
+        new_value: Optional[str] = None,
+        changes: Optional[dict] = None
     ) -> models.AuditLog:
         """Create audit log entry"""
         audit_log = models.AuditLog(
@@ -223,6 +866,7 @@ class AuditLogCRUD:
             resource_id=resource_id,
             old_value=old_value,
             new_value=new_value,
+            changes=changes,
             details=details,
             ip_address=ip_address,
             user_agent=user_agent
@@ -231,6 +875,48 @@ class AuditLogCRUD:
         db.commit()
         return audit_log
     
+    @staticmethod
+    def create_many(db: Session, entries: List[dict]) -> None:
+        """Insert audit log entries in one multi-row INSERT (caller commits)"""
+        if entries:
+            db.execute(insert(models.AuditLog), entries)
+    
+    @staticmethod
+    def search_changes(
+        db: Session,
+        field: str,
+        access_request_id: Optional[int] = None,
+        resource_type: Optional[str] = None,
+        value_in_network: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[models.AuditLog]:
+        """Audit entries whose diff touches ``field``, optionally with an old or new value in a CIDR"""
+        q = db.query(models.AuditLog)
+        if db.get_bind().dialect.name == "postgresql":
+            # jsonb ? 'field', served by the GIN index
+            q = q.filter(models.AuditLog.changes.has_key(field))
+            if value_in_network:
+                if field not in AuditLogCRUD.NETWORK_FIELDS:
+                    raise ValueError(f"network filter only applies to {sorted(AuditLogCRUD.NETWORK_FIELDS)}")
+                # safe_inet: a malformed old value yields NULL instead of failing the query
+                network = cast(value_in_network, CIDR)
+                q = q.filter(or_(
+                    func.safe_inet(models.AuditLog.changes[field][0].astext).op("<<=")(network),
+                    func.safe_inet(models.AuditLog.changes[field][1].astext).op("<<=")(network)
+                ))
+        else:
+            # Development databases: no GIN index or inet, network filter is ignored
+            q = q.filter(models.AuditLog.changes[field].isnot(None))
+        if access_request_id is not None:
+            q = q.filter(or_(
+                models.AuditLog.access_request_id == access_request_id,
+                models.AuditLog.archived_access_request_id == access_request_id
+            ))
+        if resource_type:
+            q = q.filter(models.AuditLog.resource_type == resource_type)
+        return q.order_by(models.AuditLog.created_at.desc()).offset(skip).limit(limit).all()
+    
     @staticmethod
     def get_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[models.AuditLog]:
         return db.query(models.AuditLog).filter(
@@ -1,31 +1,302 @@
-from sqlalchemy import create_engine, event
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event, exc, func, select
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from functools import lru_cache
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Generator, Iterator, List, Optional, Tuple
+import asyncio
+import functools
+import itertools
 import logging
+import threading
+import time
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.SQLALCHEMY_ECHO,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    connect_args={
-        "connect_timeout": 10,
+Base = declarative_base()
+
+# Cookie set on successful writes; while it is in the future the client reads from the primary
+PRIMARY_PIN_COOKIE = "nap_primary_until"
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+# Request sessions keep loaded state on commit, so responses serialize without reloading rows
+_request_session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
+# LazySessions of the current request, released as soon as its endpoint returns
+_request_sessions: ContextVar[Optional[List["LazySession"]]] = ContextVar("request_sessions", default=None)
+
+
+class PoolStats:
+    """Checkout wait times for one pool"""
+
+    def __init__(self, sample_size: int = 1000):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent = deque(maxlen=sample_size)
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.recent.append(wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self.recent)
+            checkouts, timeouts = self.checkouts, self.timeouts
+            wait_total, wait_max = self.wait_total, self.wait_max
+        percentile = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] * 1000 if recent else 0.0
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_avg_ms": wait_total / max(checkouts + timeouts, 1) * 1000,
+            "wait_max_ms": wait_max * 1000,
+            "wait_p50_ms": percentile(0.50),
+            "wait_p95_ms": percentile(0.95),
+            "wait_p99_ms": percentile(0.99),
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return conn
+
+
+def database_url(url: str, driver: Optional[str] = None) -> URL:
+    """URL with its PostgreSQL driver chosen by DB_DRIVER; an explicit ``postgresql+<driver>://`` wins"""
+    url = make_url(url)
+    if url.drivername == "postgresql" and (driver or settings.DB_DRIVER) == "psycopg":
+        url = url.set(drivername="postgresql+psycopg")
+    return url
+
+
+def connect_args(url: URL) -> dict:
+    """DBAPI connect() arguments for an engine URL"""
+    args = {"connect_timeout": 10}
+    if url.get_driver_name() == "psycopg":
+        # Server-side prepared statements don't survive PgBouncer transaction pooling
+        args["prepare_threshold"] = None if settings.DB_POOL_MODE == "null" else settings.DB_PREPARE_THRESHOLD
+    return args
+
+
+def _build_engine(url: str, **kwargs) -> Engine:
+    url = database_url(url)
+    if settings.DB_POOL_MODE == "null":
+        # PgBouncer owns the pooling; hold server connections only while in use
+        pool_kwargs = {"poolclass": NullPool}
+    else:
+        pool_kwargs = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        }
+    engine = create_engine(
+        url,
+        echo=settings.SQLALCHEMY_ECHO,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args(url),
+        **pool_kwargs,
+        **kwargs
+    )
+    event.listen(engine, "connect", receive_connect)
+    return engine
+
+
+def pool_status(engine: Engine) -> dict:
+    """Live pool occupancy and checkout wait statistics"""
+    pool = engine.pool
+    status = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "mode": settings.DB_POOL_MODE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
     }
-)
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        status["waits"] = pool.stats.snapshot()
+    return status
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Create the primary engine on first use, so importing the app opens nothing"""
+    return _build_engine(settings.DATABASE_URL)
+
+
+@lru_cache()
+def get_replica_engines() -> Tuple[Engine, ...]:
+    """Read-only engines for DATABASE_REPLICA_URLS (created on first use)"""
+    return tuple(
+        _build_engine(url, execution_options={"postgresql_readonly": True})
+        for url in settings.DATABASE_REPLICA_URLS
+    )
+
+
+# Round-robin over the replicas; next() on a shared cycle isn't thread-safe
+_replica_cycle = None
+_replica_cycle_lock = threading.Lock()
+
+
+def _next_replica() -> Engine:
+    global _replica_cycle
+    with _replica_cycle_lock:
+        if _replica_cycle is None:
+            _replica_cycle = itertools.cycle(get_replica_engines())
+        return next(_replica_cycle)
+
+
+def reset_replica_cycle() -> None:
+    """Start the round-robin over (e.g. in a freshly forked worker)"""
+    global _replica_cycle, _replica_cycle_lock
+    # A lock held by another thread at fork time would never be released here
+    _replica_cycle_lock = threading.Lock()
+    _replica_cycle = None
+
+
+def SessionLocal() -> Session:
+    """New session bound to the (lazily created) primary engine"""
+    return _session_factory(bind=get_engine())
+
+
+@event.listens_for(_request_session_factory, "after_flush")
+def _mark_unsaved_writes(session, flush_context):
+    session.info["unsaved_writes"] = True
+
+
+@event.listens_for(_request_session_factory, "after_commit")
+@event.listens_for(_request_session_factory, "after_rollback")
+def _clear_unsaved_writes(session):
+    session.info.pop("unsaved_writes", None)
+
+
+class LazySession:
+    """Request session proxy that creates its Session on first use.
+
+    ``release()`` ends a read-only transaction, handing the connection back
+    to the pool while loaded objects stay usable (expire_on_commit=False).
+    Anything touched later (e.g. a lazy relationship during serialization)
+    simply checks a connection out again.
+    """
+
+    def __init__(self, bind: Callable[[], Engine]):
+        self._bind = bind
+        self._session: Optional[Session] = None
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = _request_session_factory(bind=self._bind())
+        return self._session
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def release(self) -> None:
+        session = self._session
+        if session is None or not session.in_transaction():
+            return
+        if session.new or session.dirty or session.deleted or session.info.get("unsaved_writes"):
+            # Uncommitted writes are discarded on close(), as before
+            return
+        session.commit()
+
+    def rollback(self) -> None:
+        if self._session is not None:
+            self._session.rollback()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+def _track(db: LazySession) -> LazySession:
+    sessions = _request_sessions.get()
+    if sessions is not None:
+        sessions.append(db)
+    return db
+
+
+def _release_request_sessions() -> None:
+    for db in _request_sessions.get() or ():
+        db.release()
+
+
+def _release_sessions_after(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def release_after(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            _release_request_sessions()
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def release_after(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            _release_request_sessions()
+            return result
+    return release_after
+
+
+class LazySessionRoute(APIRoute):
+    """APIRoute that returns request connections to the pool when the endpoint
+    returns, instead of after the response has been serialized and sent"""
+
+    def get_route_handler(self) -> Callable:
+        # Only the call is wrapped: self.endpoint stays the original, which is
+        # what include_router copies into the app's routes
+        self.dependant.call = _release_sessions_after(self.endpoint)
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            token = _request_sessions.set([])
+            try:
+                return await handler(request)
+            finally:
+                _request_sessions.reset(token)
+
+        return route_handler
 
 
 def get_db() -> Generator[Session, None, None]:
-    """Database session dependency"""
-    db = SessionLocal()
+    """Database session dependency; connects on first use"""
+    db = _track(LazySession(get_engine))
     try:
         yield db
     except Exception as e:
@@ -36,7 +307,100 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-@event.listens_for(engine, "connect")
+@contextmanager
+def pipeline(db: Session) -> Iterator[None]:
+    """Send the statements of the block in one round trip (psycopg 3 pipeline mode).
+
+    Pending ORM changes are flushed first. Only statements whose results
+    aren't read belong in the block (notifications, upserts, multi-row
+    inserts); errors surface when the block exits. With other drivers the
+    statements simply run one by one.
+    """
+    db.flush()
+    connection = db.connection()
+    if connection.dialect.driver != "psycopg":
+        yield
+        return
+    with connection.connection.driver_connection.pipeline():
+        yield
+
+
+@contextmanager
+def locked_session(lock_key: int) -> Iterator[Optional[Session]]:
+    """Session on a dedicated connection holding a PostgreSQL advisory lock.
+
+    Yields None if another process holds the lock, so background jobs can
+    run on every worker and only one of them does the work. The session may
+    commit as often as it likes; the lock lives until the block exits.
+    """
+    with get_engine().connect() as conn:
+        is_postgres = conn.dialect.name == "postgresql"
+        if is_postgres:
+            acquired = conn.execute(select(func.pg_try_advisory_lock(lock_key))).scalar()
+            conn.commit()
+            if not acquired:
+                yield None
+                return
+        try:
+            with _session_factory(bind=conn) as db:
+                yield db
+        finally:
+            if is_postgres:
+                conn.rollback()
+                conn.execute(select(func.pg_advisory_unlock(lock_key)))
+                conn.commit()
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that replicas may still lag behind"""
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Read-only session dependency, load-balanced across replicas when configured"""
+    if not settings.DATABASE_REPLICA_URLS or is_pinned_to_primary(request):
+        db = _track(LazySession(get_engine))
+    else:
+        db = _track(LazySession(_next_replica))
+    try:
+        yield db
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class PrimaryPinMiddleware:
+    """Sets PRIMARY_PIN_COOKIE on successful writes (read-your-writes with replicas)"""
+
+    WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                pinned_until = time.time() + settings.REPLICA_PIN_SECONDS
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={pinned_until:.3f}; Max-Age={settings.REPLICA_PIN_SECONDS}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+
 def receive_connect(dbapi_conn, connection_record):
     """PostgreSQL specific settings"""
     cursor = dbapi_conn.cursor()
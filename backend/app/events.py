@@ -0,0 +1,157 @@
+"""Access request change events.
+
+Mutations publish events with PostgreSQL ``NOTIFY`` inside their own
+transaction, so listeners only hear about committed changes. Each worker
+keeps a single ``LISTEN`` connection (opened on the first subscriber) and
+fans payloads out to its connected Server-Sent Events clients.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "access_request_events"
+
+# Per-client buffer; a client that falls this far behind starts losing events
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def publish(db: Session, event: str, access_requests: Iterable[models.AccessRequest]) -> None:
+    """Queue change events in the session's transaction (delivered on commit)"""
+    payloads = [
+        json.dumps({
+            "event": event,
+            "id": r.id,
+            "request_number": r.request_number,
+            "status": r.status.value,
+            "user_id": r.user_id,
+        })
+        for r in access_requests
+    ]
+    if not payloads:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        # One round-trip for the whole batch
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": CHANNEL, "payloads": payloads}
+        )
+    else:
+        # No LISTEN/NOTIFY (e.g. SQLite in development): deliver in-process
+        for payload in payloads:
+            broadcaster.dispatch(payload)
+
+
+class EventBroadcaster:
+    """Fans NOTIFY payloads out to the SSE subscribers of this worker"""
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        self._ensure_listener()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def dispatch(self, payload: str) -> None:
+        """Deliver a payload to every subscriber, from any thread"""
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fan_out(payload)
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, payload)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _fan_out(self, payload: str) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning("Dropping request event for slow subscriber")
+
+    def _ensure_listener(self) -> None:
+        if get_engine().dialect.name != "postgresql":
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="request-events-listener", daemon=True)
+        self._thread.start()
+
+    def _listen(self) -> None:
+        """Hold one LISTEN connection (outside the pool), reconnecting on failure"""
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                engine = get_engine()
+                # LISTEN needs a real session, not a PgBouncer transaction-pooled one
+                url = make_url(settings.DATABASE_LISTEN_URL) if settings.DATABASE_LISTEN_URL else engine.url
+                cargs, cparams = engine.dialect.create_connect_args(url)
+                conn = engine.dialect.connect(*cargs, **cparams)
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {CHANNEL}")
+                cursor.close()
+                logger.info(f"Listening for request events on channel {CHANNEL}")
+                backoff = 1
+
+                if engine.dialect.driver == "psycopg":
+                    # psycopg 3 has its own wait loop for notifications
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=5.0):
+                            self.dispatch(notify.payload)
+                else:
+                    while not self._stop.is_set():
+                        if select.select([conn], [], [], 5.0) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            self.dispatch(notify.payload)
+            except Exception as e:
+                logger.error(f"Request event listener error: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+broadcaster = EventBroadcaster()
@@ -0,0 +1,184 @@
+"""Liveness and readiness.
+
+A background task in each worker measures the worker's dependencies every
+HEALTH_CHECK_INTERVAL_SECONDS and caches the result:
+
+* database: ``SELECT 1`` on a dedicated connection outside the pool, so the
+  check works (and fails honestly) even when the pool is exhausted. The
+  connection gets the pool's connect_timeout and session settings, and each
+  worker holds it on top of DB_POOL_SIZE + DB_MAX_OVERFLOW
+* pool: connections in use against capacity, and checkout timeouts
+* keycloak: the realm JWKS is fresh (refreshed here when stale), or the
+  realm answers when signatures are not verified
+* event_loop: how late a short timer fires, i.e. how long callbacks block
+
+``/health/ready`` only reads that cache, so probes cost microseconds and
+never take a DB connection. ``/health/live`` answers as long as the event
+loop does.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.database import connect_args, get_engine, pool_status, receive_connect
+
+logger = logging.getLogger(__name__)
+
+# Timer used to measure event loop lag
+LAG_PROBE_SECONDS = 0.25
+DB_CHECK_TIMEOUT_MS = 2000
+
+
+class HealthMonitor:
+    def __init__(self):
+        self._checks: Dict[str, dict] = {}
+        self._checked_at: Optional[float] = None
+        self._tasks = []
+        self._db_conn = None
+        self._lag_max = 0.0
+        self._pool_timeouts: Optional[int] = None
+
+    def start(self) -> None:
+        """Start measuring; must be called from the event loop"""
+        self._tasks = [
+            asyncio.create_task(self._run(), name="health-monitor"),
+            asyncio.create_task(self._measure_lag(), name="health-loop-lag"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._close_db()
+
+    def readiness(self) -> dict:
+        """Cached readiness report; never does I/O"""
+        if self._checked_at is None:
+            return {"status": "starting", "ready": False, "checks": {}}
+        age = time.monotonic() - self._checked_at
+        stale = age > 3 * settings.HEALTH_CHECK_INTERVAL_SECONDS
+        ready = not stale and all(check["ok"] for check in self._checks.values())
+        return {
+            "status": "ready" if ready else ("stale" if stale else "degraded"),
+            "ready": ready,
+            "age_seconds": round(age, 3),
+            "checks": self._checks,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                checks = {
+                    "database": await asyncio.to_thread(self._check_database),
+                    "pool": self._check_pool(),
+                    "keycloak": await self._check_keycloak(),
+                    "event_loop": self._check_event_loop(),
+                }
+                self._checks = checks
+                self._checked_at = time.monotonic()
+                failing = [name for name, check in checks.items() if not check["ok"]]
+                if failing:
+                    logger.warning(f"Readiness checks failing: {', '.join(failing)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health monitor error: {e}")
+            await asyncio.sleep(settings.HEALTH_CHECK_INTERVAL_SECONDS)
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_PROBE_SECONDS)
+            self._lag_max = max(self._lag_max, loop.time() - started - LAG_PROBE_SECONDS)
+
+    def _check_event_loop(self) -> dict:
+        lag_ms = self._lag_max * 1000
+        self._lag_max = 0.0
+        return {"ok": lag_ms <= settings.HEALTH_MAX_LOOP_LAG_MS, "max_lag_ms": round(lag_ms, 1)}
+
+    def _check_database(self) -> dict:
+        started = time.perf_counter()
+        try:
+            if self._db_conn is None:
+                engine = get_engine()
+                cargs, cparams = engine.dialect.create_connect_args(engine.url)
+                if engine.dialect.name == "postgresql":
+                    # Same arguments as pooled connections, so a down server can't hang the check
+                    cparams.update(connect_args(engine.url))
+                self._db_conn = engine.dialect.connect(*cargs, **cparams)
+                if engine.dialect.driver == "psycopg":
+                    # This connection may go through PgBouncer; don't prepare "SELECT 1"
+                    self._db_conn.prepare_threshold = None
+                if engine.dialect.name == "postgresql":
+                    self._db_conn.autocommit = True
+                    receive_connect(self._db_conn, None)
+                    cursor = self._db_conn.cursor()
+                    cursor.execute(f"SET statement_timeout = {DB_CHECK_TIMEOUT_MS}")
+                    cursor.close()
+            cursor = self._db_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            if get_engine().dialect.name != "postgresql":
+                # e.g. SQLite connections can't move between threads
+                self._close_db()
+        except Exception as e:
+            self._close_db()
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def _close_db(self) -> None:
+        if self._db_conn is not None:
+            try:
+                self._db_conn.close()
+            except Exception:
+                pass
+            self._db_conn = None
+
+    def _check_pool(self) -> dict:
+        status = pool_status(get_engine())
+        if "size" not in status:
+            # NullPool: nothing to saturate in-process
+            return {"ok": True, "mode": status["mode"]}
+
+        capacity = status["size"] + status["max_overflow"]
+        saturation = status["checked_out"] / capacity if capacity else 0.0
+        timeouts = status.get("waits", {}).get("timeouts", 0)
+        new_timeouts = timeouts - self._pool_timeouts if self._pool_timeouts is not None else 0
+        self._pool_timeouts = timeouts
+        return {
+            "ok": saturation < settings.HEALTH_MAX_POOL_SATURATION and new_timeouts == 0,
+            "checked_out": status["checked_out"],
+            "capacity": capacity,
+            "saturation": round(saturation, 3),
+            "checkout_timeouts": new_timeouts,
+            "wait_p95_ms": round(status.get("waits", {}).get("wait_p95_ms", 0.0), 1),
+        }
+
+    async def _check_keycloak(self) -> dict:
+        if settings.VERIFY_TOKEN_SIGNATURE:
+            from app.auth import jwks_cache
+            if not jwks_cache.is_fresh:
+                try:
+                    await jwks_cache.refresh()
+                except Exception as e:
+                    return {"ok": False, "jwks_fresh": False, "error": str(e)}
+            return {"ok": True, "jwks_fresh": True, "keys": len(jwks_cache.keys)}
+
+        url = f"{settings.KEYCLOAK_SERVER_URL}/realms/{settings.KEYCLOAK_REALM}"
+        try:
+            async with httpx.AsyncClient(timeout=2.0) as client:
+                response = await client.get(url)
+            return {"ok": response.status_code == 200, "status_code": response.status_code}
+        except httpx.HTTPError as e:
+            return {"ok": False, "error": str(e)}
+
+
+monitor = HealthMonitor()
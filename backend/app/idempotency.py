@@ -0,0 +1,227 @@
+"""Idempotency-Key support for retried POSTs.
+
+Clients (and the load balancer) may send ``Idempotency-Key: <unique id>``
+on the endpoints in IDEMPOTENT_ROUTES. The first request with a key runs
+normally and its response is stored in ``idempotency_keys``; a retry with
+the same key, caller and body gets that response back from one primary-key
+lookup, without running the handler again. A retry that arrives while the
+first request is still running gets 409 and should back off.
+
+Keys are scoped to the token's ``sub``, so a refreshed token still matches
+and one user can't replay another's response; the token is verified before
+a stored response is replayed. Requests without a bearer token are passed
+through untouched. Only 2xx and final 4xx responses are stored: redirects,
+auth failures, 408/409/425/429 and server errors are not.
+"""
+
+import hashlib
+import logging
+import re
+from typing import List, Optional, Pattern
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from app import crud
+from app.auth import get_current_user
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+PURGE_BATCH_SIZE = 1000
+
+# POST paths that honour the header
+IDEMPOTENT_ROUTES: List[Pattern] = [
+    re.compile(r"^/api/requests/?$"),
+    re.compile(r"^/api/requests/\d+/(?:approve|reject)$"),
+]
+# 4xx answers that a retry may not get again, so they are never replayed
+TRANSIENT_CLIENT_ERRORS = {401, 403, 408, 409, 425, 429}
+
+
+def _is_idempotent(path: str) -> bool:
+    return any(pattern.match(path) for pattern in IDEMPOTENT_ROUTES)
+
+
+def _is_final(status_code: Optional[int]) -> bool:
+    """Whether a response may be replayed to a retry"""
+    if status_code is None:
+        return False
+    return 200 <= status_code < 300 or (400 <= status_code < 500 and status_code not in TRANSIENT_CLIENT_ERRORS)
+
+
+def _sha256(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+def _bearer_token(headers: dict) -> Optional[str]:
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+def _subject(token: str) -> Optional[str]:
+    """The token's ``sub``, unverified: it only scopes the key; the route (or a replay) verifies the token"""
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+async def _is_valid(token: str, subject: str) -> bool:
+    try:
+        user = await get_current_user(None, HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+    except Exception:
+        return False
+    return user.get("sub") == subject
+
+
+def _lookup(key_hash: str):
+    with SessionLocal() as db:
+        return crud.IdempotencyKeyCRUD.get(db, key_hash)
+
+
+def _claim(key_hash: str, request_hash: str) -> bool:
+    with SessionLocal() as db:
+        return crud.IdempotencyKeyCRUD.claim(db, key_hash, request_hash, settings.IDEMPOTENCY_LOCK_SECONDS)
+
+
+def _complete(key_hash: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+    with SessionLocal() as db:
+        crud.IdempotencyKeyCRUD.complete(
+            db, key_hash, status_code, content_type, body, settings.IDEMPOTENCY_TTL_SECONDS
+        )
+
+
+def _release(key_hash: str) -> None:
+    with SessionLocal() as db:
+        crud.IdempotencyKeyCRUD.release(db, key_hash)
+
+
+def purge_expired() -> int:
+    """Delete expired keys in batches (background job)"""
+    total = 0
+    with SessionLocal() as db:
+        while True:
+            deleted = crud.IdempotencyKeyCRUD.purge_expired(db, PURGE_BATCH_SIZE)
+            total += deleted
+            if deleted < PURGE_BATCH_SIZE:
+                break
+    if total:
+        logger.info(f"Purged {total} expired idempotency keys")
+    return total
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for a repeated Idempotency-Key"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER)
+        token = _bearer_token(headers) if key and _is_idempotent(scope["path"]) else None
+        subject = _subject(token) if token else None
+        if subject is None:
+            # No caller to scope the key to; the route rejects it or runs it once
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > MAX_KEY_LENGTH:
+            await JSONResponse(
+                {"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}, status_code=400
+            )(scope, receive, send)
+            return
+
+        # The body is needed up front to fingerprint the request
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        key_hash = _sha256(subject.encode(), scope["path"].encode(), key)
+        request_hash = _sha256(body)
+
+        stored = await run_in_threadpool(_lookup, key_hash)
+        if stored is None and await run_in_threadpool(_claim, key_hash, request_hash):
+            await self._run(scope, receive, send, body, key_hash)
+            return
+        if stored is None:
+            # Lost the claim to a concurrent request with the same key
+            stored = await run_in_threadpool(_lookup, key_hash)
+
+        if stored is not None and stored.request_hash != request_hash:
+            response = JSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request body"}, status_code=422
+            )
+        elif stored is None or stored.status_code is None:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"}
+            )
+        elif not await _is_valid(token, subject):
+            response = JSONResponse(
+                {"detail": "Invalid token"}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+            )
+        else:
+            response = Response(
+                content=stored.body,
+                status_code=stored.status_code,
+                media_type=stored.content_type,
+                headers={REPLAYED_HEADER: "true"}
+            )
+        await response(scope, receive, send)
+
+    async def _run(self, scope, receive, send, body: bytes, key_hash: str) -> None:
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = None
+        content_type = None
+        response_chunks = []
+
+        async def capture_send(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode() or None
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except Exception:
+            await run_in_threadpool(_release, key_hash)
+            raise
+
+        if _is_final(status_code):
+            await run_in_threadpool(_complete, key_hash, status_code, content_type, b"".join(response_chunks))
+        else:
+            await run_in_threadpool(_release, key_hash)
@@ -0,0 +1,181 @@
+"""Keycloak user directory sync.
+
+Pages through the realm's users and the members of the portal roles and
+upserts them into ``users`` in batches (``INSERT ... ON CONFLICT``), so every
+realm user exists locally before their first request and profile data stays
+current. Users no longer in the realm are deactivated.
+
+After a full sync, runs are incremental: only users named in Keycloak admin
+events (user and realm role mapping changes) since the previous run are
+fetched. A full sync runs again every KEYCLOAK_FULL_SYNC_HOURS, or whenever
+admin events are unavailable (they must be enabled on the realm).
+"""
+
+from datetime import datetime, timedelta
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from keycloak import KeycloakAdmin
+from keycloak.exceptions import KeycloakError, KeycloakGetError
+
+from app import crud, models
+from app.config import settings
+from app.database import locked_session
+
+logger = logging.getLogger(__name__)
+
+SYNC_LOCK_KEY = 7100437
+LAST_EVENT_KEY = "keycloak_sync.last_event_ms"
+LAST_FULL_SYNC_KEY = "keycloak_sync.last_full_sync_ms"
+
+# Realm roles mapped onto models.UserRole, highest privilege first
+ROLE_PRECEDENCE = (models.UserRole.ADMIN, models.UserRole.APPROVER)
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class KeycloakDirectorySync:
+    def __init__(self, admin: Optional[KeycloakAdmin] = None):
+        self._admin = admin
+
+    @property
+    def admin(self) -> KeycloakAdmin:
+        if self._admin is None:
+            self._admin = KeycloakAdmin(
+                server_url=settings.KEYCLOAK_SERVER_URL,
+                username=settings.KEYCLOAK_ADMIN_USERNAME,
+                password=settings.KEYCLOAK_ADMIN_PASSWORD,
+                realm_name=settings.KEYCLOAK_REALM,
+                user_realm_name="master",
+                auto_refresh_token=["get"],
+            )
+        return self._admin
+
+    def run_once(self) -> int:
+        """Sync once if no other worker is syncing; returns users upserted"""
+        with locked_session(SYNC_LOCK_KEY) as db:
+            if db is None:
+                return 0
+
+            last_event_ms = crud.ConfigurationCRUD.get_value(db, LAST_EVENT_KEY)
+            last_full_ms = crud.ConfigurationCRUD.get_value(db, LAST_FULL_SYNC_KEY)
+            full_due = (
+                last_event_ms is None
+                or last_full_ms is None
+                or _now_ms() - int(last_full_ms) > settings.KEYCLOAK_FULL_SYNC_HOURS * 3600 * 1000
+            )
+
+            if not full_due:
+                try:
+                    return self._incremental_sync(db, int(last_event_ms))
+                except KeycloakGetError as e:
+                    logger.warning(f"Admin events unavailable ({e}), falling back to full sync")
+
+            return self._full_sync(db)
+
+    def _full_sync(self, db) -> int:
+        started_ms = _now_ms()
+        roles = self._role_members()
+        batch_size = settings.KEYCLOAK_SYNC_BATCH_SIZE
+        total = 0
+        first = 0
+        seen = set()
+        while True:
+            page = self.admin.get_users({"first": first, "max": batch_size})
+            if not page:
+                break
+            seen.update(user["id"] for user in page)
+            total += crud.UserCRUD.upsert_many(db, self._rows(page, roles))
+            db.commit()
+            if len(page) < batch_size:
+                break
+            first += batch_size
+
+        # An empty listing is more likely a misconfigured realm than an empty one
+        deactivated = crud.UserCRUD.deactivate_missing(db, seen) if seen else 0
+        crud.ConfigurationCRUD.set_value(db, LAST_EVENT_KEY, str(started_ms), "Keycloak sync watermark")
+        crud.ConfigurationCRUD.set_value(db, LAST_FULL_SYNC_KEY, str(started_ms), "Keycloak full sync time")
+        db.commit()
+        logger.info(f"Keycloak full sync upserted {total} users, deactivated {deactivated}")
+        return total
+
+    def _incremental_sync(self, db, since_ms: int) -> int:
+        started_ms = _now_ms()
+        date_from = (datetime.utcfromtimestamp(since_ms / 1000) - timedelta(days=1)).strftime("%Y-%m-%d")
+        events = self.admin.get_admin_events({
+            "dateFrom": date_from,
+            "resourceTypes": ["USER", "REALM_ROLE_MAPPING"],
+            "max": 10000,
+        })
+
+        changed = {
+            event["resourcePath"].split("/")[1]
+            for event in events
+            if event.get("time", 0) > since_ms and event.get("resourcePath", "").startswith("users/")
+        }
+
+        users, deleted = [], []
+        for user_id in changed:
+            try:
+                user = self.admin.get_user(user_id)
+            except KeycloakGetError as e:
+                if e.response_code == 404:
+                    deleted.append(user_id)
+                    continue
+                raise
+            user["_roles"] = [role["name"] for role in self.admin.get_realm_roles_of_user(user_id)]
+            users.append(user)
+
+        total = 0
+        batch_size = settings.KEYCLOAK_SYNC_BATCH_SIZE
+        for start in range(0, len(users), batch_size):
+            total += crud.UserCRUD.upsert_many(db, self._rows(users[start:start + batch_size]))
+        if deleted:
+            db.query(models.User).filter(models.User.keycloak_id.in_(deleted)).update(
+                {models.User.is_active: False}, synchronize_session=False
+            )
+
+        crud.ConfigurationCRUD.set_value(db, LAST_EVENT_KEY, str(started_ms), "Keycloak sync watermark")
+        db.commit()
+        if total or deleted:
+            logger.info(f"Keycloak incremental sync upserted {total} users, deactivated {len(deleted)}")
+        return total
+
+    def _role_members(self) -> Dict[str, models.UserRole]:
+        """keycloak_id -> highest portal role, from realm role membership"""
+        roles: Dict[str, models.UserRole] = {}
+        for role in reversed(ROLE_PRECEDENCE):
+            try:
+                members = self.admin.get_realm_role_members(role.value)
+            except KeycloakError as e:
+                logger.warning(f"Could not list members of realm role {role.value}: {e}")
+                continue
+            for member in members:
+                roles[member["id"]] = role
+        return roles
+
+    @staticmethod
+    def _rows(users: Iterable[dict], roles: Optional[Dict[str, models.UserRole]] = None) -> List[dict]:
+        rows = []
+        for user in users:
+            if roles is not None:
+                role = roles.get(user["id"], models.UserRole.USER)
+            else:
+                user_roles = user.get("_roles", [])
+                role = next((r for r in ROLE_PRECEDENCE if r.value in user_roles), models.UserRole.USER)
+            rows.append({
+                "keycloak_id": user["id"],
+                "username": user.get("username"),
+                "email": user.get("email"),
+                "first_name": user.get("firstName", ""),
+                "last_name": user.get("lastName", ""),
+                "role": role,
+                "is_active": user.get("enabled", True),
+            })
+        return rows
+
+
+directory_sync = KeycloakDirectorySync()
@@ -0,0 +1,81 @@
+"""Access lifecycle: close approved requests whose access has expired.
+
+Runs on every worker. Each batch claims up to LIFECYCLE_BATCH_SIZE expired
+approvals with ``FOR UPDATE SKIP LOCKED`` (served by the partial index on
+``expires_at``), closes them in one UPDATE and writes their audit entries
+in one multi-row INSERT, so concurrent workers split the work instead of
+blocking on each other.
+"""
+
+from datetime import datetime
+import logging
+
+from sqlalchemy import select, update
+
+from app import crud, events, models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on batches per run, so one run can't monopolise a worker thread
+MAX_BATCHES_PER_RUN = 20
+
+
+def close_expired_batch(db, batch_size: int) -> int:
+    """Close one batch of expired approvals; returns how many were closed"""
+    now = datetime.utcnow()
+    expired = (
+        select(models.AccessRequest.id)
+        .where(
+            models.AccessRequest.status == models.RequestStatus.APPROVED,
+            models.AccessRequest.expires_at <= now
+        )
+        .order_by(models.AccessRequest.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    closed = db.execute(
+        update(models.AccessRequest)
+        .where(models.AccessRequest.id.in_(expired))
+        .values(status=models.RequestStatus.CLOSED)
+        .returning(
+            models.AccessRequest.id,
+            models.AccessRequest.request_number,
+            models.AccessRequest.user_id,
+            models.AccessRequest.status,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if closed:
+        crud.AuditLogCRUD.create_many(db, [
+            {
+                "user_id": None,
+                "access_request_id": row.id,
+                "action": "closed",
+                "resource_type": "access_request",
+                "resource_id": row.request_number,
+                "details": "Closed access request: access expired",
+                "ip_address": "system",
+                "user_agent": "lifecycle-scheduler",
+            }
+            for row in closed
+        ])
+        events.publish(db, "closed", closed)
+    db.commit()
+    return len(closed)
+
+
+def close_expired() -> int:
+    """Close expired approvals in bounded batches"""
+    total = 0
+    with SessionLocal() as db:
+        for _ in range(MAX_BATCHES_PER_RUN):
+            closed = close_expired_batch(db, settings.LIFECYCLE_BATCH_SIZE)
+            total += closed
+            if closed < settings.LIFECYCLE_BATCH_SIZE:
+                break
+    if total:
+        logger.info(f"Closed {total} expired access requests")
+    return total
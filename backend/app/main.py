@@ -1,13 +1,18 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from typing import Optional
 import logging
+import time
 from datetime import datetime
 
+_import_started = time.perf_counter()
+
 from app.config import settings
-from app.database import engine, SessionLocal, Base
+from app.database import PrimaryPinMiddleware
+from app.idempotency import IdempotencyMiddleware, purge_expired as purge_idempotency_keys
 from app.routes import requests as request_routes
 from app.routes import users as user_routes
 from app.routes import audit as audit_routes
@@ -15,6 +20,9 @@ from app.routes import admin as admin_routes
 from app.routes import config as config_routes
 from app.routes import auth as auth_routes
 from app.auth import get_current_user
+from app.events import broadcaster
+from app.background import jobs
+from app.health import monitor as health_monitor
 
 # Configure logging
 logging.basicConfig(
@@ -23,16 +31,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create tables (checkfirst=True prevents duplicate errors)
-Base.metadata.create_all(bind=engine, checkfirst=True)
+# Schema is managed by Alembic: run `python -m app.migrate` once per deploy,
+# before starting workers. Workers themselves make no DB round-trips at startup.
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    logger.info("Starting Network Access Portal")
+    logger.info(
+        f"Starting Network Access Portal "
+        f"(ready in {(time.perf_counter() - _import_started) * 1000:.0f} ms)"
+    )
+    if settings.LIFECYCLE_ENABLED:
+        from app.lifecycle import close_expired
+        jobs.start("access-lifecycle", settings.LIFECYCLE_INTERVAL_SECONDS, close_expired)
+    health_monitor.start()
+    if settings.ARCHIVE_AFTER_DAYS > 0:
+        from app.archive import archive_finished
+        jobs.start("request-archive", settings.ARCHIVE_INTERVAL_SECONDS, archive_finished)
+    jobs.start("idempotency-purge", settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_idempotency_keys)
+    if settings.NOTIFICATIONS_ENABLED:
+        from app.notifications import dispatcher
+        jobs.start("notifications", settings.NOTIFICATION_INTERVAL_SECONDS, dispatcher.run_once)
+    if settings.KEYCLOAK_SYNC_ENABLED:
+        from app.keycloak_sync import directory_sync
+        jobs.start("keycloak-sync", settings.KEYCLOAK_SYNC_INTERVAL_SECONDS, directory_sync.run_once)
     yield
     # Shutdown
     logger.info("Shutting down Network Access Portal")
+    await jobs.stop()
+    await health_monitor.stop()
+    if settings.NOTIFICATIONS_ENABLED:
+        from app.notifications import dispatcher
+        dispatcher.close()
+    broadcaster.stop()
 
 app = FastAPI(
     title="Network Access Portal API",
@@ -41,6 +72,19 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+if settings.PROFILING_ENABLED:
+    from app.profiling import ProfilingMiddleware
+    # Innermost, so a report covers the handler rather than replays
+    app.add_middleware(ProfilingMiddleware)
+
+# Inside CORS, so replayed responses get CORS headers too
+app.add_middleware(IdempotencyMiddleware)
+
+if settings.ADMISSION_ENABLED:
+    from app.admission import AdmissionMiddleware
+    # Inside CORS so browsers can read the 503, outside idempotency lookups
+    app.add_middleware(AdmissionMiddleware)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -50,6 +94,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.TRAFFIC_CAPTURE_ENABLED:
+    from app.capture import TrafficCaptureMiddleware
+    # Outside admission control, so shed requests are recorded with their 503
+    app.add_middleware(TrafficCaptureMiddleware)
+
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(PrimaryPinMiddleware)
+
 # Routes
 app.include_router(auth_routes.router, prefix="/api", tags=["Auth"])
 app.include_router(request_routes.router, prefix="/api/requests", tags=["Requests"])
@@ -69,6 +121,19 @@ async def health_check():
     }
 
 
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """Liveness probe: the worker's event loop is responding"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """Readiness probe: cached dependency checks, 503 while not ready"""
+    report = health_monitor.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
 @app.get("/api/me", tags=["Auth"])
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Get current user information"""
@@ -0,0 +1,31 @@
+"""One-shot schema migration: ``python -m app.migrate [revision]``.
+
+Run once per deploy before starting the API workers (docker-compose runs it
+as the ``migrate`` service). Defaults to upgrading to ``head``.
+
+Databases created by the old import-time ``create_all`` already have the
+initial schema (revision 0001); mark them with ``alembic stamp 0001`` once
+before the first run.
+"""
+
+from pathlib import Path
+import logging
+import sys
+
+from alembic import command
+from alembic.config import Config
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def upgrade(revision: str = "head") -> None:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    command.upgrade(config, revision)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    upgrade(sys.argv[1] if len(sys.argv) > 1 else "head")
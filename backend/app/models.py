@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Float, Boolean, ForeignKey, Enum, Index, LargeBinary, text
+from sqlalchemy import JSON, DDL, event
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.schema import FetchedValue
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
@@ -15,6 +18,12 @@ class RequestStatus(str, enum.Enum):
     CLOSED = "closed"
 
 
+class NotificationStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class UserRole(str, enum.Enum):
     ADMIN = "admin"
     APPROVER = "approver"
@@ -31,6 +40,21 @@ class Protocol(str, enum.Enum):
     CUSTOM = "custom"
 
 
+# CAST(value AS inet) that yields NULL for a value that isn't an address, so
+# the inet indexes and CIDR filters never fail on a legacy or malformed row
+SAFE_INET_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION safe_inet(value text) RETURNS inet
+LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+BEGIN
+    RETURN value::inet;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN NULL;
+END
+$$
+""")
+event.listen(Base.metadata, "before_create", SAFE_INET_FUNCTION.execute_if(dialect="postgresql"))
+
+
 class User(Base):
     __tablename__ = "users"
     __table_args__ = (
@@ -57,6 +81,23 @@ class User(Base):
         return f"<User {self.username}>"
 
 
+# Each reservation from request_number_counters takes a block of this many
+# numbers, which a worker hands out without round-trips (see app.numbering)
+REQUEST_NUMBER_BLOCK_SIZE = 50
+
+
+class RequestNumberCounter(Base):
+    """Last request number reserved for a UTC day"""
+    __tablename__ = "request_number_counters"
+
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False)
+
+
+# Deferred-column group holding the large free-text fields of an access request
+REQUEST_TEXT_GROUP = "request_text"
+
+
 class AccessRequest(Base):
     __tablename__ = "access_requests"
     __table_args__ = (
@@ -67,29 +108,82 @@ class AccessRequest(Base):
         Index('idx_access_requests_source_ip', 'source_ip'),
         Index('idx_access_requests_destination_ip', 'destination_ip'),
         Index('idx_access_requests_request_number', 'request_number'),
+        # Covers the list projection (schemas.AccessRequestList) so list pages
+        # can be served by index-only scans in created_at order
+        Index(
+            'idx_access_requests_list_cover', 'created_at',
+            postgresql_include=[
+                'id', 'request_number', 'user_id', 'approver_id', 'source_ip',
+                'destination_ip', 'destination_hostname', 'port', 'protocol',
+                'status', 'updated_at',
+            ],
+        ),
+        # Prefix (LIKE 'x%') lookups from app.search, independent of the database collation
+        Index(
+            'idx_access_requests_request_number_prefix', 'request_number',
+            postgresql_ops={'request_number': 'varchar_pattern_ops'},
+        ),
+        Index(
+            'idx_access_requests_source_ip_prefix', 'source_ip',
+            postgresql_ops={'source_ip': 'varchar_pattern_ops'},
+        ),
+        Index(
+            'idx_access_requests_destination_ip_prefix', 'destination_ip',
+            postgresql_ops={'destination_ip': 'varchar_pattern_ops'},
+        ),
+        # Lifecycle scheduler: approved access that will expire (app.lifecycle)
+        Index(
+            'idx_access_requests_expiring', 'expires_at',
+            postgresql_where=text("status = 'APPROVED'"),
+        ),
+        # Full-text search over description and justification (app.search)
+        Index(
+            'idx_access_requests_search_vector', 'search_vector', postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        # Approval work queue: open requests in FIFO order (claim_next)
+        Index(
+            'idx_access_requests_open_queue', 'created_at',
+            postgresql_where=text("status IN ('CREATED', 'PENDING_APPROVAL')"),
+        ),
+        # Finished requests awaiting archival (app.archive)
+        Index(
+            'idx_access_requests_archivable', 'updated_at',
+            postgresql_where=text("status IN ('REJECTED', 'CLOSED')"),
+        ),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     request_number = Column(String(50), unique=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
     approver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Approval lease: the approver currently working the request, until claim_expires_at
+    claimed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    claim_expires_at = Column(DateTime(timezone=True), nullable=True)
     
     source_ip = Column(String(50), index=True)
     destination_ip = Column(String(50), index=True)
     destination_hostname = Column(String(255))
     port = Column(Integer)
     protocol = Column(Enum(Protocol), default=Protocol.TCP)
-    description = Column(Text)
-    business_justification = Column(Text)
+    # Unbounded text is only needed on the detail view; see REQUEST_TEXT_GROUP
+    description = deferred(Column(Text), group=REQUEST_TEXT_GROUP)
+    business_justification = deferred(Column(Text), group=REQUEST_TEXT_GROUP)
+    # Generated from description and business_justification by PostgreSQL (migration 0006)
+    search_vector = deferred(Column(
+        TSVECTOR().with_variant(Text(), "sqlite"),
+        server_default=FetchedValue(), server_onupdate=FetchedValue()
+    ))
     
     status = Column(Enum(RequestStatus), default=RequestStatus.CREATED, index=True)
-    approval_comment = Column(Text)
-    rejection_reason = Column(Text)
+    approval_comment = deferred(Column(Text), group=REQUEST_TEXT_GROUP)
+    rejection_reason = deferred(Column(Text), group=REQUEST_TEXT_GROUP)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     approved_at = Column(DateTime(timezone=True), nullable=True)
     rejected_at = Column(DateTime(timezone=True), nullable=True)
+    # Approved access is closed automatically once this passes (null = never)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
     
     user = relationship("User", back_populates="requests", foreign_keys=[user_id])
     approver = relationship("User", back_populates="approvals", foreign_keys=[approver_id])
@@ -99,6 +193,78 @@ class AccessRequest(Base):
         return f"<AccessRequest {self.request_number}>"
 
 
+# Expression indexes of access_requests, declared with their operator classes
+# (postgresql_ops keyed by label) so they match what the migrations build.
+# Hostname prefix and host:port lookups from app.search, case-insensitive
+Index(
+    'idx_access_requests_destination_hostname_lower',
+    func.lower(AccessRequest.destination_hostname).label('destination_hostname_lower'),
+    postgresql_ops={'destination_hostname_lower': 'varchar_pattern_ops'},
+)
+# CIDR containment (<<=) and IPv6 equality searches; safe_inet skips values that aren't addresses
+Index(
+    'idx_access_requests_source_inet',
+    func.safe_inet(AccessRequest.source_ip).label('source_inet'),
+    postgresql_using='gist',
+    postgresql_ops={'source_inet': 'inet_ops'},
+).ddl_if(dialect='postgresql')
+Index(
+    'idx_access_requests_destination_inet',
+    func.safe_inet(AccessRequest.destination_ip).label('destination_inet'),
+    postgresql_using='gist',
+    postgresql_ops={'destination_inet': 'inet_ops'},
+).ddl_if(dialect='postgresql')
+
+
+class ArchivedAccessRequest(Base):
+    """Rejected or closed request moved out of access_requests by app.archive"""
+    __tablename__ = "access_requests_archive"
+    __table_args__ = (
+        Index('idx_access_requests_archive_user_id', 'user_id'),
+        Index('idx_access_requests_archive_created_at', 'created_at'),
+    )
+
+    # Same id as in access_requests; ids are never reused
+    id = Column(Integer, primary_key=True)
+    request_number = Column(String(50), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    approver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    source_ip = Column(String(50))
+    destination_ip = Column(String(50))
+    destination_hostname = Column(String(255))
+    port = Column(Integer)
+    protocol = Column(Enum(Protocol))
+    description = Column(Text)
+    business_justification = Column(Text)
+
+    status = Column(Enum(RequestStatus))
+    approval_comment = Column(Text)
+    rejection_reason = Column(Text)
+
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    approved_at = Column(DateTime(timezone=True), nullable=True)
+    rejected_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    user = relationship("User", foreign_keys=[user_id])
+    approver = relationship("User", foreign_keys=[approver_id])
+
+    def __repr__(self):
+        return f"<ArchivedAccessRequest {self.request_number}>"
+
+
+# Columns copied from access_requests into access_requests_archive
+ARCHIVED_COLUMNS = (
+    "id", "request_number", "user_id", "approver_id", "source_ip", "destination_ip",
+    "destination_hostname", "port", "protocol", "description", "business_justification",
+    "status", "approval_comment", "rejection_reason", "created_at", "updated_at",
+    "approved_at", "rejected_at", "expires_at",
+)
+
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     __table_args__ = (
@@ -106,16 +272,22 @@ class AuditLog(Base):
         Index('idx_audit_logs_access_request_id', 'access_request_id'),
         Index('idx_audit_logs_action', 'action'),
         Index('idx_audit_logs_created_at', 'created_at'),
+        # Field-level queries on changes: changes ? 'port', changes @> '{...}'
+        Index('idx_audit_logs_changes', 'changes', postgresql_using='gin').ddl_if(dialect='postgresql'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True)
     access_request_id = Column(Integer, ForeignKey("access_requests.id"), nullable=True, index=True)
+    # Set instead of access_request_id once the request is moved to access_requests_archive
+    archived_access_request_id = Column(Integer, nullable=True, index=True)
     action = Column(String(255), index=True)
     resource_type = Column(String(100))
     resource_id = Column(String(255))
     old_value = Column(Text, nullable=True)
     new_value = Column(Text, nullable=True)
+    # Field-level diff, {"field": [old, new], ...}; see AuditService.diff
+    changes = Column(JSONB().with_variant(JSON(), "sqlite"), nullable=True)
     details = Column(Text)
     ip_address = Column(String(50))
     user_agent = Column(String(500))
@@ -128,6 +300,73 @@ class AuditLog(Base):
         return f"<AuditLog {self.action} by {self.user_id}>"
 
 
+class RequestActivityRollup(Base):
+    """Daily request activity per protocol, kept current by AccessRequestCRUD"""
+    __tablename__ = "request_activity_rollups"
+
+    # UTC day of the event: created_at for created, approved_at/rejected_at for decisions
+    bucket_date = Column(Date, primary_key=True)
+    protocol = Column(Enum(Protocol), primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0, server_default="0")
+    approved_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rejected_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Sum of approved_at - created_at over the bucket's approvals
+    approval_latency_seconds = Column(Float, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<RequestActivityRollup {self.bucket_date} {self.protocol}>"
+
+
+class NotificationOutbox(Base):
+    """E-mail queued in the transaction of the change it reports; see app.notifications"""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Delivery queue: only pending rows, in due order
+        Index(
+            'idx_notification_outbox_due', 'next_attempt_at',
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    access_request_id = Column(Integer, ForeignKey("access_requests.id"), nullable=True)
+    event = Column(String(32), nullable=False)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(NotificationStatus), nullable=False, default=NotificationStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<NotificationOutbox {self.event} to {self.recipient}>"
+
+
+class IdempotencyKey(Base):
+    """Response cached for an Idempotency-Key, replayed to retries until expires_at"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index('idx_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    # sha256 of caller, method, path and the client's key
+    key_hash = Column(String(64), primary_key=True)
+    # sha256 of the request body; a reused key with another body is rejected
+    request_hash = Column(String(64), nullable=False)
+    # Null while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key_hash[:12]} {self.status_code}>"
+
+
 class Configuration(Base):
     __tablename__ = "configurations"
     __table_args__ = (
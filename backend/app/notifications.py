@@ -0,0 +1,244 @@
+"""E-mail notifications via a transactional outbox.
+
+State changes call ``enqueue`` before they commit, so a notification row
+exists exactly when its change does. A background job on every worker then
+claims due rows with ``FOR UPDATE SKIP LOCKED`` and delivers them over one
+SMTP connection that is kept open between batches. Failed deliveries are
+retried with exponential backoff until NOTIFICATION_MAX_ATTEMPTS. No API
+request ever waits on SMTP.
+
+To try it against a local stand-in::
+
+    python -m aiosmtpd -n -l localhost:8025
+    NOTIFICATIONS_ENABLED=True SMTP_SERVER=localhost SMTP_PORT=8025 SMTP_STARTTLS=False \\
+        python -m app.notifications
+"""
+
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import parseaddr
+import logging
+import smtplib
+import ssl
+from typing import Iterable, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# A claimed batch is retried after this long if its worker dies mid-delivery
+CLAIM_LEASE_SECONDS = 300
+MAX_RETRY_DELAY_SECONDS = 6 * 3600
+# Upper bound on batches per run, so one run can't monopolise a worker thread
+MAX_BATCHES_PER_RUN = 20
+
+SUBJECTS = {
+    "created": "Access request {number} awaits approval",
+    "approved": "Access request {number} approved",
+    "rejected": "Access request {number} rejected",
+}
+SUMMARIES = {
+    "created": "Access request {number} was submitted and awaits approval.",
+    "approved": "Your access request {number} was approved.",
+    "rejected": "Your access request {number} was rejected.",
+}
+
+
+def _render(event: str, access_request, note: Optional[str]) -> dict:
+    lines = [SUMMARIES[event].format(number=access_request.request_number)]
+    if note:
+        lines.append(f"\nComment: {note}")
+    lines.append(f"\n{settings.PORTAL_URL}/requests/{access_request.id}")
+    return {
+        "access_request_id": access_request.id,
+        "event": event,
+        "subject": SUBJECTS[event].format(number=access_request.request_number),
+        "body": "\n".join(lines),
+    }
+
+
+def enqueue(db: Session, event: str, access_requests: Iterable, note: Optional[str] = None) -> None:
+    """Queue notification e-mails in the session's transaction (sent after commit)"""
+    if not settings.NOTIFICATIONS_ENABLED or event not in SUBJECTS:
+        return
+    access_requests = list(access_requests)
+    if not access_requests:
+        return
+
+    User = models.User
+    has_email = (User.email.isnot(None), User.email != "", User.is_active.is_(True))
+    if event == "created":
+        # New requests go to everyone who can approve them
+        approvers = db.execute(
+            select(User.email).where(User.role.in_([models.UserRole.APPROVER, models.UserRole.ADMIN]), *has_email)
+        ).scalars().all()
+        if not approvers:
+            # Roles are filled in by the Keycloak sync; until it has run, use the configured list
+            approvers = settings.NOTIFICATION_APPROVER_EMAILS
+            if not approvers:
+                logger.warning("No approver e-mail addresses known; new requests are not announced")
+        rows = [
+            {**_render(event, r, note), "recipient": email}
+            for r in access_requests for email in approvers
+        ]
+    else:
+        # Decisions go to the requester
+        emails = dict(db.execute(
+            select(User.id, User.email).where(User.id.in_({r.user_id for r in access_requests}), *has_email)
+        ).all())
+        rows = [
+            {**_render(event, r, note), "recipient": emails[r.user_id]}
+            for r in access_requests if r.user_id in emails
+        ]
+
+    if rows:
+        db.execute(insert(models.NotificationOutbox), rows)
+
+
+def _message_id_domain() -> str:
+    return parseaddr(settings.SMTP_FROM)[1].rpartition("@")[2] or "localhost"
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(settings.NOTIFICATION_RETRY_SECONDS * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY_SECONDS))
+
+
+class NotificationDispatcher:
+    """Delivers due outbox rows over a reused SMTP connection"""
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def run_once(self) -> int:
+        """Deliver due notifications in batches; returns how many were sent"""
+        sent = 0
+        for _ in range(MAX_BATCHES_PER_RUN):
+            batch = self._claim_batch()
+            if not batch:
+                break
+            sent += self._deliver(batch)
+            if len(batch) < settings.NOTIFICATION_BATCH_SIZE:
+                break
+        if sent:
+            logger.info(f"Sent {sent} notification e-mails")
+        return sent
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _claim_batch(self) -> List:
+        now = datetime.utcnow()
+        Outbox = models.NotificationOutbox
+        due = (
+            select(Outbox.id)
+            .where(Outbox.status == models.NotificationStatus.PENDING, Outbox.next_attempt_at <= now)
+            .order_by(Outbox.next_attempt_at)
+            .limit(settings.NOTIFICATION_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        with SessionLocal() as db:
+            # Push the claimed rows into the future so other workers leave them alone
+            batch = db.execute(
+                update(Outbox)
+                .where(Outbox.id.in_(due))
+                .values(attempts=Outbox.attempts + 1, next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS))
+                .returning(Outbox.id, Outbox.recipient, Outbox.subject, Outbox.body, Outbox.attempts)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+        return batch
+
+    def _deliver(self, batch: List) -> int:
+        outcomes = {}
+        try:
+            self._ensure_connection()
+            for row in batch:
+                try:
+                    self._send(row)
+                    outcomes[row.id] = None
+                except smtplib.SMTPServerDisconnected:
+                    # Server dropped the idle connection between checks; reconnect once
+                    self._reconnect()
+                    self._send(row)
+                    outcomes[row.id] = None
+                except smtplib.SMTPRecipientsRefused as e:
+                    outcomes[row.id] = (f"Recipient refused: {e.recipients}", True)
+                except smtplib.SMTPResponseException as e:
+                    outcomes[row.id] = (f"{e.smtp_code} {e.smtp_error!r}", e.smtp_code >= 500)
+        except (smtplib.SMTPException, OSError) as e:
+            # Connection-level failure: everything not yet sent is retried later
+            logger.warning(f"SMTP delivery failed: {e}")
+            self.close()
+            for row in batch:
+                outcomes.setdefault(row.id, (str(e), False))
+
+        now = datetime.utcnow()
+        updates = []
+        for row in batch:
+            outcome = outcomes[row.id]
+            if outcome is None:
+                updates.append({"id": row.id, "status": models.NotificationStatus.SENT, "sent_at": now, "last_error": None})
+                continue
+            error, permanent = outcome
+            if permanent or row.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                updates.append({"id": row.id, "status": models.NotificationStatus.FAILED, "last_error": error})
+            else:
+                updates.append({"id": row.id, "next_attempt_at": now + _retry_delay(row.attempts), "last_error": error})
+
+        with SessionLocal() as db:
+            db.execute(update(models.NotificationOutbox), updates)
+            db.commit()
+        return sum(1 for outcome in outcomes.values() if outcome is None)
+
+    def _send(self, row) -> None:
+        message = EmailMessage()
+        message["From"] = settings.SMTP_FROM
+        message["To"] = row.recipient
+        message["Subject"] = row.subject
+        # Same for every attempt at this row, so a redelivery after a lost acknowledgement can be deduplicated
+        message["Message-ID"] = f"<notification-{row.id}@{_message_id_domain()}>"
+        message.set_content(row.body)
+        self._smtp.send_message(message)
+
+    def _ensure_connection(self) -> None:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._reconnect()
+
+    def _reconnect(self) -> None:
+        self.close()
+        smtp = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if settings.SMTP_STARTTLS:
+                smtp.starttls(context=ssl.create_default_context())
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+
+dispatcher = NotificationDispatcher()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        dispatcher.run_once()
+    finally:
+        dispatcher.close()
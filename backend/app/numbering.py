@@ -0,0 +1,94 @@
+"""Request number allocation.
+
+Numbers look like ``REQ-20261016-000123``: the UTC day plus a counter that
+starts at 1 each day. A worker reserves a block of
+``models.REQUEST_NUMBER_BLOCK_SIZE`` numbers for the day from
+``request_number_counters`` (one upsert, committed on a short-lived
+connection of its own: the counter row is never locked for the length of a
+request, and a request never waits on the pool for a second connection) and
+hands them out locally, so most allocations need no database round-trip and new
+numbers land at the right-hand edge of the ``request_number`` index.
+
+Numbers from one worker rise monotonically within a day. Workers draw
+separate blocks, though, so across workers numbers interleave: a request
+created later can get a lower number than one created earlier on another
+worker, and unused parts of a block leave gaps.
+"""
+
+from datetime import date, datetime
+import logging
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import models
+from app.database import connect_args
+from app.utils import generate_request_number
+
+logger = logging.getLogger(__name__)
+
+
+class RequestNumberAllocator:
+    def __init__(self, block_size: int = models.REQUEST_NUMBER_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._next = 0
+        self._end = 0
+        self._engine: Optional[Engine] = None
+
+    def allocate(self, db: Session) -> str:
+        """Return the next request number"""
+        if db.get_bind().dialect.name != "postgresql":
+            # No upsert-with-RETURNING counters here (e.g. SQLite): keep the random-suffix scheme
+            return generate_request_number()
+
+        today = datetime.utcnow().date()
+        with self._lock:
+            if self._day != today or self._next >= self._end:
+                start = self._reserve(db, today)
+                self._day, self._next, self._end = today, start, start + self.block_size
+                logger.debug(f"Reserved request numbers {start}-{self._end - 1} for {today}")
+            value = self._next
+            self._next += 1
+
+        return f"REQ-{today.strftime('%Y%m%d')}-{value:06d}"
+
+    def _reserve(self, db: Session, day: date) -> int:
+        """First number of a fresh block for the day"""
+        table = models.RequestNumberCounter
+        stmt = postgresql.insert(table).values(day=day, last_value=self.block_size)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.day],
+            set_={"last_value": table.last_value + self.block_size}
+        ).returning(table.last_value)
+        with self._counter_engine(db).connect() as conn:
+            last_value = conn.execute(stmt).scalar_one()
+            conn.commit()
+        return last_value - self.block_size + 1
+
+    def _counter_engine(self, db: Session) -> Engine:
+        """Unpooled engine on the session's database: one connection per block, outside the request pool"""
+        if self._engine is None:
+            url = db.get_bind().engine.url
+            self._engine = create_engine(url, poolclass=NullPool, connect_args=connect_args(url))
+        return self._engine
+
+    def reset(self) -> None:
+        """Drop the reserved block (a forked child must not reuse its parent's)"""
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = 0
+        self._end = 0
+
+
+request_numbers = RequestNumberAllocator()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=request_numbers.reset)
@@ -0,0 +1,287 @@
+"""On-demand profiling of single API requests.
+
+Enabled with PROFILING_ENABLED (the middleware and SQL hooks are not even
+installed otherwise). A request is profiled when an admin sends
+``X-Profile: 1``, or when it is picked by PROFILING_SAMPLE_RATE. It runs
+under cProfile while every SQL statement it issues is timed through engine
+events, and the report is written to PROFILE_DIR:
+
+* ``<id>.json``: duration, SQL statements (grouped, with timings), time per
+  component (app, sqlalchemy, pydantic, db driver, json, framework) and the
+  hottest functions
+* ``<id>.prof``: the raw call tree, for ``snakeviz`` or ``pstats``
+
+The profiled response carries ``X-Profile-Id``; admins read reports from
+``/api/admin/profiles``. One request is profiled at a time per worker;
+other requests running on the same event loop meanwhile can show up in
+its call tree.
+"""
+
+import cProfile
+from contextvars import ContextVar
+from datetime import datetime
+import io
+import json
+import logging
+import os
+from pathlib import Path
+import pstats
+import random
+import re
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import get_current_user
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Long-lived responses that can't be profiled as one request
+EXCLUDED_PATHS = ("/api/requests/events",)
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Time per component is summed from each function's own time, matched on file or builtin name
+COMPONENTS = (
+    ("db_driver", ("psycopg",)),
+    ("pydantic", ("pydantic",)),
+    ("sqlalchemy", ("sqlalchemy",)),
+    ("framework", ("fastapi", "starlette", "anyio", "uvicorn")),
+    ("json", ("orjson", "/json/")),
+    ("app", ("/app/",)),
+)
+
+# SQL statements of the request being profiled (None when not profiling)
+_sql_log: ContextVar[Optional[List[dict]]] = ContextVar("profile_sql_log", default=None)
+_sql_capture_installed = False
+_profiling = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql_log.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _sql_log.get()
+    if log is None or not conn.info.get("profile_query_start"):
+        return
+    log.append({
+        "statement": statement,
+        "duration_ms": (time.perf_counter() - conn.info["profile_query_start"].pop()) * 1000,
+        "rows": cursor.rowcount,
+        "executemany": executemany,
+    })
+
+
+def install_sql_capture() -> None:
+    """Time statements on every engine (primary and replicas) while a profile is active"""
+    global _sql_capture_installed
+    if not _sql_capture_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _sql_capture_installed = True
+
+
+def _component(filename: str, function: str) -> str:
+    name = f"{filename} {function}"
+    for component, markers in COMPONENTS:
+        if any(marker in name for marker in markers):
+            return component
+    return "other"
+
+
+def build_report(
+    profile_id: str,
+    scope: dict,
+    status_code: Optional[int],
+    trigger: str,
+    started_at: datetime,
+    duration_ms: float,
+    profile: cProfile.Profile,
+    statements: List[dict]
+) -> dict:
+    stats = pstats.Stats(profile)
+
+    components = {}
+    for (filename, _, function), (_, _, own_time, _, _) in stats.stats.items():
+        component = _component(filename, function)
+        components[component] = components.get(component, 0.0) + own_time * 1000
+
+    grouped = {}
+    for statement in statements:
+        entry = grouped.setdefault(statement["statement"], {"statement": statement["statement"], "count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += statement["duration_ms"]
+
+    listing = io.StringIO()
+    pstats.Stats(profile, stream=listing).sort_stats("cumulative").print_stats(60)
+    by_own_time = io.StringIO()
+    pstats.Stats(profile, stream=by_own_time).sort_stats("tottime").print_stats(30)
+
+    return {
+        "id": profile_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query_string": scope.get("query_string", b"").decode("latin-1"),
+        "status_code": status_code,
+        "trigger": trigger,
+        "started_at": started_at.isoformat(),
+        "duration_ms": round(duration_ms, 2),
+        "sql": {
+            "count": len(statements),
+            "total_ms": round(sum(s["duration_ms"] for s in statements), 2),
+            "statements": sorted(grouped.values(), key=lambda s: s["total_ms"], reverse=True),
+            "timeline": statements,
+        },
+        "components_ms": {name: round(ms, 2) for name, ms in sorted(components.items(), key=lambda c: -c[1])},
+        "cumulative": listing.getvalue(),
+        "own_time": by_own_time.getvalue(),
+    }
+
+
+class ProfileStore:
+    """Reports on disk, shared by the workers of one host; keeps the newest PROFILE_KEEP"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def save(self, report: dict, profile: cProfile.Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(str(self.directory / f"{report['id']}.prof"))
+        (self.directory / f"{report['id']}.json").write_text(json.dumps(report, default=str))
+        self._prune()
+
+    def list(self) -> List[dict]:
+        summaries = []
+        for path in self._reports():
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            summaries.append({
+                key: report.get(key)
+                for key in ("id", "method", "path", "status_code", "trigger", "started_at", "duration_ms")
+            } | {"sql_count": report.get("sql", {}).get("count")})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        path = self.path(profile_id, "json")
+        if path is None:
+            return None
+        return json.loads(path.read_text())
+
+    def path(self, profile_id: str, suffix: str) -> Optional[Path]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.{suffix}"
+        return path if path.exists() else None
+
+    def _reports(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        for path in self._reports()[settings.PROFILE_KEEP:]:
+            for stale in (path, path.with_suffix(".prof")):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+
+store = ProfileStore(settings.PROFILE_DIR)
+
+
+def _build_and_save(
+    profile_id: str,
+    scope: dict,
+    status_code: Optional[int],
+    trigger: str,
+    started_at: datetime,
+    duration_ms: float,
+    profile: cProfile.Profile,
+    statements: List[dict]
+) -> None:
+    report = build_report(profile_id, scope, status_code, trigger, started_at, duration_ms, profile, statements)
+    store.save(report, profile)
+
+
+async def _is_admin(scope) -> bool:
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await get_current_user(None, HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+    except Exception:
+        return False
+    return "admin" in user.get("roles", [])
+
+
+class ProfilingMiddleware:
+    """Profiles requests asked for by an admin (X-Profile: 1) or sampled"""
+
+    def __init__(self, app):
+        self.app = app
+        install_sql_capture()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _profiling or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        if dict(scope["headers"]).get(PROFILE_HEADER) in (b"1", b"true"):
+            if await _is_admin(scope):
+                trigger = "header"
+        elif settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+            trigger = "sample"
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self._profile(scope, receive, send, trigger)
+
+    async def _profile(self, scope, receive, send, trigger: str) -> None:
+        global _profiling
+        profile_id = uuid.uuid4().hex
+        status_code = None
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        statements: List[dict] = []
+        sql_token = _sql_log.set(statements)
+        profile = cProfile.Profile()
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        _profiling = True
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            _profiling = False
+            _sql_log.reset(sql_token)
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                # pstats parsing and the file writes both stay off the event loop
+                await run_in_threadpool(
+                    _build_and_save, profile_id, scope, status_code, trigger, started_at, duration_ms, profile, statements
+                )
+                logger.info(f"Profiled {scope['method']} {scope['path']} in {duration_ms:.1f} ms: {profile_id}")
+            except Exception as e:
+                logger.error(f"Could not store profile {profile_id}: {e}")
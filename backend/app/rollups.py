@@ -0,0 +1,95 @@
+"""Request activity rollup backfill: ``python -m app.rollups [YYYY-MM-DD]``.
+
+``request_activity_rollups`` is kept current by the AccessRequestCRUD
+mutation paths, in the same transaction as each change. This job rebuilds
+it from ``access_requests`` and its archive (from the given UTC day, or
+entirely) after the table is first created or whenever it needs repairing.
+
+On PostgreSQL the rebuild takes an EXCLUSIVE lock on the rollup table, so
+live increments wait for it and are neither lost nor counted twice; reads
+of the dashboard carry on meanwhile. It reads from one REPEATABLE READ
+snapshot, so requests being archived meanwhile are counted exactly once.
+"""
+
+from datetime import date
+import logging
+import sys
+from typing import Optional
+
+from sqlalchemy import delete, func, select, text
+
+from app import crud, models
+from app.database import locked_session
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LOCK_KEY = 7100440
+# Increments per INSERT statement (bounded bind parameter count)
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def _utc_day(column, dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def _seconds_between(start, end, dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def _as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def backfill(since: Optional[date] = None) -> int:
+    """Recompute rollups from ``since`` (inclusive); returns buckets written"""
+    with locked_session(ROLLUP_LOCK_KEY) as db:
+        if db is None:
+            logger.info("Rollup backfill already running elsewhere")
+            return 0
+
+        dialect_name = db.get_bind().dialect.name
+        if dialect_name == "postgresql":
+            db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+            db.execute(text("LOCK TABLE request_activity_rollups IN EXCLUSIVE MODE"))
+
+        events = []
+        # Archived requests still count towards the history
+        for AccessRequest in (models.AccessRequest, models.ArchivedAccessRequest):
+            for column, counter in (
+                (AccessRequest.created_at, "created_count"),
+                (AccessRequest.approved_at, "approved_count"),
+                (AccessRequest.rejected_at, "rejected_count"),
+            ):
+                day = _utc_day(column, dialect_name)
+                columns = [day, AccessRequest.protocol, func.count()]
+                if counter == "approved_count":
+                    columns.append(func.sum(_seconds_between(AccessRequest.created_at, column, dialect_name)))
+                stmt = select(*columns).where(column.isnot(None)).group_by(day, AccessRequest.protocol)
+                if since:
+                    stmt = stmt.where(day >= since)
+                for row in db.execute(stmt):
+                    delta = {"bucket_date": _as_date(row[0]), "protocol": row[1], counter: row[2]}
+                    if counter == "approved_count":
+                        delta["approval_latency_seconds"] = float(row[3] or 0)
+                    events.append(delta)
+
+        stale = delete(models.RequestActivityRollup)
+        if since:
+            stale = stale.where(models.RequestActivityRollup.bucket_date >= since)
+        db.execute(stale)
+        for start in range(0, len(events), BACKFILL_CHUNK_SIZE):
+            crud.RequestActivityRollupCRUD.bump(db, events[start:start + BACKFILL_CHUNK_SIZE])
+        db.commit()
+
+        buckets = len({(e["bucket_date"], e["protocol"]) for e in events})
+        logger.info(f"Rebuilt {buckets} request activity buckets" + (f" since {since}" if since else ""))
+        return buckets
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    backfill(date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from typing import Optional
 
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import get_db, get_read_db, get_engine, get_replica_engines, pool_status, LazySessionRoute
 from app.auth import get_admin_user
+from app.admission import controller as admission_controller
+from app.audit import AuditService
+from app.config import settings
+from app.profiling import store as profile_store
 
-router = APIRouter()
+router = APIRouter(route_class=LazySessionRoute)
 
 
 @router.get("/users", response_model=list[schemas.User])
 async def get_all_users(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: dict = Depends(get_admin_user()),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100)
@@ -24,6 +32,7 @@ async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
     db: Session = Depends(get_db),
+    request: Request = Request,
     admin_user: dict = Depends(get_admin_user())
 ):
     """Update user (admin only)"""
@@ -31,32 +40,136 @@ async def update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    changes = AuditService.diff(user, user_update.model_dump(exclude_unset=True))
     updated = crud.UserCRUD.update(db, user_id, user_update)
+    
+    if changes:
+        admin = crud.UserCRUD.get_by_keycloak_id(db, admin_user.get("sub"))
+        AuditService.log_action(
+            db, admin.id if admin else None, "updated", "user",
+            updated.username,
+            f"Updated user",
+            request,
+            changes=changes
+        )
     return updated
 
 
 @router.get("/stats")
 async def get_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_user: dict = Depends(get_admin_user())
 ):
-    """Get portal statistics (admin only)"""
+    """Get portal statistics (admin only); archived requests are included"""
     total_users = db.query(models.User).count()
-    total_requests = db.query(models.AccessRequest).count()
-    pending_requests = db.query(models.AccessRequest).filter(
-        models.AccessRequest.status == models.RequestStatus.PENDING_APPROVAL
-    ).count()
-    approved_requests = db.query(models.AccessRequest).filter(
-        models.AccessRequest.status == models.RequestStatus.APPROVED
-    ).count()
-    rejected_requests = db.query(models.AccessRequest).filter(
-        models.AccessRequest.status == models.RequestStatus.REJECTED
-    ).count()
+    by_status = crud.AccessRequestCRUD.count_by_status(db)
     
     return schemas.Stats(
         total_users=total_users,
-        total_requests=total_requests,
-        pending_requests=pending_requests,
-        approved_requests=approved_requests,
-        rejected_requests=rejected_requests
+        total_requests=sum(by_status.values()),
+        pending_requests=by_status.get(models.RequestStatus.PENDING_APPROVAL, 0),
+        approved_requests=by_status.get(models.RequestStatus.APPROVED, 0),
+        rejected_requests=by_status.get(models.RequestStatus.REJECTED, 0)
+    )
+
+
+# Longest range one timeseries call may cover
+MAX_TIMESERIES_DAYS = 731
+
+
+@router.get("/stats/timeseries", response_model=schemas.ActivityTimeseries)
+async def get_stats_timeseries(
+    granularity: schemas.Granularity = schemas.Granularity.DAY,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    protocol: Optional[schemas.Protocol] = None,
+    db: Session = Depends(get_read_db),
+    admin_user: dict = Depends(get_admin_user())
+):
+    """Get created/approved/rejected trends and approval latency by protocol (admin only)"""
+    end = end or datetime.utcnow().date()
+    if granularity == schemas.Granularity.WEEK:
+        start = start or end - timedelta(weeks=12)
+        # Whole ISO weeks, Monday first
+        start -= timedelta(days=start.weekday())
+    else:
+        start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days > MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_TIMESERIES_DAYS} days")
+    
+    rollups = crud.RequestActivityRollupCRUD.get_range(
+        db, start, end, models.Protocol(protocol.value) if protocol else None
+    )
+    
+    totals = {}
+    for rollup in rollups:
+        period = rollup.bucket_date
+        if granularity == schemas.Granularity.WEEK:
+            period -= timedelta(days=period.weekday())
+        bucket = totals.setdefault((period, rollup.protocol), [0, 0, 0, 0.0])
+        bucket[0] += rollup.created_count
+        bucket[1] += rollup.approved_count
+        bucket[2] += rollup.rejected_count
+        bucket[3] += rollup.approval_latency_seconds
+    
+    return schemas.ActivityTimeseries(
+        granularity=granularity,
+        start=start,
+        end=end,
+        buckets=[
+            schemas.ActivityBucket(
+                period_start=period,
+                protocol=protocol_.value,
+                created=created,
+                approved=approved,
+                rejected=rejected,
+                avg_approval_latency_seconds=latency / approved if approved else None
+            )
+            for (period, protocol_), (created, approved, rejected, latency)
+            in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1].value))
+        ]
     )
+
+
+@router.get("/pool")
+async def get_pool_status(
+    admin_user: dict = Depends(get_admin_user())
+):
+    """Get live connection pool and admission statistics for this worker (admin only)"""
+    return {
+        "primary": pool_status(get_engine()),
+        "replicas": [pool_status(engine) for engine in get_replica_engines()],
+        "admission": admission_controller.status() if settings.ADMISSION_ENABLED else None
+    }
+
+
+@router.get("/profiles")
+async def list_profiles(
+    admin_user: dict = Depends(get_admin_user())
+):
+    """List stored request profiles, newest first (admin only)"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return await run_in_threadpool(profile_store.list)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    download: bool = False,
+    admin_user: dict = Depends(get_admin_user())
+):
+    """Get a request profile report, or its raw cProfile data with download=true (admin only)"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if download:
+        path = profile_store.path(profile_id, "prof")
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    report = await run_in_threadpool(profile_store.get, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+import ipaddress
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
-from app.database import get_db
-from app.auth import get_current_user
+from app.database import get_read_db, LazySessionRoute
+from app.auth import get_current_user, get_admin_user
 
-router = APIRouter()
+router = APIRouter(route_class=LazySessionRoute)
 
 
 @router.get("/", response_model=list[schemas.AuditLog])
 async def get_audit_logs(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100)
@@ -22,3 +24,31 @@ async def get_audit_logs(
         return crud.AuditLogCRUD.get_by_user(db, user.id, skip, limit)
     
     return crud.AuditLogCRUD.get_all(db, skip, limit)
+
+
+@router.get("/changes", response_model=list[schemas.AuditLog])
+async def search_audit_changes(
+    field: str = Query(..., min_length=1, max_length=64),
+    access_request_id: Optional[int] = None,
+    resource_type: Optional[str] = None,
+    network: Optional[str] = Query(None, description="CIDR the old or new value must fall in"),
+    db: Session = Depends(get_read_db),
+    admin_user: dict = Depends(get_admin_user()),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100)
+):
+    """Find audit entries that changed a field (admin only)"""
+    if network:
+        if field not in crud.AuditLogCRUD.NETWORK_FIELDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"network filter only applies to {sorted(crud.AuditLogCRUD.NETWORK_FIELDS)}"
+            )
+        try:
+            network = str(ipaddress.ip_network(network, strict=False))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid network")
+    
+    return crud.AuditLogCRUD.search_changes(
+        db, field, access_request_id, resource_type, network, skip, limit
+    )
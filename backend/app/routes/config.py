@@ -2,10 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import get_db, LazySessionRoute
 from app.auth import get_admin_user, get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=LazySessionRoute)
 
 
 @router.get("/public")
@@ -1 +0,0 @@
-# Migrations package
@@ -1,14 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
 
 from app import crud, schemas, models
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db, LazySessionRoute
 from app.auth import get_current_user, get_approver_user
 from app.audit import AuditService
-from app.utils import get_ip_from_request
+from app.events import broadcaster
+from app.utils import get_ip_from_request, get_user_agent
 
-router = APIRouter()
+router = APIRouter(route_class=LazySessionRoute)
+
+
+def default_expiry() -> Optional[datetime]:
+    """Expiry for approvals that don't set one (ACCESS_DEFAULT_TTL_DAYS)"""
+    if settings.ACCESS_DEFAULT_TTL_DAYS <= 0:
+        return None
+    return datetime.utcnow() + timedelta(days=settings.ACCESS_DEFAULT_TTL_DAYS)
 
 
 @router.post("/", response_model=schemas.AccessRequest)
@@ -46,10 +59,15 @@ async def create_access_request(
 
 @router.get("/", response_model=schemas.SearchResults)
 async def get_access_requests(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user),
     query: Optional[str] = Query(None),
     status: Optional[models.RequestStatus] = Query(None),
+    text_query: Optional[str] = Query(
+        None, alias="text", max_length=200,
+        description="Full-text search over description and business justification"
+    ),
+    include_archived: bool = Query(False, description="Also search archived (old rejected/closed) requests"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100)
 ):
@@ -60,32 +78,150 @@ async def get_access_requests(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Rows come back as plain dicts, rendered straight by orjson
+    requests, total = crud.AccessRequestCRUD.search_rows(
+        db, query, status, skip, limit, text_query, include_archived
+    )
+    
     # Admins and approvers see all requests
-    if "admin" in current_user.get("roles", []) or "approver" in current_user.get("roles", []):
-        requests, total = crud.AccessRequestCRUD.search(db, query, status, skip, limit)
-    else:
+    if "admin" not in current_user.get("roles", []) and "approver" not in current_user.get("roles", []):
         # Regular users only see their own requests
-        requests, total = crud.AccessRequestCRUD.search(db, query, status, skip, limit)
-        requests = [r for r in requests if r.user_id == user.id]
+        requests = [r for r in requests if r["user"]["id"] == user.id]
         total = len(requests)
     
-    return schemas.SearchResults(
-        requests=requests,
-        total=total,
-        page=skip // limit,
-        page_size=limit
+    results = {
+        "requests": requests,
+        "total": total,
+        "page": skip // limit,
+        "page_size": limit
+    }
+    if settings.LIST_VALIDATE_ROWS:
+        schemas.SearchResultsAdapter.validate_python(results)
+    
+    return ORJSONResponse(content=results)
+
+
+@router.post("/bulk-decision", response_model=schemas.BulkDecisionResult)
+async def bulk_decide_access_requests(
+    decision: schemas.AccessRequestBulkDecision,
+    db: Session = Depends(get_db),
+    request: Request = Request,
+    current_user: dict = Depends(get_approver_user())
+):
+    """Approve or reject many access requests at once"""
+    
+    if decision.decision == schemas.BulkDecision.REJECT and not decision.comment:
+        raise HTTPException(status_code=400, detail="A rejection reason is required")
+    
+    user = crud.UserCRUD.get_by_keycloak_id(db, current_user.get("sub"))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    results = crud.AccessRequestCRUD.bulk_decide(
+        db, decision.request_ids, user.id, decision.decision, decision.comment,
+        get_ip_from_request(request), get_user_agent(request),
+        decision.expires_at or default_expiry()
+    )
+    decided = sum(1 for r in results if r["outcome"] in ("approved", "rejected"))
+    
+    return schemas.BulkDecisionResult(
+        decided=decided,
+        skipped=len(results) - decided,
+        results=results
+    )
+
+
+@router.post("/queue/claim", response_model=schemas.ClaimedRequests)
+async def claim_access_requests(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_approver_user()),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Lease the next unclaimed requests to the calling approver"""
+    
+    user = crud.UserCRUD.get_by_keycloak_id(db, current_user.get("sub"))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    requests, lease_expires_at = crud.AccessRequestCRUD.claim_next(
+        db, user.id, limit, settings.APPROVAL_LEASE_SECONDS
+    )
+    
+    return schemas.ClaimedRequests(requests=requests, lease_expires_at=lease_expires_at)
+
+
+@router.post("/{request_id}/release")
+async def release_access_request(
+    request_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_approver_user())
+):
+    """Release the calling approver's lease on a request"""
+    
+    user = crud.UserCRUD.get_by_keycloak_id(db, current_user.get("sub"))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if not crud.AccessRequestCRUD.release(db, request_id, user.id):
+        raise HTTPException(status_code=404, detail="No lease held on this request")
+    
+    return {"message": "Lease released"}
+
+
+@router.get("/events")
+async def stream_request_events(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream request created/approved/rejected events (Server-Sent Events)"""
+    
+    user = crud.UserCRUD.get_by_keycloak_id(db, current_user.get("sub"))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    roles = current_user.get("roles", [])
+    sees_all = "admin" in roles or "approver" in roles
+    user_id = user.id
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.close()
+    
+    queue = broadcaster.subscribe()
+    
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                event = json.loads(payload)
+                # Regular users only hear about their own requests
+                if not sees_all and event["user_id"] != user_id:
+                    continue
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
 @router.get("/{request_id}", response_model=schemas.AccessRequest)
 async def get_access_request(
     request_id: int,
-    db: Session = Depends(get_db),
+    include_archived: bool = Query(False),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get specific access request"""
     
-    access_request = crud.AccessRequestCRUD.get_by_id(db, request_id)
+    access_request = crud.AccessRequestCRUD.get_by_id(db, request_id, include_archived)
     if not access_request:
         raise HTTPException(status_code=404, detail="Request not found")
     
@@ -121,6 +257,7 @@ async def update_access_request(
     if access_request.status != models.RequestStatus.CREATED:
         raise HTTPException(status_code=400, detail="Can only update requests in CREATED status")
     
+    changes = AuditService.diff(access_request, request_update.model_dump(exclude_unset=True))
     updated = crud.AccessRequestCRUD.update(db, request_id, request_update)
     
     # Log action
@@ -128,7 +265,8 @@ async def update_access_request(
         db, user.id, "updated", "access_request",
         access_request.request_number,
         f"Updated access request",
-        request, request_id
+        request, request_id,
+        changes=changes
     )
     
     return updated
@@ -153,16 +291,30 @@ async def approve_access_request(
     if access_request.status != models.RequestStatus.CREATED:
         raise HTTPException(status_code=400, detail="Can only approve requests in CREATED status")
     
+    if crud.AccessRequestCRUD.is_claimed_by_other(access_request, user.id):
+        raise HTTPException(status_code=409, detail="Request is claimed by another approver")
+    
+    expires_at = approval.expires_at or default_expiry()
+    changes = AuditService.diff(access_request, {
+        "status": models.RequestStatus.APPROVED,
+        "approver_id": user.id,
+        "approval_comment": approval.approval_comment,
+        "expires_at": expires_at,
+    })
+    
     # First move to pending approval
     access_request.status = models.RequestStatus.PENDING_APPROVAL
     db.commit()
     
     # Then approve
-    approved = crud.AccessRequestCRUD.approve(db, request_id, user.id, approval.approval_comment)
+    approved = crud.AccessRequestCRUD.approve(
+        db, request_id, user.id, approval.approval_comment, expires_at
+    )
     
     # Log action
     AuditService.log_request_approved(
-        db, user.id, request_id, access_request.request_number, request
+        db, user.id, request_id, access_request.request_number, request,
+        changes=changes
     )
     
     return approved
@@ -187,12 +339,21 @@ async def reject_access_request(
     if access_request.status != models.RequestStatus.CREATED:
         raise HTTPException(status_code=400, detail="Can only reject requests in CREATED status")
     
+    if crud.AccessRequestCRUD.is_claimed_by_other(access_request, user.id):
+        raise HTTPException(status_code=409, detail="Request is claimed by another approver")
+    
+    changes = AuditService.diff(access_request, {
+        "status": models.RequestStatus.REJECTED,
+        "approver_id": user.id,
+        "rejection_reason": rejection.rejection_reason,
+    })
     rejected = crud.AccessRequestCRUD.reject(db, request_id, user.id, rejection.rejection_reason)
     
     # Log action
     AuditService.log_request_rejected(
         db, user.id, request_id, access_request.request_number,
-        rejection.rejection_reason, request
+        rejection.rejection_reason, request,
+        changes=changes
     )
     
     return rejected
@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app import crud, schemas
-from app.database import get_db
+from app.database import get_db, get_read_db, LazySessionRoute
 from app.auth import get_current_user
+from app.audit import AuditService
 
-router = APIRouter()
+router = APIRouter(route_class=LazySessionRoute)
 
 
 @router.get("/profile", response_model=schemas.User)
 async def get_user_profile(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get current user profile"""
@@ -24,6 +25,7 @@ async def get_user_profile(
 async def update_user_profile(
     user_update: schemas.UserUpdate,
     db: Session = Depends(get_db),
+    request: Request = Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Update current user profile"""
@@ -31,5 +33,15 @@ async def update_user_profile(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    changes = AuditService.diff(user, user_update.model_dump(exclude_unset=True))
     updated = crud.UserCRUD.update(db, user.id, user_update)
+    
+    if changes:
+        AuditService.log_action(
+            db, user.id, "updated", "user",
+            updated.username,
+            f"Updated profile",
+            request,
+            changes=changes
+        )
     return updated
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -73,8 +73,8 @@ class AccessRequestBase(BaseModel):
         # Basic IP validation
         import ipaddress
         try:
-            ipaddress.ip_address(v)
-            return v
+            # Stored in canonical form, so searches can compare text
+            return str(ipaddress.ip_address(v))
         except ValueError:
             raise ValueError('Invalid IP address')
 
@@ -91,15 +91,54 @@ class AccessRequestUpdate(BaseModel):
     description: Optional[str] = None
     business_justification: Optional[str] = None
 
+    @validator('destination_ip')
+    def validate_ip(cls, v):
+        if v is None:
+            return v
+        import ipaddress
+        try:
+            # Stored in canonical form, so searches can compare text
+            return str(ipaddress.ip_address(v))
+        except ValueError:
+            raise ValueError('Invalid IP address')
+
 
 class AccessRequestApprove(BaseModel):
     approval_comment: Optional[str] = None
+    # When the granted access ends; defaults to ACCESS_DEFAULT_TTL_DAYS from approval
+    expires_at: Optional[datetime] = None
 
 
 class AccessRequestReject(BaseModel):
     rejection_reason: str
 
 
+class BulkDecision(str, Enum):
+    APPROVE = "approve"
+    REJECT = "reject"
+
+
+class AccessRequestBulkDecision(BaseModel):
+    request_ids: List[int] = Field(..., min_length=1, max_length=500)
+    decision: BulkDecision
+    # Approval comment, or the rejection reason (required when rejecting)
+    comment: Optional[str] = None
+    expires_at: Optional[datetime] = None
+
+
+class BulkDecisionOutcome(BaseModel):
+    request_id: int
+    outcome: str
+    request_number: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class BulkDecisionResult(BaseModel):
+    decided: int
+    skipped: int
+    results: List[BulkDecisionOutcome]
+
+
 class AccessRequest(AccessRequestBase):
     id: int
     request_number: str
@@ -112,6 +151,11 @@ class AccessRequest(AccessRequestBase):
     updated_at: datetime
     approved_at: Optional[datetime]
     rejected_at: Optional[datetime]
+    expires_at: Optional[datetime] = None
+    claimed_by_id: Optional[int] = None
+    claim_expires_at: Optional[datetime] = None
+    # Set when served from the archive (include_archived=true)
+    archived_at: Optional[datetime] = None
     user: User
     approver: Optional[User]
 
@@ -137,6 +181,11 @@ class AccessRequestList(BaseModel):
         from_attributes = True
 
 
+class ClaimedRequests(BaseModel):
+    requests: List[AccessRequestList]
+    lease_expires_at: datetime
+
+
 class AuditLogBase(BaseModel):
     action: str
     resource_type: str
@@ -147,13 +196,16 @@ class AuditLogBase(BaseModel):
 
 class AuditLog(AuditLogBase):
     id: int
-    user_id: int
+    # None for entries written by background jobs (e.g. expiry)
+    user_id: Optional[int]
     access_request_id: Optional[int]
+    archived_access_request_id: Optional[int] = None
     old_value: Optional[str]
     new_value: Optional[str]
+    changes: Optional[dict] = None
     user_agent: str
     created_at: datetime
-    user: User
+    user: Optional[User]
 
     class Config:
         from_attributes = True
@@ -190,9 +242,34 @@ class SearchResults(BaseModel):
     page_size: int
 
 
+# Built once at import; validating list pages against it avoids per-call schema setup
+SearchResultsAdapter = TypeAdapter(SearchResults)
+
+
 class Stats(BaseModel):
     total_requests: int
     pending_requests: int
     approved_requests: int
     rejected_requests: int
     total_users: int
+
+
+class Granularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
+
+class ActivityBucket(BaseModel):
+    period_start: date
+    protocol: Protocol
+    created: int
+    approved: int
+    rejected: int
+    avg_approval_latency_seconds: Optional[float] = None
+
+
+class ActivityTimeseries(BaseModel):
+    granularity: Granularity
+    start: date
+    end: date
+    buckets: List[ActivityBucket]
@@ -0,0 +1,200 @@
+"""Search query planning.
+
+Classifies the free-form ``query`` of the request search into a shape we can
+answer with an index (exact or partial request number, IP address or
+prefix, CIDR, ``host:port``, hostname) and builds the matching filter. Only
+input that fits none of these falls through to the ``ILIKE '%q%'`` scan.
+
+Free text in ``description`` and ``business_justification`` is searched
+separately (``text_search``) through the ``search_vector`` tsvector column.
+"""
+
+import enum
+import ipaddress
+import re
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, cast, func, or_
+from sqlalchemy.dialects.postgresql import CIDR, INET, REGCONFIG
+
+from app import models
+
+
+class QueryKind(str, enum.Enum):
+    REQUEST_NUMBER = "request_number"
+    REQUEST_NUMBER_PREFIX = "request_number_prefix"
+    IP = "ip"
+    IP_PREFIX = "ip_prefix"
+    CIDR = "cidr"
+    HOST_PORT = "host_port"
+    HOSTNAME = "hostname"
+    TEXT = "text"
+
+
+class SearchPlan(NamedTuple):
+    kind: QueryKind
+    value: str
+    port: Optional[int] = None
+
+
+_REQUEST_NUMBER = re.compile(r"^REQ-\d{8}-(?:[0-9A-F]{8}|\d{6,})$")
+_REQUEST_NUMBER_PREFIX = re.compile(r"^REQ(?:-\d{0,8}(?:-[0-9A-F]*)?)?$")
+_IPV4_PREFIX = re.compile(r"^\d{1,3}\.(?:\d{1,3}\.){0,2}\d{0,3}$")
+_HOST_PORT = re.compile(r"^(?:\[(?P<ip6>[0-9A-Fa-f:.]+)\]|(?P<host>[A-Za-z0-9.-]+)):(?P<port>\d{1,5})$")
+_HOSTNAME = re.compile(r"^(?=.{1,253}$)(?=.*[A-Za-z])[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+\.?$")
+
+
+def classify(query: str) -> SearchPlan:
+    """Work out which kind of lookup a search query asks for"""
+    q = query.strip()
+
+    upper = q.upper()
+    if _REQUEST_NUMBER.match(upper):
+        return SearchPlan(QueryKind.REQUEST_NUMBER, upper)
+    if _REQUEST_NUMBER_PREFIX.match(upper):
+        return SearchPlan(QueryKind.REQUEST_NUMBER_PREFIX, upper)
+
+    try:
+        return SearchPlan(QueryKind.IP, str(ipaddress.ip_address(q)))
+    except ValueError:
+        pass
+
+    if "/" in q:
+        try:
+            return SearchPlan(QueryKind.CIDR, str(ipaddress.ip_network(q, strict=False)))
+        except ValueError:
+            pass
+
+    if _IPV4_PREFIX.match(q):
+        return SearchPlan(QueryKind.IP_PREFIX, q)
+
+    match = _HOST_PORT.match(q)
+    if match and int(match.group("port")) <= 65535:
+        host = match.group("ip6") or match.group("host")
+        try:
+            host = str(ipaddress.ip_address(host))
+        except ValueError:
+            host = host.lower()
+        return SearchPlan(QueryKind.HOST_PORT, host, int(match.group("port")))
+
+    if _HOSTNAME.match(q):
+        # Hostnames are case-insensitive; the filter lower-cases the column too
+        return SearchPlan(QueryKind.HOSTNAME, q.rstrip(".").lower())
+
+    return SearchPlan(QueryKind.TEXT, q)
+
+
+def build_filter(plan: SearchPlan, dialect_name: str, entity=None):
+    """Translate a plan into a WHERE clause on models.AccessRequest (or ``entity``, e.g. the archive)"""
+    AccessRequest = entity or models.AccessRequest
+
+    if plan.kind == QueryKind.REQUEST_NUMBER:
+        return AccessRequest.request_number == plan.value
+
+    if plan.kind == QueryKind.REQUEST_NUMBER_PREFIX:
+        return AccessRequest.request_number.like(f"{plan.value}%")
+
+    if plan.kind == QueryKind.IP:
+        return or_(
+            _ip_equals(AccessRequest.source_ip, plan.value, dialect_name),
+            _ip_equals(AccessRequest.destination_ip, plan.value, dialect_name)
+        )
+
+    if plan.kind == QueryKind.IP_PREFIX:
+        return or_(
+            AccessRequest.source_ip.like(f"{plan.value}%"),
+            AccessRequest.destination_ip.like(f"{plan.value}%")
+        )
+
+    if plan.kind == QueryKind.CIDR:
+        if dialect_name == "postgresql":
+            network = cast(plan.value, CIDR)
+            return or_(
+                func.safe_inet(AccessRequest.source_ip).op("<<=")(network),
+                func.safe_inet(AccessRequest.destination_ip).op("<<=")(network)
+            )
+        return _cidr_prefix_filter(plan.value, AccessRequest)
+
+    if plan.kind == QueryKind.HOST_PORT:
+        try:
+            ipaddress.ip_address(plan.value)
+            host_match = _ip_equals(AccessRequest.destination_ip, plan.value, dialect_name)
+        except ValueError:
+            host_match = func.lower(AccessRequest.destination_hostname) == plan.value
+        return host_match & (AccessRequest.port == plan.port)
+
+    if plan.kind == QueryKind.HOSTNAME:
+        return func.lower(AccessRequest.destination_hostname).like(f"{plan.value}%")
+
+    return or_(
+        AccessRequest.request_number.ilike(f"%{plan.value}%"),
+        AccessRequest.source_ip.ilike(f"%{plan.value}%"),
+        AccessRequest.destination_ip.ilike(f"%{plan.value}%")
+    )
+
+
+# Must match the configuration of the search_vector generated column (migration 0006).
+# 'simple' does no stemming or stop words, so ticket IDs and non-English text match as written.
+TEXT_SEARCH_CONFIG = "simple"
+
+
+def text_search(text_query: str, dialect_name: str, entity=None) -> Tuple[object, Optional[object]]:
+    """WHERE clause and ranking expression for a full-text query.
+
+    PostgreSQL accepts web-search syntax ("quoted phrases", OR, -excluded)
+    and ranks with ts_rank. Elsewhere every word must appear in either field
+    (ILIKE) and there is no ranking; so does the archive, which has no
+    search_vector.
+    """
+    AccessRequest = entity or models.AccessRequest
+
+    if dialect_name == "postgresql" and hasattr(AccessRequest, "search_vector"):
+        tsquery = func.websearch_to_tsquery(cast(TEXT_SEARCH_CONFIG, REGCONFIG), text_query)
+        return AccessRequest.search_vector.op("@@")(tsquery), func.ts_rank(AccessRequest.search_vector, tsquery)
+
+    terms = [term.strip('"') for term in text_query.split()]
+    return and_(*[
+        or_(
+            AccessRequest.description.ilike(f"%{term}%"),
+            AccessRequest.business_justification.ilike(f"%{term}%")
+        )
+        for term in terms if term
+    ]), None
+
+
+def _ip_equals(column, value: str, dialect_name: str):
+    """Column holds the address ``value`` (canonical form, as classify returns it).
+
+    IPv4 text is canonical, so it is compared as text on the plain index.
+    IPv6 has many spellings (2001:DB8::0001 is 2001:db8::1) and rows stored
+    before addresses were normalised on write may use any of them, so on
+    PostgreSQL it is compared as inet through the safe_inet index.
+    """
+    if dialect_name == "postgresql" and ipaddress.ip_address(value).version == 6:
+        return func.safe_inet(column) == cast(value, INET)
+    return column == value
+
+
+def _cidr_prefix_filter(value: str, AccessRequest):
+    """CIDR match without inet support: prefix on the enclosing whole-octet network.
+
+    Exact for /8, /16, /24 and /32; other IPv4 prefix lengths match a
+    superset. IPv6 networks only match their network address.
+    """
+    network = ipaddress.ip_network(value)
+    if network.version != 4:
+        return or_(
+            AccessRequest.source_ip == str(network.network_address),
+            AccessRequest.destination_ip == str(network.network_address)
+        )
+    if network.prefixlen == 32:
+        return or_(
+            AccessRequest.source_ip == str(network.network_address),
+            AccessRequest.destination_ip == str(network.network_address)
+        )
+    octets = str(network.network_address).split(".")[:network.prefixlen // 8]
+    prefix = ".".join(octets) + "." if octets else ""
+    return or_(
+        AccessRequest.source_ip.like(f"{prefix}%"),
+        AccessRequest.destination_ip.like(f"{prefix}%")
+    )
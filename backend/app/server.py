@@ -0,0 +1,97 @@
+"""Production server: ``python -m app.server``.
+
+Runs the API under gunicorn with uvicorn workers (uvloop + httptools). The
+app is imported and warmed up once in the master before forking, so workers
+share that memory copy-on-write, and SIGTERM drains in-flight requests for
+up to GRACEFUL_TIMEOUT seconds before workers exit.
+
+For local development keep using ``uvicorn app.main:app --reload``.
+"""
+
+import logging
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.config import settings
+from app.database import get_engine, get_replica_engines, reset_replica_cycle
+
+logger = logging.getLogger(__name__)
+
+
+class PortalUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+def worker_count() -> int:
+    """Workers to run: WEB_CONCURRENCY, else the smaller of the CPU and DB budgets"""
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+
+    by_cpu = 2 * multiprocessing.cpu_count() + 1
+    # Each worker can hold a full pool plus its request-events LISTEN and health check connections
+    per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW + 2
+    by_db = settings.DB_MAX_CONNECTIONS // per_worker
+    return max(1, min(by_cpu, by_db))
+
+
+def warm_up(app) -> None:
+    """Do one-off work in the master so every worker inherits it"""
+    # Build and cache the OpenAPI schema (walks every route and model)
+    app.openapi()
+
+    if settings.VERIFY_TOKEN_SIGNATURE:
+        from app.auth import jwks_cache
+        try:
+            jwks_cache.refresh_sync()
+        except Exception as e:
+            # Workers fetch the keys on demand instead
+            logger.warning(f"JWKS warm-up failed: {e}")
+
+
+def post_fork(server, worker) -> None:
+    """Never share pooled DB connections across processes"""
+    if get_engine.cache_info().currsize:
+        get_engine().dispose(close=False)
+    if get_replica_engines.cache_info().currsize:
+        for engine in get_replica_engines():
+            engine.dispose(close=False)
+    reset_replica_cycle()
+
+
+class PortalServer(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        warm_up(app)
+        return app
+
+
+def main() -> None:
+    workers = worker_count()
+    logger.info(f"Starting {workers} workers on {settings.BACKEND_HOST}:{settings.BACKEND_PORT}")
+    PortalServer({
+        "bind": f"{settings.BACKEND_HOST}:{settings.BACKEND_PORT}",
+        "workers": workers,
+        "worker_class": "app.server.PortalUvicornWorker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT,
+        "timeout": settings.GRACEFUL_TIMEOUT + 30,
+        "keepalive": settings.KEEPALIVE_TIMEOUT,
+        "forwarded_allow_ips": settings.FORWARDED_ALLOW_IPS,
+        "accesslog": "-" if settings.DEBUG else None,
+    }).run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
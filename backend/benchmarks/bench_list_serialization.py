@@ -0,0 +1,111 @@
+"""Compare the ORM list path with the lean Core-row list path.
+
+Seeds an in-memory SQLite database and times one 100-row page of
+``GET /api/requests/`` rendering through both paths:
+
+* orm:  ``AccessRequestCRUD.search`` -> ``schemas.SearchResults`` ->
+  ``jsonable_encoder`` -> ``JSONResponse`` (what FastAPI does for a response_model)
+* lean: ``AccessRequestCRUD.search_rows`` -> ``ORJSONResponse``
+
+Usage::
+
+    cd backend && python -m benchmarks.bench_list_serialization --rows 100 --iterations 200
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models, schemas
+from app.database import Base
+
+
+def seed(db, rows: int) -> None:
+    users = [
+        models.User(
+            keycloak_id=f"kc-{i}",
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            first_name="Bench",
+            last_name=f"User{i}",
+            role=models.UserRole.USER,
+        )
+        for i in range(20)
+    ]
+    db.add_all(users)
+    db.flush()
+    now = datetime.utcnow()
+    for i in range(rows):
+        db.add(models.AccessRequest(
+            request_number=f"REQ-20260101-{i:08X}",
+            user_id=users[i % len(users)].id,
+            approver_id=users[(i + 1) % len(users)].id if i % 2 else None,
+            source_ip=f"10.0.{i // 250}.{i % 250 + 1}",
+            destination_ip=f"192.168.{i // 250}.{i % 250 + 1}",
+            destination_hostname=f"host{i}.example.com",
+            port=443,
+            protocol=models.Protocol.HTTPS,
+            description="x" * 2000,
+            business_justification="y" * 2000,
+            status=models.RequestStatus.CREATED,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now - timedelta(minutes=i),
+        ))
+    db.commit()
+
+
+def orm_path(db, limit: int) -> bytes:
+    requests, total = crud.AccessRequestCRUD.search(db, None, None, 0, limit)
+    results = schemas.SearchResults(requests=requests, total=total, page=0, page_size=limit)
+    return JSONResponse(content=jsonable_encoder(results)).body
+
+
+def lean_path(db, limit: int) -> bytes:
+    requests, total = crud.AccessRequestCRUD.search_rows(db, None, None, 0, limit)
+    results = {"requests": requests, "total": total, "page": 0, "page_size": limit}
+    return ORJSONResponse(content=results).body
+
+
+def run(fn, session_factory, limit: int, iterations: int) -> float:
+    # Fresh session per call, as in a request, so the identity map does not help the ORM path
+    for _ in range(5):
+        with session_factory() as db:
+            fn(db, limit)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with session_factory() as db:
+            fn(db, limit)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="page size to render")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as db:
+        seed(db, args.rows)
+
+    orm_ms = run(orm_path, session_factory, args.rows, args.iterations)
+    lean_ms = run(lean_path, session_factory, args.rows, args.iterations)
+    print(f"rows per page: {args.rows}, iterations: {args.iterations}")
+    print(f"orm  path: {orm_ms:8.3f} ms/page")
+    print(f"lean path: {lean_ms:8.3f} ms/page  ({orm_ms / lean_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
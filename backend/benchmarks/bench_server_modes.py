@@ -0,0 +1,104 @@
+"""Compare the old launch mode with the production server.
+
+Starts each mode on its own port, drives it with concurrent HTTP clients and
+prints throughput and latency percentiles:
+
+* reload: ``uvicorn app.main:app --reload`` (the previous Dockerfile CMD)
+* server: ``python -m app.server`` (gunicorn, preloaded uvloop/httptools workers)
+
+Needs a reachable database only for the DB-backed path, so the default
+path is ``/api/config/public``. Usage::
+
+    cd backend && python -m benchmarks.bench_server_modes --requests 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+MODES = {
+    "reload": lambda port: [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--reload",
+    ],
+    "server": lambda port: [sys.executable, "-m", "app.server"],
+}
+
+
+def start(mode: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, BACKEND_HOST="127.0.0.1", BACKEND_PORT=str(port))
+    return subprocess.Popen(MODES[mode](port), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(base_url: str, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                if (await client.get(f"{base_url}/health")).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{base_url} did not become ready")
+
+
+async def drive(base_url: str, path: str, total: int, concurrency: int) -> list:
+    latencies = []
+    remaining = iter(range(total))
+
+    async def client_loop(client):
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+    return latencies
+
+
+async def bench(mode: str, port: int, args) -> None:
+    process = start(mode, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        ready = await wait_ready(base_url)
+        await drive(base_url, args.path, min(500, args.requests), args.concurrency)
+        started = time.perf_counter()
+        latencies = await drive(base_url, args.path, args.requests, args.concurrency)
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{mode:>6}: ready in {ready:5.1f}s  {len(latencies) / elapsed:8.0f} req/s  "
+        f"p50 {p(0.50):6.2f} ms  p99 {p(0.99):6.2f} ms  mean {statistics.mean(latencies) * 1000:6.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/config/public")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    for offset, mode in enumerate(MODES):
+        asyncio.run(bench(mode, args.port + offset, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Replay captured traffic against a local instance.
+
+Reads the JSONL files written by ``app.capture`` (TRAFFIC_CAPTURE_ENABLED),
+sends every request at its original offset divided by ``--rate`` (open
+loop, so bursts such as the morning approval rush stay bursts) and prints
+latency percentiles per route next to the latencies recorded in production.
+
+Values anonymised away at capture time are synthesised from the target's
+own data: ids and search queries of the recorded kind and length come from
+its request list, and bodies are rebuilt from their recorded shape. Auth
+routes and the event stream are skipped.
+
+Writes (new requests, approvals, rejections) change the target's data, so
+point it at a disposable database. Usage::
+
+    cd backend && python -m benchmarks.replay logs/traffic/traffic-*.jsonl \\
+        --base-url http://localhost:8000 --token "$TOKEN" --rate 3 --out build-a.json
+    python -m benchmarks.replay logs/traffic/traffic-*.jsonl --token "$TOKEN" --baseline build-a.json
+"""
+
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+import glob
+import json
+import random
+import re
+import statistics
+import time
+from typing import List, Optional
+
+import httpx
+
+SKIP_ROUTES = ("/api/auth/", "/api/requests/events")
+PLACEHOLDER = re.compile(r"\{([a-z_]+)\}")
+WORDS = ("firewall", "database", "backup", "monitoring", "vpn", "replication", "api", "gateway", "ssh", "metrics")
+# Body fields that must be valid, not just the right length
+SYNTHETIC_FIELDS = {
+    "source_ip": "10.0.0.10",
+    "destination_ip": "192.168.0.10",
+    "destination_hostname": "replay.example.com",
+    "email": "replay@example.com",
+    "expires_at": None,
+}
+FALLBACK_SAMPLE = {
+    "id": 1,
+    "request_number": "REQ-20260101-0000002A",
+    "source_ip": "10.0.0.10",
+    "destination_ip": "192.168.0.10",
+    "destination_hostname": "replay.example.com",
+    "port": 443,
+}
+
+
+def load(patterns: List[str], limit: Optional[int]) -> List[dict]:
+    entries = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                entries.extend(json.loads(line) for line in f if line.strip())
+    entries.sort(key=lambda e: e["ts"])
+    return entries[:limit] if limit else entries
+
+
+async def fetch_samples(client: httpx.AsyncClient) -> List[dict]:
+    """Existing requests on the target, to draw ids and search values from"""
+    try:
+        response = await client.get("/api/requests/", params={"limit": 100})
+        response.raise_for_status()
+        samples = response.json()["requests"]
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        print(f"Could not list requests on the target ({e}); using placeholder values")
+        samples = []
+    return samples or [FALLBACK_SAMPLE]
+
+
+def synth_text(words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(max(words, 1)))
+
+
+def synth_search(kind: str, length: int, sample: dict, rng: random.Random) -> str:
+    """A search value of the recorded kind, taken from a request on the target"""
+    ip = sample.get("destination_ip") or FALLBACK_SAMPLE["destination_ip"]
+    hostname = sample.get("destination_hostname") or FALLBACK_SAMPLE["destination_hostname"]
+    if kind == "request_number":
+        return sample["request_number"]
+    if kind == "request_number_prefix":
+        return sample["request_number"][:max(length, 3)]
+    if kind == "ip":
+        return ip
+    if kind == "ip_prefix":
+        return ip[:max(length, 2)].rstrip(".")
+    if kind == "cidr":
+        return ip.rsplit(".", 1)[0] + ".0/24"
+    if kind == "host_port":
+        return f"{hostname}:{sample.get('port') or 443}"
+    if kind == "hostname":
+        return hostname
+    return synth_text(max(length // 8, 1), rng)
+
+
+def synth_param(name: str, shape, samples: List[dict], rng: random.Random) -> str:
+    if not isinstance(shape, dict):
+        return shape
+    sample = rng.choice(samples)
+    if shape.get("kind") == "id":
+        return str(sample["id"])
+    if "kind" in shape:
+        return synth_search(shape["kind"], shape.get("length", 0), sample, rng)
+    if "words" in shape:
+        return synth_text(shape["words"], rng)
+    return "x" * shape.get("length", 1)
+
+
+def synth_body(shape, samples: List[dict], rng: random.Random):
+    if shape is None:
+        return None
+    if set(shape) == {"bytes"}:
+        # Not JSON (or too large to parse) when captured
+        return None
+    body = {}
+    for key, value in shape.items():
+        if not isinstance(value, dict):
+            body[key] = value
+        elif key == "request_ids":
+            body[key] = [rng.choice(samples)["id"] for _ in range(max(value.get("length", 1), 1))]
+        elif key in SYNTHETIC_FIELDS:
+            body[key] = SYNTHETIC_FIELDS[key]
+        elif "length" in value:
+            body[key] = synth_text(max(value["length"] // 8, 1), rng)[:max(value["length"], 1)]
+        else:
+            body[key] = {"int": 0, "float": 0.0, "bool": False}.get(value.get("type"))
+    return body
+
+
+def build(entry: dict, samples: List[dict], rng: random.Random) -> Optional[dict]:
+    """Request to send for a captured entry, or None when it can't be replayed"""
+    route = entry["route"]
+    if route.startswith(SKIP_ROUTES):
+        return None
+    sample = rng.choice(samples)
+    path = route
+    for name in PLACEHOLDER.findall(route):
+        if name != "id" and not name.endswith("_id"):
+            return None
+        path = path.replace("{" + name + "}", str(sample["id"]))
+    return {
+        "method": entry["method"],
+        "url": path,
+        "params": {name: synth_param(name, shape, samples, rng) for name, shape in entry.get("params", {}).items()},
+        "json": synth_body(entry.get("body"), samples, rng),
+    }
+
+
+async def replay(entries: List[dict], args) -> dict:
+    rng = random.Random(args.seed)
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    skipped = Counter()
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    max_lag = 0.0
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        samples = await fetch_samples(client)
+
+        async def send(key: str, request: dict) -> None:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                statuses[key][response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[key][type(e).__name__] += 1
+            finally:
+                latencies[key].append(time.perf_counter() - started)
+                in_flight.release()
+
+        loop = asyncio.get_running_loop()
+        first_ts = entries[0]["ts"]
+        started = loop.time()
+        tasks = []
+        for entry in entries:
+            key = f"{entry['method']} {entry['route']}"
+            request = build(entry, samples, rng)
+            if request is None:
+                skipped[key] += 1
+                continue
+            due = started + (entry["ts"] - first_ts) / args.rate
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            await in_flight.acquire()
+            max_lag = max(max_lag, loop.time() - due)
+            tasks.append(asyncio.create_task(send(key, request)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    return {
+        "latencies": latencies,
+        "statuses": statuses,
+        "skipped": skipped,
+        "max_lag": max_lag,
+        "elapsed": elapsed,
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def summarise(entries: List[dict], result: dict) -> dict:
+    recorded = defaultdict(list)
+    for entry in entries:
+        recorded[f"{entry['method']} {entry['route']}"].append(entry["duration_ms"])
+    summary = {}
+    for key, latencies in result["latencies"].items():
+        ms = [latency * 1000 for latency in latencies]
+        summary[key] = {
+            "count": len(ms),
+            "p50_ms": percentile(ms, 0.50),
+            "p90_ms": percentile(ms, 0.90),
+            "p99_ms": percentile(ms, 0.99),
+            "max_ms": max(ms),
+            "mean_ms": statistics.mean(ms),
+            "recorded_p50_ms": percentile(recorded[key], 0.50),
+            "recorded_p99_ms": percentile(recorded[key], 0.99),
+            "statuses": {str(status): count for status, count in result["statuses"][key].items()},
+        }
+    return summary
+
+
+def report(summary: dict, result: dict, baseline: Optional[dict]) -> None:
+    total = sum(route["count"] for route in summary.values())
+    print(
+        f"sent {total} requests in {result['elapsed']:.1f}s ({total / max(result['elapsed'], 1e-9):.0f} req/s), "
+        f"max schedule lag {result['max_lag'] * 1000:.0f} ms"
+    )
+    for key, count in result["skipped"].most_common():
+        print(f"  skipped {count:6d}  {key}")
+    print()
+    for key, route in sorted(summary.items(), key=lambda item: -item[1]["count"]):
+        line = (
+            f"{key:<48} n={route['count']:<6} p50 {route['p50_ms']:8.2f}  p90 {route['p90_ms']:8.2f}  "
+            f"p99 {route['p99_ms']:8.2f}  max {route['max_ms']:8.2f} ms  "
+            f"(recorded p50 {route['recorded_p50_ms']:.2f}, p99 {route['recorded_p99_ms']:.2f})"
+        )
+        if baseline and key in baseline:
+            before = baseline[key]
+            change = lambda field: (route[field] / before[field] - 1) * 100 if before[field] else 0.0
+            line += f"  vs baseline p50 {change('p50_ms'):+.0f}%  p99 {change('p99_ms'):+.0f}%"
+        print(line)
+        errors = {status: count for status, count in route["statuses"].items() if not status.startswith(("2", "3"))}
+        if errors:
+            print(f"{'':<48} non-2xx: {errors}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="captured traffic-*.jsonl files (globs allowed)")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", help="bearer token sent with every request")
+    parser.add_argument("--rate", type=float, default=1.0, help="multiple of the recorded request rate")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the per-route summary as JSON")
+    parser.add_argument("--baseline", help="summary JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    entries = load(args.files, args.limit)
+    if not entries:
+        parser.error("no captured requests found")
+    result = asyncio.run(replay(entries, args))
+    summary = summarise(entries, result)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(summary, result, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
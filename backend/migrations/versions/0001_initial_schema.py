@@ -0,0 +1,137 @@
+"""Initial schema (as previously created by Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('keycloak_id', sa.String(length=255), nullable=True),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('first_name', sa.String(length=255), nullable=True),
+        sa.Column('last_name', sa.String(length=255), nullable=True),
+        sa.Column('role', sa.Enum('ADMIN', 'APPROVER', 'USER', name='userrole'), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_keycloak_id', 'users', ['keycloak_id'], unique=True)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('idx_users_keycloak_id', 'users', ['keycloak_id'])
+    op.create_index('idx_users_username', 'users', ['username'])
+
+    op.create_table(
+        'access_requests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('request_number', sa.String(length=50), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('approver_id', sa.Integer(), nullable=True),
+        sa.Column('source_ip', sa.String(length=50), nullable=True),
+        sa.Column('destination_ip', sa.String(length=50), nullable=True),
+        sa.Column('destination_hostname', sa.String(length=255), nullable=True),
+        sa.Column('port', sa.Integer(), nullable=True),
+        sa.Column(
+            'protocol',
+            sa.Enum('TCP', 'UDP', 'ICMP', 'SSH', 'HTTPS', 'HTTP', 'CUSTOM', name='protocol'),
+            nullable=True,
+        ),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('business_justification', sa.Text(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum('CREATED', 'PENDING_APPROVAL', 'APPROVED', 'REJECTED', 'CLOSED', name='requeststatus'),
+            nullable=True,
+        ),
+        sa.Column('approval_comment', sa.Text(), nullable=True),
+        sa.Column('rejection_reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('approved_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('rejected_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['approver_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_access_requests_id', 'access_requests', ['id'])
+    op.create_index('ix_access_requests_request_number', 'access_requests', ['request_number'], unique=True)
+    op.create_index('ix_access_requests_user_id', 'access_requests', ['user_id'])
+    op.create_index('ix_access_requests_source_ip', 'access_requests', ['source_ip'])
+    op.create_index('ix_access_requests_destination_ip', 'access_requests', ['destination_ip'])
+    op.create_index('ix_access_requests_status', 'access_requests', ['status'])
+    op.create_index('ix_access_requests_created_at', 'access_requests', ['created_at'])
+    op.create_index('idx_access_requests_user_id', 'access_requests', ['user_id'])
+    op.create_index('idx_access_requests_status', 'access_requests', ['status'])
+    op.create_index('idx_access_requests_approver_id', 'access_requests', ['approver_id'])
+    op.create_index('idx_access_requests_created_at', 'access_requests', ['created_at'])
+    op.create_index('idx_access_requests_source_ip', 'access_requests', ['source_ip'])
+    op.create_index('idx_access_requests_destination_ip', 'access_requests', ['destination_ip'])
+    op.create_index('idx_access_requests_request_number', 'access_requests', ['request_number'])
+
+    op.create_table(
+        'audit_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('access_request_id', sa.Integer(), nullable=True),
+        sa.Column('action', sa.String(length=255), nullable=True),
+        sa.Column('resource_type', sa.String(length=100), nullable=True),
+        sa.Column('resource_id', sa.String(length=255), nullable=True),
+        sa.Column('old_value', sa.Text(), nullable=True),
+        sa.Column('new_value', sa.Text(), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('ip_address', sa.String(length=50), nullable=True),
+        sa.Column('user_agent', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['access_request_id'], ['access_requests.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_audit_logs_id', 'audit_logs', ['id'])
+    op.create_index('ix_audit_logs_user_id', 'audit_logs', ['user_id'])
+    op.create_index('ix_audit_logs_access_request_id', 'audit_logs', ['access_request_id'])
+    op.create_index('ix_audit_logs_action', 'audit_logs', ['action'])
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'])
+    op.create_index('idx_audit_logs_user_id', 'audit_logs', ['user_id'])
+    op.create_index('idx_audit_logs_access_request_id', 'audit_logs', ['access_request_id'])
+    op.create_index('idx_audit_logs_action', 'audit_logs', ['action'])
+    op.create_index('idx_audit_logs_created_at', 'audit_logs', ['created_at'])
+
+    op.create_table(
+        'configurations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=True),
+        sa.Column('value', sa.Text(), nullable=True),
+        sa.Column('description', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_configurations_id', 'configurations', ['id'])
+    op.create_index('ix_configurations_key', 'configurations', ['key'], unique=True)
+    op.create_index('idx_config_key', 'configurations', ['key'])
+
+
+def downgrade() -> None:
+    op.drop_table('configurations')
+    op.drop_table('audit_logs')
+    op.drop_table('access_requests')
+    op.drop_table('users')
+    sa.Enum(name='requeststatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='protocol').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='userrole').drop(op.get_bind(), checkfirst=True)
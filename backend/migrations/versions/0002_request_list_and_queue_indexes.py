@@ -0,0 +1,80 @@
+"""Request listing, search, numbering and approval queue support
+
+Covering list index, search prefix/inet indexes, the request number
+sequence and the approval lease columns with their queue index.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    op.add_column('access_requests', sa.Column('claimed_by_id', sa.Integer(), nullable=True))
+    op.add_column('access_requests', sa.Column('claim_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key(
+        'access_requests_claimed_by_id_fkey', 'access_requests', 'users', ['claimed_by_id'], ['id']
+    )
+
+    op.create_index(
+        'idx_access_requests_list_cover', 'access_requests', ['created_at'],
+        postgresql_include=[
+            'id', 'request_number', 'user_id', 'approver_id', 'source_ip',
+            'destination_ip', 'destination_hostname', 'port', 'protocol',
+            'status', 'updated_at',
+        ],
+    )
+    op.create_index(
+        'idx_access_requests_open_queue', 'access_requests', ['created_at'],
+        postgresql_where=sa.text("status IN ('CREATED', 'PENDING_APPROVAL')"),
+    )
+    for name, column in (
+        ('idx_access_requests_request_number_prefix', 'request_number'),
+        ('idx_access_requests_source_ip_prefix', 'source_ip'),
+        ('idx_access_requests_destination_ip_prefix', 'destination_ip'),
+        ('idx_access_requests_destination_hostname', 'destination_hostname'),
+    ):
+        op.create_index(name, 'access_requests', [column], postgresql_ops={column: 'varchar_pattern_ops'})
+
+    if is_postgres:
+        op.create_index(
+            'idx_access_requests_source_inet', 'access_requests',
+            [sa.text('(CAST(source_ip AS inet)) inet_ops')], postgresql_using='gist',
+        )
+        op.create_index(
+            'idx_access_requests_destination_inet', 'access_requests',
+            [sa.text('(CAST(destination_ip AS inet)) inet_ops')], postgresql_using='gist',
+        )
+        op.execute("CREATE SEQUENCE IF NOT EXISTS access_request_number_seq INCREMENT BY 50")
+
+
+def downgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    if is_postgres:
+        op.execute("DROP SEQUENCE IF EXISTS access_request_number_seq")
+        op.drop_index('idx_access_requests_destination_inet', table_name='access_requests')
+        op.drop_index('idx_access_requests_source_inet', table_name='access_requests')
+    for name in (
+        'idx_access_requests_destination_hostname',
+        'idx_access_requests_destination_ip_prefix',
+        'idx_access_requests_source_ip_prefix',
+        'idx_access_requests_request_number_prefix',
+        'idx_access_requests_open_queue',
+        'idx_access_requests_list_cover',
+    ):
+        op.drop_index(name, table_name='access_requests')
+    op.drop_constraint('access_requests_claimed_by_id_fkey', 'access_requests', type_='foreignkey')
+    op.drop_column('access_requests', 'claim_expires_at')
+    op.drop_column('access_requests', 'claimed_by_id')
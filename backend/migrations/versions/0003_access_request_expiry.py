@@ -0,0 +1,28 @@
+"""Access request expiry
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('access_requests', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'idx_access_requests_expiring', 'access_requests', ['expires_at'],
+        postgresql_where=sa.text("status = 'APPROVED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_access_requests_expiring', table_name='access_requests')
+    op.drop_column('access_requests', 'expires_at')
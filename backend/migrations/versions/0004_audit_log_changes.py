@@ -0,0 +1,47 @@
+"""Structured audit log diffs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:05:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column(
+        'audit_logs',
+        sa.Column('changes', postgresql.JSONB().with_variant(sa.JSON(), 'sqlite'), nullable=True),
+    )
+    if not is_postgres:
+        return
+
+    op.create_index('idx_audit_logs_changes', 'audit_logs', ['changes'], postgresql_using='gin')
+
+    # Diffs that carry long descriptions are TOASTed; lz4 (PostgreSQL 14+) is
+    # much cheaper to compress and read than the default pglz
+    if bind.execute(sa.text("SELECT current_setting('server_version_num')::int")).scalar() >= 140000:
+        # Servers built without lz4 keep pglz
+        op.execute("""
+            DO $$ BEGIN
+                ALTER TABLE audit_logs ALTER COLUMN changes SET COMPRESSION lz4;
+            EXCEPTION WHEN feature_not_supported OR invalid_parameter_value THEN NULL;
+            END $$
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_audit_logs_changes', table_name='audit_logs')
+    op.drop_column('audit_logs', 'changes')
@@ -0,0 +1,37 @@
+"""Request activity rollups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reuses the protocol enum type created by 0001
+    protocol = sa.Enum('TCP', 'UDP', 'ICMP', 'SSH', 'HTTPS', 'HTTP', 'CUSTOM', name='protocol').with_variant(
+        postgresql.ENUM(name='protocol', create_type=False), 'postgresql'
+    )
+    op.create_table(
+        'request_activity_rollups',
+        sa.Column('bucket_date', sa.Date(), nullable=False),
+        sa.Column('protocol', protocol, nullable=False),
+        sa.Column('created_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('approved_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rejected_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('approval_latency_seconds', sa.Float(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('bucket_date', 'protocol'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('request_activity_rollups')
@@ -0,0 +1,45 @@
+"""Full-text search over request descriptions
+
+Adds access_requests.search_vector, a stored generated tsvector over
+description (weight A) and business_justification (weight B), and its GIN
+index. Adding a stored generated column rewrites the table once.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 11:15:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        # Non-PostgreSQL databases search with ILIKE; the column stays empty
+        op.add_column('access_requests', sa.Column('search_vector', sa.Text(), nullable=True))
+        return
+
+    # Configuration must match search.TEXT_SEARCH_CONFIG
+    op.execute("""
+        ALTER TABLE access_requests ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(business_justification, '')), 'B')
+        ) STORED
+    """)
+    op.create_index(
+        'idx_access_requests_search_vector', 'access_requests', ['search_vector'],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_access_requests_search_vector', table_name='access_requests')
+    op.drop_column('access_requests', 'search_vector')
@@ -0,0 +1,45 @@
+"""Notification outbox
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 12:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('access_request_id', sa.Integer(), nullable=True),
+        sa.Column('event', sa.String(length=32), nullable=False),
+        sa.Column('recipient', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('PENDING', 'SENT', 'FAILED', name='notificationstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['access_request_id'], ['access_requests.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'idx_notification_outbox_due', 'notification_outbox', ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notification_outbox_due', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
+    sa.Enum(name='notificationstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,84 @@
+"""Access request archive
+
+Adds access_requests_archive for finished requests moved out of the hot
+table, audit_logs.archived_access_request_id to keep their audit linkage,
+and the partial index the archival job scans.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 13:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _existing_enum(name: str, *values: str):
+    """Enum column type reusing a PostgreSQL type created by 0001"""
+    return sa.Enum(*values, name=name).with_variant(postgresql.ENUM(name=name, create_type=False), 'postgresql')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'access_requests_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('request_number', sa.String(length=50), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('approver_id', sa.Integer(), nullable=True),
+        sa.Column('source_ip', sa.String(length=50), nullable=True),
+        sa.Column('destination_ip', sa.String(length=50), nullable=True),
+        sa.Column('destination_hostname', sa.String(length=255), nullable=True),
+        sa.Column('port', sa.Integer(), nullable=True),
+        sa.Column(
+            'protocol',
+            _existing_enum('protocol', 'TCP', 'UDP', 'ICMP', 'SSH', 'HTTPS', 'HTTP', 'CUSTOM'),
+            nullable=True,
+        ),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('business_justification', sa.Text(), nullable=True),
+        sa.Column(
+            'status',
+            _existing_enum('requeststatus', 'CREATED', 'PENDING_APPROVAL', 'APPROVED', 'REJECTED', 'CLOSED'),
+            nullable=True,
+        ),
+        sa.Column('approval_comment', sa.Text(), nullable=True),
+        sa.Column('rejection_reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('approved_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('rejected_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['approver_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('request_number'),
+    )
+    op.create_index('idx_access_requests_archive_user_id', 'access_requests_archive', ['user_id'])
+    op.create_index('idx_access_requests_archive_created_at', 'access_requests_archive', ['created_at'])
+
+    op.add_column('audit_logs', sa.Column('archived_access_request_id', sa.Integer(), nullable=True))
+    op.create_index(
+        op.f('ix_audit_logs_archived_access_request_id'), 'audit_logs', ['archived_access_request_id']
+    )
+
+    op.create_index(
+        'idx_access_requests_archivable', 'access_requests', ['updated_at'],
+        postgresql_where=sa.text("status IN ('REJECTED', 'CLOSED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_access_requests_archivable', table_name='access_requests')
+    op.drop_index(op.f('ix_audit_logs_archived_access_request_id'), table_name='audit_logs')
+    op.drop_column('audit_logs', 'archived_access_request_id')
+    op.drop_index('idx_access_requests_archive_created_at', table_name='access_requests_archive')
+    op.drop_index('idx_access_requests_archive_user_id', table_name='access_requests_archive')
+    op.drop_table('access_requests_archive')
@@ -0,0 +1,47 @@
+"""Per-day request number counters
+
+Replaces access_request_number_seq, whose numbers never restarted with the
+day, with one counter row per UTC day. On a database that already has
+requests, today's counter starts above every number the sequence handed out,
+so today's new numbers can't collide with existing ones; a fresh database
+starts at 1.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-20 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'request_number_counters',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "INSERT INTO request_number_counters (day, last_value) "
+            "SELECT (now() AT TIME ZONE 'utc')::date, last_value + 50 FROM access_request_number_seq "
+            "WHERE EXISTS (SELECT 1 FROM access_requests)"
+        )
+        op.execute("DROP SEQUENCE IF EXISTS access_request_number_seq")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE SEQUENCE IF NOT EXISTS access_request_number_seq INCREMENT BY 50")
+        op.execute(
+            "SELECT setval('access_request_number_seq', "
+            "(SELECT COALESCE(max(last_value), 0) + 50 FROM request_number_counters))"
+        )
+    op.drop_table('request_number_counters')
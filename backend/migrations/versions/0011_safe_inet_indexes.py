@@ -0,0 +1,57 @@
+"""Build the inet indexes on safe_inet
+
+The CIDR search indexes were built on CAST(... AS inet), which fails every
+write (and the index build) for a value that isn't an address. They are
+rebuilt on safe_inet(), which yields NULL for such values instead.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-20 09:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+# CAST(value AS inet) that yields NULL for a value that isn't an address
+SAFE_INET_FUNCTION = """
+CREATE OR REPLACE FUNCTION safe_inet(value text) RETURNS inet
+LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+BEGIN
+    RETURN value::inet;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _rebuild(expression: str) -> None:
+    for name, column in (
+        ('idx_access_requests_source_inet', 'source_ip'),
+        ('idx_access_requests_destination_inet', 'destination_ip'),
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.create_index(
+            name, 'access_requests', [sa.text(f'({expression.format(column=column)}) inet_ops')],
+            postgresql_using='gist',
+        )
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(SAFE_INET_FUNCTION)
+    _rebuild('safe_inet({column})')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _rebuild('CAST({column} AS inet)')
+    op.execute("DROP FUNCTION IF EXISTS safe_inet(text)")
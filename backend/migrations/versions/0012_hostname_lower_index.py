@@ -0,0 +1,35 @@
+"""Case-insensitive hostname index
+
+Hostname searches compare lower(destination_hostname), so the prefix index
+on the raw column is replaced by one on its lower-cased value.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-21 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index('idx_access_requests_destination_hostname', table_name='access_requests')
+    if op.get_bind().dialect.name == 'postgresql':
+        expression = 'lower(destination_hostname) varchar_pattern_ops'
+    else:
+        expression = 'lower(destination_hostname)'
+    op.create_index('idx_access_requests_destination_hostname_lower', 'access_requests', [sa.text(expression)])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_access_requests_destination_hostname_lower', table_name='access_requests')
+    op.create_index(
+        'idx_access_requests_destination_hostname', 'access_requests', ['destination_hostname'],
+        postgresql_ops={'destination_hostname': 'varchar_pattern_ops'},
+    )
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+
+
+@pytest.fixture
+def db_engine():
+    """In-memory SQLite with the full schema (PostgreSQL-only indexes are skipped)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    session = sessionmaker(bind=db_engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username, role=models.UserRole.USER, email=None):
+        user = models.User(keycloak_id=f"kc-{username}", username=username, email=email, role=role, is_active=True)
+        db.add(user)
+        db.flush()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_request(db):
+    numbers = iter(range(1, 10 ** 6))
+
+    def make_request(user, status=models.RequestStatus.CREATED, **fields):
+        access_request = models.AccessRequest(
+            request_number=f"REQ-TEST-{next(numbers):06d}",
+            user_id=user.id,
+            source_ip=fields.pop("source_ip", "10.0.0.1"),
+            destination_ip=fields.pop("destination_ip", "192.168.0.1"),
+            port=fields.pop("port", 22),
+            protocol=fields.pop("protocol", models.Protocol.SSH),
+            status=status,
+            **fields,
+        )
+        db.add(access_request)
+        db.flush()
+        return access_request
+    return make_request
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.admission import HEAVY, LIGHT, WRITE, AdmissionController, route_class
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/api/requests/", WRITE),
+    ("PUT", "/api/requests/5/approve", WRITE),
+    ("GET", "/api/requests/", HEAVY),
+    ("GET", "/api/audit/requests/5", HEAVY),
+    ("GET", "/api/admin/stats", HEAVY),
+    ("GET", "/api/requests/5", LIGHT),
+    ("GET", "/api/requests/events", None),
+    ("OPTIONS", "/api/requests/", None),
+    ("GET", "/health/ready", None),
+])
+def test_route_class(method, path, expected):
+    assert route_class(method, path) == expected
+
+
+def controller(capacity=2, heavy_share=0.5, queue_size=1, max_wait=1.0):
+    return AdmissionController(capacity, heavy_share, queue_size, max_wait)
+
+
+def test_admits_up_to_capacity_then_sheds_on_full_queue():
+    async def scenario():
+        admission = controller(capacity=2, queue_size=1)
+        assert await admission.acquire(LIGHT)
+        assert await admission.acquire(LIGHT)
+        waiting = asyncio.create_task(admission.acquire(LIGHT))
+        await asyncio.sleep(0)
+        # Queue of one is full: shed immediately
+        assert not await admission.acquire(LIGHT)
+        admission.release(LIGHT)
+        assert await waiting
+        return admission.status()
+
+    status = asyncio.run(scenario())
+    assert status["in_use"] == 2
+    assert status["classes"][LIGHT]["rejected"] == 1
+    assert status["classes"][LIGHT]["queued"] == 0
+
+
+def test_waiter_is_shed_after_max_wait():
+    async def scenario():
+        admission = controller(capacity=1, max_wait=0.01)
+        assert await admission.acquire(WRITE)
+        assert not await admission.acquire(WRITE)
+        return admission.status()
+
+    status = asyncio.run(scenario())
+    assert status["in_use"] == 1
+    assert status["classes"][WRITE]["rejected"] == 1
+    assert status["classes"][WRITE]["queued"] == 0
+
+
+def test_heavy_requests_are_limited_to_their_share():
+    async def scenario():
+        admission = controller(capacity=4, heavy_share=0.5, max_wait=0.01)
+        assert await admission.acquire(HEAVY)
+        assert await admission.acquire(HEAVY)
+        heavy_admitted = await admission.acquire(HEAVY)
+        write_admitted = await admission.acquire(WRITE)
+        return heavy_admitted, write_admitted
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_freed_slot_goes_to_writes_before_reads():
+    async def scenario():
+        admission = controller(capacity=1, queue_size=5)
+        assert await admission.acquire(LIGHT)
+        order = []
+
+        async def wait(name):
+            if await admission.acquire(name):
+                order.append(name)
+                admission.release(name)
+
+        waiters = [asyncio.create_task(wait(name)) for name in (HEAVY, LIGHT, WRITE)]
+        await asyncio.sleep(0)
+        admission.release(LIGHT)
+        await asyncio.gather(*waiters)
+        return order, admission.status()
+
+    order, status = asyncio.run(scenario())
+    assert order == [WRITE, LIGHT, HEAVY]
+    assert status["in_use"] == 0
+
+
+def test_cancelled_waiter_leaves_no_slot_behind():
+    async def scenario():
+        admission = controller(capacity=1, queue_size=5)
+        assert await admission.acquire(LIGHT)
+        waiting = asyncio.create_task(admission.acquire(LIGHT))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        admission.release(LIGHT)
+        return admission.status()
+
+    status = asyncio.run(scenario())
+    assert status["in_use"] == 0
+    assert status["classes"][LIGHT]["queued"] == 0
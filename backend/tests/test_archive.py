@@ -0,0 +1,85 @@
+"""Moving finished requests to the archive, and what still finds them."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import archive, crud, models
+from app.config import settings
+
+Status = models.RequestStatus
+OLD = datetime.utcnow() - timedelta(days=400)
+CUTOFF = datetime.utcnow() - timedelta(days=180)
+
+
+@pytest.fixture
+def requests(db, make_user, make_request):
+    user = make_user("alice", email="alice@example.com")
+    made = {
+        "old_rejected": make_request(user, Status.REJECTED, updated_at=OLD),
+        "old_closed": make_request(user, Status.CLOSED, updated_at=OLD),
+        "old_approved": make_request(user, Status.APPROVED, updated_at=OLD),
+        "recent_rejected": make_request(user, Status.REJECTED, updated_at=datetime.utcnow()),
+        "pending": make_request(user, Status.PENDING_APPROVAL),
+    }
+    for access_request in made.values():
+        crud.AuditLogCRUD.create(
+            db, user.id, "created", "access_request", access_request.request_number,
+            "Created", "127.0.0.1", "pytest", access_request_id=access_request.id
+        )
+    db.add(models.NotificationOutbox(
+        access_request_id=made["old_rejected"].id, event="rejected", recipient="alice@example.com",
+        subject="Rejected", body="Rejected",
+    ))
+    db.commit()
+    return {name: access_request.id for name, access_request in made.items()}
+
+
+def test_only_old_finished_requests_are_moved(db, requests):
+    assert archive.archive_batch(db, 100, CUTOFF) == 2
+
+    db.expire_all()
+    hot = {row.id for row in db.query(models.AccessRequest)}
+    archived = {row.id for row in db.query(models.ArchivedAccessRequest)}
+    assert archived == {requests["old_rejected"], requests["old_closed"]}
+    assert hot == {requests["old_approved"], requests["recent_rejected"], requests["pending"]}
+
+
+def test_batches_are_bounded(db, requests):
+    assert archive.archive_batch(db, 1, CUTOFF) == 1
+    assert archive.archive_batch(db, 1, CUTOFF) == 1
+    assert archive.archive_batch(db, 1, CUTOFF) == 0
+
+
+def test_references_are_repointed(db, requests):
+    archive.archive_batch(db, 100, CUTOFF)
+
+    db.expire_all()
+    moved = requests["old_rejected"]
+    [entry] = db.query(models.AuditLog).filter(models.AuditLog.archived_access_request_id == moved).all()
+    assert entry.access_request_id is None
+    assert db.query(models.AuditLog).filter(models.AuditLog.access_request_id == requests["pending"]).count() == 1
+    assert db.query(models.NotificationOutbox).one().access_request_id is None
+
+
+def test_archived_requests_are_still_found_and_counted(db, requests):
+    before = crud.AccessRequestCRUD.count_by_status(db)
+    archive.archive_batch(db, 100, CUTOFF)
+
+    moved = requests["old_closed"]
+    assert crud.AccessRequestCRUD.get_by_id(db, moved) is None
+    assert crud.AccessRequestCRUD.get_by_id(db, moved, include_archived=True).id == moved
+    rows, total = crud.AccessRequestCRUD.search_rows(db, include_archived=True)
+    assert total == len(requests)
+    assert crud.AccessRequestCRUD.count_by_status(db) == before
+    assert before[Status.REJECTED] == 2
+
+
+def test_archival_is_off_by_default(db_engine, requests, monkeypatch):
+    monkeypatch.setattr(archive, "SessionLocal", sessionmaker(bind=db_engine))
+    assert settings.ARCHIVE_AFTER_DAYS == 0
+    assert archive.archive_finished() == 0
+
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 180)
+    assert archive.archive_finished() == 2
@@ -0,0 +1,93 @@
+"""Bulk approve/reject: one conditional UPDATE with a per-request outcome."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, models, schemas
+
+Status = models.RequestStatus
+
+
+@pytest.fixture
+def approvers(make_user):
+    return (
+        make_user("anna", role=models.UserRole.APPROVER),
+        make_user("boris", role=models.UserRole.APPROVER),
+    )
+
+
+@pytest.fixture
+def requests(db, approvers, make_user, make_request):
+    _, boris = approvers
+    user = make_user("alice")
+    leased_until = datetime.utcnow() + timedelta(minutes=5)
+    made = {
+        "open": make_request(user, Status.CREATED),
+        "open_too": make_request(user, Status.CREATED),
+        "approved": make_request(user, Status.APPROVED),
+        "claimed": make_request(user, Status.CREATED, claimed_by_id=boris.id, claim_expires_at=leased_until),
+        "claim_expired": make_request(
+            user, Status.CREATED, claimed_by_id=boris.id, claim_expires_at=datetime.utcnow() - timedelta(minutes=1)
+        ),
+    }
+    db.commit()
+    return {name: access_request.id for name, access_request in made.items()}
+
+
+def decide(db, approver, ids, decision=schemas.BulkDecision.APPROVE, comment=None):
+    results = crud.AccessRequestCRUD.bulk_decide(db, ids, approver.id, decision, comment, "127.0.0.1", "pytest")
+    return {result["request_id"]: result for result in results}
+
+
+def test_partial_outcomes(db, approvers, requests):
+    anna, _ = approvers
+    ids = list(requests.values()) + [999999]
+    results = decide(db, anna, ids)
+
+    assert list(results) == ids
+    assert results[requests["open"]]["outcome"] == "approved"
+    assert results[requests["open_too"]]["outcome"] == "approved"
+    assert results[requests["claim_expired"]]["outcome"] == "approved"
+    assert results[requests["approved"]]["outcome"] == "skipped"
+    assert results[requests["approved"]]["detail"] == "Request is in approved status"
+    assert results[requests["claimed"]]["outcome"] == "skipped"
+    assert results[requests["claimed"]]["detail"] == "Request is claimed by another approver"
+    assert results[999999]["outcome"] == "not_found"
+
+
+def test_decided_rows_are_updated_and_audited(db, approvers, requests):
+    anna, _ = approvers
+    decide(db, anna, [requests["open"], requests["claimed"]], schemas.BulkDecision.REJECT, "Not needed")
+
+    db.expire_all()
+    rejected = db.get(models.AccessRequest, requests["open"])
+    assert rejected.status == Status.REJECTED
+    assert rejected.approver_id == anna.id
+    assert rejected.rejection_reason == "Not needed"
+    assert db.get(models.AccessRequest, requests["claimed"]).status == Status.CREATED
+
+    entries = db.query(models.AuditLog).filter_by(action="rejected").all()
+    assert [entry.access_request_id for entry in entries] == [requests["open"]]
+    assert entries[0].changes["status"] == [Status.CREATED.value, Status.REJECTED.value]
+
+
+def test_lease_holder_may_decide_own_claims(db, approvers, requests):
+    _, boris = approvers
+    results = decide(db, boris, [requests["claimed"]])
+
+    assert results[requests["claimed"]]["outcome"] == "approved"
+    db.expire_all()
+    approved = db.get(models.AccessRequest, requests["claimed"])
+    assert approved.claimed_by_id is None
+    assert approved.claim_expires_at is None
+
+
+def test_duplicate_ids_are_decided_once(db, approvers, requests):
+    anna, _ = approvers
+    results = crud.AccessRequestCRUD.bulk_decide(
+        db, [requests["open"], requests["open"]], anna.id, schemas.BulkDecision.APPROVE, None, "127.0.0.1", "pytest"
+    )
+
+    assert [result["outcome"] for result in results] == ["approved"]
+    assert db.query(models.AuditLog).filter_by(action="approved").count() == 1
@@ -0,0 +1,76 @@
+"""Leasing open requests to approvers (the approval work queue)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, models
+
+Status = models.RequestStatus
+LEASE_SECONDS = 300
+
+
+@pytest.fixture
+def approvers(make_user):
+    return (
+        make_user("anna", role=models.UserRole.APPROVER),
+        make_user("boris", role=models.UserRole.APPROVER),
+    )
+
+
+@pytest.fixture
+def queue(db, make_user, make_request):
+    user = make_user("alice")
+    started = datetime.utcnow() - timedelta(hours=1)
+    made = [
+        make_request(user, Status.CREATED, created_at=started + timedelta(minutes=minute))
+        for minute in range(3)
+    ]
+    make_request(user, Status.APPROVED, created_at=started - timedelta(minutes=1))
+    db.commit()
+    return [access_request.id for access_request in made]
+
+
+def claim(db, approver, limit=10):
+    requests, _ = crud.AccessRequestCRUD.claim_next(db, approver.id, limit, LEASE_SECONDS)
+    return [access_request.id for access_request in requests]
+
+
+def test_claims_oldest_open_requests_first(db, approvers, queue):
+    anna, _ = approvers
+    assert claim(db, anna, limit=2) == queue[:2]
+
+    claimed = db.get(models.AccessRequest, queue[0])
+    assert claimed.claimed_by_id == anna.id
+    assert claimed.claim_expires_at > datetime.utcnow()
+
+
+def test_approvers_never_get_the_same_request(db, approvers, queue):
+    anna, boris = approvers
+    assert claim(db, anna, limit=2) == queue[:2]
+    assert claim(db, boris) == queue[2:]
+    assert claim(db, boris) == queue[2:]
+
+
+def test_own_leases_are_handed_out_again(db, approvers, queue):
+    anna, _ = approvers
+    assert claim(db, anna, limit=2) == queue[:2]
+    assert claim(db, anna) == queue
+
+
+def test_expired_leases_are_reclaimed(db, approvers, queue):
+    anna, boris = approvers
+    claim(db, anna)
+    db.get(models.AccessRequest, queue[0]).claim_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    assert claim(db, boris) == queue[:1]
+
+
+def test_release_only_drops_own_lease(db, approvers, queue):
+    anna, boris = approvers
+    claim(db, anna, limit=1)
+
+    assert not crud.AccessRequestCRUD.release(db, queue[0], boris.id)
+    assert crud.AccessRequestCRUD.release(db, queue[0], anna.id)
+    assert claim(db, boris, limit=1) == queue[:1]
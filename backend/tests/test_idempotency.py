@@ -0,0 +1,109 @@
+"""Idempotency-Key replay, scoping and what gets stored."""
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.testclient import TestClient
+from jose import jwt
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import idempotency, models
+from app.idempotency import IdempotencyMiddleware
+
+
+def token(sub, username="alice", issued_at=0):
+    return jwt.encode({"sub": sub, "preferred_username": username, "iat": issued_at}, "test", algorithm="HS256")
+
+
+def auth(sub, key, **claims):
+    return {"Authorization": f"Bearer {token(sub, **claims)}", "Idempotency-Key": key}
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(db_engine, monkeypatch, calls):
+    monkeypatch.setattr(idempotency, "SessionLocal", sessionmaker(bind=db_engine))
+    app = FastAPI()
+
+    @app.post("/api/requests/")
+    async def create(payload: dict):
+        calls.append(payload)
+        return JSONResponse({"id": len(calls)}, status_code=201)
+
+    @app.post("/api/requests/{request_id}/approve")
+    async def approve(request_id: int, payload: dict):
+        calls.append(payload)
+        if payload.get("outcome") == "redirect":
+            return RedirectResponse("/api/requests/1/approve/", status_code=307)
+        if payload.get("outcome") == "conflict":
+            return JSONResponse({"detail": "Request was claimed by another approver"}, status_code=409)
+        return JSONResponse({"detail": "Request is not pending"}, status_code=400)
+
+    app.add_middleware(IdempotencyMiddleware)
+    return TestClient(app)
+
+
+def stored_keys(db):
+    db.expire_all()
+    return db.query(models.IdempotencyKey).all()
+
+
+def test_retry_replays_the_stored_response(client, calls):
+    first = client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "k1"))
+    retry = client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "k1"))
+
+    assert len(calls) == 1
+    assert retry.status_code == first.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+def test_key_is_scoped_to_the_subject(client, calls):
+    client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "shared"))
+    other = client.post("/api/requests/", json={"port": 22}, headers=auth("user-2", "shared", username="bob"))
+
+    assert len(calls) == 2
+    assert idempotency.REPLAYED_HEADER not in other.headers
+
+
+def test_refreshed_token_of_the_same_subject_replays(client, calls):
+    client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "k1", issued_at=0))
+    retry = client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "k1", issued_at=300))
+
+    assert len(calls) == 1
+    assert retry.headers[idempotency.REPLAYED_HEADER] == "true"
+
+
+def test_anonymous_requests_are_never_stored(client, calls, db):
+    for _ in range(2):
+        client.post("/api/requests/", json={"port": 22}, headers={"Idempotency-Key": "k1"})
+
+    assert len(calls) == 2
+    assert stored_keys(db) == []
+
+
+def test_reused_key_with_another_body_is_rejected(client, calls):
+    client.post("/api/requests/", json={"port": 22}, headers=auth("user-1", "k1"))
+    response = client.post("/api/requests/", json={"port": 443}, headers=auth("user-1", "k1"))
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("outcome,stored", [
+    ("redirect", False),
+    ("conflict", False),
+    ("final", True),
+])
+def test_only_final_responses_are_stored(client, calls, db, outcome, stored):
+    headers = auth("user-1", f"k-{outcome}")
+    client.post("/api/requests/1/approve", json={"outcome": outcome}, headers=headers, follow_redirects=False)
+    retry = client.post("/api/requests/1/approve", json={"outcome": outcome}, headers=headers, follow_redirects=False)
+
+    assert len(calls) == (1 if stored else 2)
+    assert (idempotency.REPLAYED_HEADER in retry.headers) is stored
+    assert len(stored_keys(db)) == (1 if stored else 0)
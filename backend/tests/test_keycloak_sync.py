@@ -0,0 +1,160 @@
+"""Directory sync against a stubbed Keycloak admin API."""
+
+from contextlib import contextmanager
+import time
+
+from keycloak.exceptions import KeycloakGetError
+import pytest
+
+from app import crud, keycloak_sync, models
+from app.config import settings
+from app.keycloak_sync import KeycloakDirectorySync
+
+
+def kc_user(user_id, username, email=None, enabled=True):
+    return {
+        "id": user_id,
+        "username": username,
+        "email": email or f"{username}@example.com",
+        "firstName": username.title(),
+        "lastName": "Test",
+        "enabled": enabled,
+    }
+
+
+class StubAdmin:
+    """The parts of KeycloakAdmin the sync calls, backed by dicts"""
+
+    def __init__(self, users, role_members=None):
+        self.users = {user["id"]: user for user in users}
+        self.role_members = role_members or {}
+        self.events = []
+        self.pages = []
+
+    def get_users(self, query):
+        self.pages.append(query)
+        users = list(self.users.values())
+        return [dict(user) for user in users[query["first"]:query["first"] + query["max"]]]
+
+    def get_realm_role_members(self, role_name):
+        return [{"id": user_id} for user_id in self.role_members.get(role_name, [])]
+
+    def get_admin_events(self, query):
+        return list(self.events)
+
+    def get_user(self, user_id):
+        if user_id not in self.users:
+            raise KeycloakGetError(error_message="User not found", response_code=404)
+        return dict(self.users[user_id])
+
+    def get_realm_roles_of_user(self, user_id):
+        return [{"name": role} for role, members in self.role_members.items() if user_id in members]
+
+    def record(self, user_id):
+        """Admin event for a change to this user, as Keycloak logs it"""
+        self.events.append({"time": int(time.time() * 1000) + 1, "resourcePath": f"users/{user_id}"})
+
+
+@pytest.fixture
+def sync(db, monkeypatch):
+    @contextmanager
+    def locked_session(lock_key):
+        yield db
+
+    monkeypatch.setattr(keycloak_sync, "locked_session", locked_session)
+    monkeypatch.setattr(settings, "KEYCLOAK_SYNC_BATCH_SIZE", 2)
+    admin = StubAdmin(
+        [kc_user("kc-1", "alice"), kc_user("kc-2", "bob"), kc_user("kc-3", "carol")],
+        {"approver": ["kc-2"], "admin": ["kc-3"]},
+    )
+    return KeycloakDirectorySync(admin)
+
+
+def users_by_keycloak_id(db):
+    db.expire_all()
+    return {user.keycloak_id: user for user in db.query(models.User)}
+
+
+def test_full_sync_upserts_every_page_with_roles(db, sync):
+    assert sync.run_once() == 3
+
+    users = users_by_keycloak_id(db)
+    assert set(users) == {"kc-1", "kc-2", "kc-3"}
+    assert users["kc-1"].role == models.UserRole.USER
+    assert users["kc-2"].role == models.UserRole.APPROVER
+    assert users["kc-3"].role == models.UserRole.ADMIN
+    assert [page["first"] for page in sync.admin.pages] == [0, 2]
+    assert crud.ConfigurationCRUD.get_value(db, keycloak_sync.LAST_FULL_SYNC_KEY) is not None
+
+
+def test_full_sync_updates_existing_rows(db, sync):
+    sync.run_once()
+    sync.admin.users["kc-1"]["email"] = "alice.new@example.com"
+
+    sync._full_sync(db)
+
+    assert users_by_keycloak_id(db)["kc-1"].email == "alice.new@example.com"
+    assert db.query(models.User).count() == 3
+
+
+def test_full_sync_deactivates_users_removed_from_keycloak(db, sync):
+    sync.run_once()
+    del sync.admin.users["kc-1"]
+
+    sync._full_sync(db)
+
+    users = users_by_keycloak_id(db)
+    assert not users["kc-1"].is_active
+    assert users["kc-2"].is_active and users["kc-3"].is_active
+
+
+def test_incremental_sync_fetches_only_changed_users(db, sync):
+    sync.run_once()
+    sync.admin.pages.clear()
+    sync.admin.users["kc-4"] = kc_user("kc-4", "dave")
+    sync.admin.role_members["approver"].append("kc-4")
+    sync.admin.users["kc-1"]["firstName"] = "Alicia"
+    sync.admin.record("kc-4")
+    sync.admin.record("kc-1")
+
+    assert sync.run_once() == 2
+
+    assert sync.admin.pages == []
+    users = users_by_keycloak_id(db)
+    assert users["kc-4"].role == models.UserRole.APPROVER
+    assert users["kc-1"].first_name == "Alicia"
+
+
+def test_incremental_sync_deactivates_deleted_users(db, sync):
+    sync.run_once()
+    del sync.admin.users["kc-2"]
+    sync.admin.record("kc-2")
+
+    sync.run_once()
+
+    assert not users_by_keycloak_id(db)["kc-2"].is_active
+
+
+def test_user_recreated_in_keycloak_takes_over_existing_row(db, sync):
+    sync.run_once()
+    alice_id = users_by_keycloak_id(db)["kc-1"].id
+    del sync.admin.users["kc-1"]
+    sync.admin.users["kc-1b"] = kc_user("kc-1b", "alice")
+
+    assert sync._full_sync(db) == 3
+
+    users = users_by_keycloak_id(db)
+    assert "kc-1" not in users
+    assert users["kc-1b"].id == alice_id
+    assert users["kc-1b"].is_active
+
+
+def test_row_with_email_of_another_user_is_skipped(db, sync):
+    sync.run_once()
+    sync.admin.users["kc-5"] = kc_user("kc-5", "eve", email="bob@example.com")
+
+    assert sync._full_sync(db) == 3
+
+    users = users_by_keycloak_id(db)
+    assert "kc-5" not in users
+    assert users["kc-2"].email == "bob@example.com"
@@ -0,0 +1,65 @@
+"""Closing approved requests once their access has expired."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import lifecycle, models
+from app.config import settings
+
+Status = models.RequestStatus
+PAST = datetime.utcnow() - timedelta(days=1)
+FUTURE = datetime.utcnow() + timedelta(days=1)
+
+
+@pytest.fixture
+def requests(db, make_user, make_request):
+    user = make_user("alice")
+    made = {
+        "expired": make_request(user, Status.APPROVED, expires_at=PAST),
+        "expired_earlier": make_request(user, Status.APPROVED, expires_at=PAST - timedelta(days=1)),
+        "valid": make_request(user, Status.APPROVED, expires_at=FUTURE),
+        "no_expiry": make_request(user, Status.APPROVED),
+        "rejected_past": make_request(user, Status.REJECTED, expires_at=PAST),
+    }
+    db.commit()
+    return {name: access_request.id for name, access_request in made.items()}
+
+
+def statuses(db):
+    db.expire_all()
+    return {row.id: row.status for row in db.query(models.AccessRequest)}
+
+
+def test_only_expired_approvals_are_closed(db, requests):
+    assert lifecycle.close_expired_batch(db, 100) == 2
+
+    current = statuses(db)
+    assert current[requests["expired"]] == Status.CLOSED
+    assert current[requests["expired_earlier"]] == Status.CLOSED
+    assert current[requests["valid"]] == Status.APPROVED
+    assert current[requests["no_expiry"]] == Status.APPROVED
+    assert current[requests["rejected_past"]] == Status.REJECTED
+
+
+def test_closing_is_audited(db, requests):
+    lifecycle.close_expired_batch(db, 100)
+
+    entries = db.query(models.AuditLog).filter_by(action="closed").all()
+    assert {entry.access_request_id for entry in entries} == {requests["expired"], requests["expired_earlier"]}
+    assert all(entry.user_id is None and entry.user_agent == "lifecycle-scheduler" for entry in entries)
+
+
+def test_batches_close_the_longest_expired_first(db, requests):
+    assert lifecycle.close_expired_batch(db, 1) == 1
+    assert statuses(db)[requests["expired_earlier"]] == Status.CLOSED
+    assert statuses(db)[requests["expired"]] == Status.APPROVED
+
+
+def test_close_expired_runs_batches_until_done(db, db_engine, requests, monkeypatch):
+    monkeypatch.setattr(lifecycle, "SessionLocal", sessionmaker(bind=db_engine))
+    monkeypatch.setattr(settings, "LIFECYCLE_BATCH_SIZE", 1)
+
+    assert lifecycle.close_expired() == 2
+    assert lifecycle.close_expired() == 0
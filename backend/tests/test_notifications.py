@@ -0,0 +1,145 @@
+"""Outbox delivery through a local aiosmtpd server."""
+
+from email import message_from_bytes
+import socket
+
+from aiosmtpd.controller import Controller
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import models, notifications
+from app.config import settings
+from app.notifications import NotificationDispatcher
+
+
+class Inbox:
+    """aiosmtpd handler keeping every accepted message; refuses REFUSED_RECIPIENT"""
+
+    REFUSED_RECIPIENT = "gone@example.com"
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == self.REFUSED_RECIPIENT:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    handler = Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_SERVER", controller.hostname)
+    monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    monkeypatch.setattr(settings, "SMTP_FROM", "Portal <noreply@portal.example.com>")
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def dispatcher(db_engine, inbox, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATIONS_ENABLED", True)
+    monkeypatch.setattr(settings, "NOTIFICATION_APPROVER_EMAILS", [])
+    monkeypatch.setattr(notifications, "SessionLocal", sessionmaker(bind=db_engine))
+    dispatcher = NotificationDispatcher()
+    yield dispatcher
+    dispatcher.close()
+
+
+def add_user(db, username, role=models.UserRole.USER, email=None):
+    user = models.User(
+        keycloak_id=f"kc-{username}", username=username, email=email, role=role, is_active=True
+    )
+    db.add(user)
+    db.flush()
+    return user
+
+
+def add_request(db, user):
+    access_request = models.AccessRequest(
+        request_number=f"REQ-TEST-{user.id:04d}",
+        user_id=user.id,
+        source_ip="10.0.0.1",
+        destination_ip="192.168.0.1",
+        port=22,
+        protocol=models.Protocol.SSH,
+        status=models.RequestStatus.CREATED,
+    )
+    db.add(access_request)
+    db.flush()
+    return access_request
+
+
+def outbox(db):
+    db.expire_all()
+    return db.query(models.NotificationOutbox).order_by(models.NotificationOutbox.id).all()
+
+
+def test_created_request_goes_to_approvers(db, dispatcher, inbox):
+    requester = add_user(db, "alice", email="alice@example.com")
+    add_user(db, "bob", models.UserRole.APPROVER, "bob@example.com")
+    add_user(db, "carol", models.UserRole.ADMIN, "carol@example.com")
+    add_user(db, "dave", models.UserRole.APPROVER)
+    access_request = add_request(db, requester)
+    notifications.enqueue(db, "created", [access_request])
+    db.commit()
+
+    assert dispatcher.run_once() == 2
+
+    assert sorted(message["To"] for message in inbox.messages) == ["bob@example.com", "carol@example.com"]
+    assert all(access_request.request_number in message["Subject"] for message in inbox.messages)
+    assert all(row.status == models.NotificationStatus.SENT for row in outbox(db))
+
+
+def test_created_request_falls_back_to_configured_approvers(db, dispatcher, inbox, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_APPROVER_EMAILS", ["security@example.com"])
+    requester = add_user(db, "alice", email="alice@example.com")
+    add_user(db, "dave", models.UserRole.APPROVER)
+    notifications.enqueue(db, "created", [add_request(db, requester)])
+    db.commit()
+
+    assert dispatcher.run_once() == 1
+
+    assert [message["To"] for message in inbox.messages] == ["security@example.com"]
+
+
+def test_decision_goes_to_requester_with_stable_message_id(db, dispatcher, inbox):
+    requester = add_user(db, "alice", email="alice@example.com")
+    notifications.enqueue(db, "approved", [add_request(db, requester)], note="Until Friday")
+    db.commit()
+
+    dispatcher.run_once()
+
+    [message] = inbox.messages
+    [row] = outbox(db)
+    assert message["To"] == "alice@example.com"
+    assert message["Message-ID"] == f"<notification-{row.id}@portal.example.com>"
+    assert "Until Friday" in message.get_payload()
+
+
+def test_refused_recipient_fails_permanently(db, dispatcher, inbox):
+    requester = add_user(db, "gone", email=Inbox.REFUSED_RECIPIENT)
+    notifications.enqueue(db, "rejected", [add_request(db, requester)])
+    db.commit()
+
+    assert dispatcher.run_once() == 0
+
+    [row] = outbox(db)
+    assert row.status == models.NotificationStatus.FAILED
+    assert row.attempts == 1
+    assert inbox.messages == []
@@ -0,0 +1,96 @@
+"""Request activity rollups: live increments and the backfill."""
+
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import archive, crud, models, rollups
+
+Status = models.RequestStatus
+Protocol = models.Protocol
+Rollups = crud.RequestActivityRollupCRUD
+DAY = datetime(2026, 3, 2, 9, 0)
+
+
+def buckets(db):
+    db.expire_all()
+    return {
+        (row.bucket_date, row.protocol): (
+            row.created_count, row.approved_count, row.rejected_count, row.approval_latency_seconds
+        )
+        for row in db.query(models.RequestActivityRollup)
+    }
+
+
+def test_bump_merges_increments_per_bucket(db):
+    Rollups.bump(db, [
+        Rollups.created(DAY, Protocol.SSH),
+        Rollups.created(DAY + timedelta(hours=1), Protocol.SSH),
+        Rollups.created(DAY, Protocol.HTTPS),
+    ])
+    Rollups.bump(db, [Rollups.decided(Status.APPROVED, Protocol.SSH, DAY, DAY + timedelta(hours=2))])
+    Rollups.bump(db, [Rollups.decided(Status.REJECTED, Protocol.SSH, DAY, DAY + timedelta(hours=3))])
+    db.commit()
+
+    assert buckets(db) == {
+        (DAY.date(), Protocol.SSH): (2, 1, 1, 7200.0),
+        (DAY.date(), Protocol.HTTPS): (1, 0, 0, 0.0),
+    }
+
+
+def test_decisions_update_rollups(db, make_user, make_request):
+    approver = make_user("anna", role=models.UserRole.APPROVER)
+    access_request = make_request(make_user("alice"), created_at=datetime.utcnow() - timedelta(minutes=10))
+    db.commit()
+
+    crud.AccessRequestCRUD.approve(db, access_request.id, approver.id)
+
+    (counts,) = buckets(db).values()
+    assert counts[:3] == (0, 1, 0)
+    assert 500 < counts[3] < 700
+
+
+@pytest.fixture
+def backfill_db(db, monkeypatch):
+    @contextmanager
+    def locked_session(lock_key):
+        yield db
+
+    monkeypatch.setattr(rollups, "locked_session", locked_session)
+    return db
+
+
+def test_backfill_rebuilds_from_requests_and_archive(backfill_db, make_user, make_request):
+    db = backfill_db
+    user = make_user("alice")
+    next_day = DAY + timedelta(days=1)
+    make_request(user, Status.APPROVED, created_at=DAY, approved_at=DAY + timedelta(hours=1))
+    make_request(user, Status.CREATED, created_at=next_day, protocol=Protocol.HTTPS)
+    make_request(user, Status.REJECTED, created_at=DAY, rejected_at=next_day, updated_at=DAY - timedelta(days=400))
+    # Stale bucket that the rebuild must replace
+    Rollups.bump(db, [Rollups.created(DAY, Protocol.SSH)] * 5)
+    db.commit()
+    assert archive.archive_batch(db, 100, datetime.utcnow() - timedelta(days=180)) == 1
+
+    assert rollups.backfill() == 3
+    expected = {
+        (DAY.date(), Protocol.SSH): (2, 1, 0, 3600.0),
+        (next_day.date(), Protocol.SSH): (0, 0, 1, 0.0),
+        (next_day.date(), Protocol.HTTPS): (1, 0, 0, 0.0),
+    }
+    assert buckets(db) == expected
+
+
+def test_backfill_since_keeps_earlier_buckets(backfill_db, make_user, make_request):
+    db = backfill_db
+    user = make_user("alice")
+    make_request(user, Status.CREATED, created_at=DAY + timedelta(days=1))
+    Rollups.bump(db, [Rollups.created(DAY, Protocol.SSH)] * 5)
+    db.commit()
+
+    assert rollups.backfill(since=date(2026, 3, 3)) == 1
+    assert buckets(db) == {
+        (DAY.date(), Protocol.SSH): (5, 0, 0, 0.0),
+        (date(2026, 3, 3), Protocol.SSH): (1, 0, 0, 0.0),
+    }
@@ -0,0 +1,110 @@
+"""Search query classification and the filters built from it."""
+
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import models
+from app.search import QueryKind, SearchPlan, build_filter, classify
+
+
+@pytest.mark.parametrize("query,plan", [
+    ("REQ-20261016-000123", SearchPlan(QueryKind.REQUEST_NUMBER, "REQ-20261016-000123")),
+    ("req-20261016-0a1b2c3d", SearchPlan(QueryKind.REQUEST_NUMBER, "REQ-20261016-0A1B2C3D")),
+    ("REQ-2026", SearchPlan(QueryKind.REQUEST_NUMBER_PREFIX, "REQ-2026")),
+    ("req-20261016-", SearchPlan(QueryKind.REQUEST_NUMBER_PREFIX, "REQ-20261016-")),
+    (" 10.0.0.1 ", SearchPlan(QueryKind.IP, "10.0.0.1")),
+    ("2001:DB8::0001", SearchPlan(QueryKind.IP, "2001:db8::1")),
+    ("10.1.2.0/24", SearchPlan(QueryKind.CIDR, "10.1.2.0/24")),
+    ("10.1.2.3/24", SearchPlan(QueryKind.CIDR, "10.1.2.0/24")),
+    ("2001:db8::/32", SearchPlan(QueryKind.CIDR, "2001:db8::/32")),
+    ("10.1", SearchPlan(QueryKind.IP_PREFIX, "10.1")),
+    ("192.168.", SearchPlan(QueryKind.IP_PREFIX, "192.168.")),
+    ("db.example.com:5432", SearchPlan(QueryKind.HOST_PORT, "db.example.com", 5432)),
+    ("DB.Example.com:5432", SearchPlan(QueryKind.HOST_PORT, "db.example.com", 5432)),
+    ("[2001:DB8::1]:443", SearchPlan(QueryKind.HOST_PORT, "2001:db8::1", 443)),
+    ("db.example.com:70000", SearchPlan(QueryKind.TEXT, "db.example.com:70000")),
+    ("DB.Example.com.", SearchPlan(QueryKind.HOSTNAME, "db.example.com")),
+    ("backup", SearchPlan(QueryKind.TEXT, "backup")),
+    ("10.0.0.999/8", SearchPlan(QueryKind.TEXT, "10.0.0.999/8")),
+])
+def test_classify(query, plan):
+    assert classify(query) == plan
+
+
+def sql(clause, dialect):
+    return str(clause.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("query,postgres_sql,sqlite_sql", [
+    (
+        "REQ-20261016-000123",
+        "access_requests.request_number = 'REQ-20261016-000123'",
+        "access_requests.request_number = 'REQ-20261016-000123'",
+    ),
+    (
+        "REQ-2026",
+        "access_requests.request_number LIKE 'REQ-2026%'",
+        "access_requests.request_number LIKE 'REQ-2026%'",
+    ),
+    (
+        "10.0.0.1",
+        "access_requests.source_ip = '10.0.0.1' OR access_requests.destination_ip = '10.0.0.1'",
+        "access_requests.source_ip = '10.0.0.1' OR access_requests.destination_ip = '10.0.0.1'",
+    ),
+    (
+        "2001:DB8::0001",
+        "safe_inet(access_requests.source_ip) = CAST('2001:db8::1' AS INET) "
+        "OR safe_inet(access_requests.destination_ip) = CAST('2001:db8::1' AS INET)",
+        "access_requests.source_ip = '2001:db8::1' OR access_requests.destination_ip = '2001:db8::1'",
+    ),
+    (
+        "10.1.2.0/24",
+        "safe_inet(access_requests.source_ip) <<= CAST('10.1.2.0/24' AS CIDR) "
+        "OR safe_inet(access_requests.destination_ip) <<= CAST('10.1.2.0/24' AS CIDR)",
+        "access_requests.source_ip LIKE '10.1.2.%' OR access_requests.destination_ip LIKE '10.1.2.%'",
+    ),
+    (
+        "DB.Example.com",
+        "lower(access_requests.destination_hostname) LIKE 'db.example.com%'",
+        "lower(access_requests.destination_hostname) LIKE 'db.example.com%'",
+    ),
+    (
+        "DB.Example.com:5432",
+        "lower(access_requests.destination_hostname) = 'db.example.com' AND access_requests.port = 5432",
+        "lower(access_requests.destination_hostname) = 'db.example.com' AND access_requests.port = 5432",
+    ),
+])
+def test_build_filter(query, postgres_sql, sqlite_sql):
+    plan = classify(query)
+    assert sql(build_filter(plan, "postgresql"), postgresql.dialect()) == postgres_sql
+    assert sql(build_filter(plan, "sqlite"), sqlite.dialect()) == sqlite_sql
+
+
+def test_text_falls_back_to_substring_scan():
+    clause = sql(build_filter(classify("backup"), "sqlite"), sqlite.dialect())
+    assert "lower(access_requests.request_number) LIKE lower('%backup%')" in clause
+
+
+def test_filters_apply_to_the_archive():
+    clause = sql(build_filter(classify("10.0.0.1"), "sqlite", models.ArchivedAccessRequest), sqlite.dialect())
+    assert clause.startswith("access_requests_archive.source_ip")
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("10.0.0.1", {"ipv4"}),
+    ("2001:db8::1", {"ipv6"}),
+    ("10.0.0.0/8", {"ipv4", "other-ipv4"}),
+    ("DB.EXAMPLE.COM", {"ipv4"}),
+    ("db.example.com:5432", {"ipv4"}),
+    ("other.example.com", {"other-ipv4"}),
+])
+def test_filters_find_rows(db, make_user, make_request, query, expected):
+    user = make_user("alice")
+    make_request(user, source_ip="10.0.0.1", destination_hostname="db.example.com", port=5432, description="ipv4")
+    make_request(user, source_ip="2001:db8::1", destination_ip="2001:db8::2", description="ipv6")
+    make_request(user, source_ip="10.9.9.9", destination_hostname="Other.Example.com", description="other-ipv4")
+    db.commit()
+
+    found = db.query(models.AccessRequest.description).filter(build_filter(classify(query), "sqlite")).all()
+
+    assert {description for (description,) in found} == expected
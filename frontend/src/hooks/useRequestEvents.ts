@@ -0,0 +1,18 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { subscribeRequestEvents } from '../services/api';
+
+// Refetch only what an event touches instead of polling request pages
+export const useRequestEvents = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(
+    () =>
+      subscribeRequestEvents((event) => {
+        queryClient.invalidateQueries({ queryKey: ['access-requests'] });
+        queryClient.invalidateQueries({ queryKey: ['pending-requests'] });
+        queryClient.invalidateQueries({ queryKey: ['access-request', String(event.id)] });
+      }),
+    [queryClient]
+  );
+};
@@ -1,10 +1,12 @@
 import { Box, Typography, Card, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Button } from '@mui/material';
 import { useQuery } from '@tanstack/react-query';
 import { apiService } from '../services/api';
+import { useRequestEvents } from '../hooks/useRequestEvents';
 import { useNavigate } from 'react-router-dom';
 
 const ApprovalQueue: React.FC = () => {
   const navigate = useNavigate();
+  useRequestEvents();
   const { data: results, isLoading } = useQuery({
     queryKey: ['pending-requests'],
     queryFn: () => apiService.getAccessRequests({ status: 'pending_approval' }),
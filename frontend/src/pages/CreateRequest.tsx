@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import {
   Box,
@@ -16,7 +16,7 @@ import {
   SelectChangeEvent,
 } from '@mui/material';
 import { useMutation } from '@tanstack/react-query';
-import { apiService } from '../services/api';
+import { apiService, newIdempotencyKey } from '../services/api';
 
 const CreateRequest: React.FC = () => {
   const navigate = useNavigate();
@@ -30,10 +30,13 @@ const CreateRequest: React.FC = () => {
     business_justification: '',
   });
   const [error, setError] = useState<string | null>(null);
+  // Reused when the same form is resubmitted, so a retry can't create a second request
+  const idempotencyKey = useRef(newIdempotencyKey());
 
   const { mutate: createRequest, isPending } = useMutation({
-    mutationFn: (data: any) => apiService.createAccessRequest(data),
+    mutationFn: (data: any) => apiService.createAccessRequest(data, idempotencyKey.current),
     onSuccess: (response: any) => {
+      idempotencyKey.current = newIdempotencyKey();
       navigate(`/requests/${response.id}`);
     },
     onError: (error: any) => {
@@ -43,6 +46,7 @@ const CreateRequest: React.FC = () => {
 
   const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement>) => {
     const { name, value } = e.target;
+    idempotencyKey.current = newIdempotencyKey();
     setFormData((prev) => ({
       ...prev,
       [name]: value,
@@ -51,6 +55,7 @@ const CreateRequest: React.FC = () => {
 
   const handleSelectChange = (e: SelectChangeEvent) => {
     const { name, value } = e.target;
+    idempotencyKey.current = newIdempotencyKey();
     setFormData((prev) => ({
       ...prev,
       [name as string]: value,
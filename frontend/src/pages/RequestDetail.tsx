@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import {
   Box,
@@ -14,17 +14,21 @@ import {
   Divider,
 } from '@mui/material';
 import { useQuery, useMutation } from '@tanstack/react-query';
-import { apiService } from '../services/api';
+import { apiService, newIdempotencyKey } from '../services/api';
+import { useRequestEvents } from '../hooks/useRequestEvents';
 import { useAuth } from '../context/AuthContext';
 
 const RequestDetail: React.FC = () => {
   const { id } = useParams<{ id: string }>();
   const navigate = useNavigate();
   const { hasRole } = useAuth();
+  useRequestEvents();
   const [openDialog, setOpenDialog] = useState(false);
   const [dialogComment, setDialogComment] = useState('');
   const [dialogReason, setDialogReason] = useState('');
   const [actionType, setActionType] = useState<'approve' | 'reject' | null>(null);
+  // One key per decision; resubmitting the dialog unchanged retries the same decision
+  const idempotencyKey = useRef(newIdempotencyKey());
 
   const { data: request, isLoading, refetch } = useQuery({
     queryKey: ['access-request', id],
@@ -32,8 +36,9 @@ const RequestDetail: React.FC = () => {
   });
 
   const { mutate: approve, isPending: isApproving } = useMutation({
-    mutationFn: () => apiService.approveAccessRequest(parseInt(id!), dialogComment),
+    mutationFn: () => apiService.approveAccessRequest(parseInt(id!), dialogComment, idempotencyKey.current),
     onSuccess: () => {
+      idempotencyKey.current = newIdempotencyKey();
       refetch();
       setOpenDialog(false);
       setDialogComment('');
@@ -41,8 +46,9 @@ const RequestDetail: React.FC = () => {
   });
 
   const { mutate: reject, isPending: isRejecting } = useMutation({
-    mutationFn: () => apiService.rejectAccessRequest(parseInt(id!), dialogReason),
+    mutationFn: () => apiService.rejectAccessRequest(parseInt(id!), dialogReason, idempotencyKey.current),
     onSuccess: () => {
+      idempotencyKey.current = newIdempotencyKey();
       refetch();
       setOpenDialog(false);
       setDialogReason('');
@@ -50,11 +56,13 @@ const RequestDetail: React.FC = () => {
   });
 
   const handleApprove = () => {
+    if (actionType !== 'approve') idempotencyKey.current = newIdempotencyKey();
     setActionType('approve');
     setOpenDialog(true);
   };
 
   const handleReject = () => {
+    if (actionType !== 'reject') idempotencyKey.current = newIdempotencyKey();
     setActionType('reject');
     setOpenDialog(true);
   };
@@ -179,7 +187,10 @@ const RequestDetail: React.FC = () => {
               fullWidth
               label="Comment (Optional)"
               value={dialogComment}
-              onChange={(e) => setDialogComment(e.target.value)}
+              onChange={(e) => {
+                idempotencyKey.current = newIdempotencyKey();
+                setDialogComment(e.target.value);
+              }}
               multiline
               rows={3}
             />
@@ -188,7 +199,10 @@ const RequestDetail: React.FC = () => {
               fullWidth
               label="Rejection Reason"
               value={dialogReason}
-              onChange={(e) => setDialogReason(e.target.value)}
+              onChange={(e) => {
+                idempotencyKey.current = newIdempotencyKey();
+                setDialogReason(e.target.value);
+              }}
               multiline
               rows={3}
               required
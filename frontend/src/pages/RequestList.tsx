@@ -18,10 +18,12 @@ import {
 import { Search as SearchIcon } from '@mui/icons-material';
 import { useQuery } from '@tanstack/react-query';
 import { apiService } from '../services/api';
+import { useRequestEvents } from '../hooks/useRequestEvents';
 import { useNavigate } from 'react-router-dom';
 
 const RequestList: React.FC = () => {
   const navigate = useNavigate();
+  useRequestEvents();
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(10);
   const [searchQuery, setSearchQuery] = useState('');
@@ -7,6 +7,8 @@ const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
 const client: AxiosInstance = axios.create({
   baseURL: `${API_URL}/api`,
+  // Carries the read-your-writes cookie that keeps reads on the primary DB after a write
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -44,6 +46,62 @@ export const setKeycloakInstance = (instance: KeycloakInstance) => {
   console.log('Keycloak instance initialized in API service');
 };
 
+export type RequestEvent = {
+  event: 'created' | 'approved' | 'rejected' | 'closed';
+  id: number;
+  request_number: string;
+  status: string;
+  user_id: number;
+};
+
+// EventSource cannot send the bearer token, so read the SSE stream with fetch
+export const subscribeRequestEvents = (onEvent: (event: RequestEvent) => void) => {
+  const controller = new AbortController();
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const response = await fetch(`${API_URL}/api/requests/events`, {
+          headers: keycloakInstance?.token ? { Authorization: `Bearer ${keycloakInstance.token}` } : {},
+          credentials: 'include',
+          signal: controller.signal,
+        });
+        if (!response.ok || !response.body) {
+          throw new Error(`Event stream failed with status ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const messages = buffer.split('\n\n');
+          buffer = messages.pop() || '';
+          messages.forEach((message) => {
+            const data = message.split('\n').find((line) => line.startsWith('data: '));
+            if (data) {
+              onEvent(JSON.parse(data.slice(6)));
+            }
+          });
+        }
+      } catch (err) {
+        if (controller.signal.aborted) return;
+        console.error('Request event stream error:', err);
+      }
+      await new Promise((resolve) => setTimeout(resolve, 5000));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
+
+// Sent on non-repeatable POSTs; a retried request with the same key gets the original response.
+// Callers keep one key per form submission (see newIdempotencyKey) and pass it on every retry.
+export const newIdempotencyKey = () => crypto.randomUUID();
+const idempotent = (key: string) => ({ headers: { 'Idempotency-Key': key } });
+
 export const apiService = {
   // Health check
   healthCheck: () =>
@@ -53,8 +111,8 @@ export const apiService = {
     }),
 
   // Access Requests
-  createAccessRequest: (data: any) =>
-    client.post('/requests', data).then((res) => res.data),
+  createAccessRequest: (data: any, idempotencyKey: string) =>
+    client.post('/requests', data, idempotent(idempotencyKey)).then((res) => res.data),
 
   getAccessRequests: (params?: any) =>
     client.get('/requests', { params }).then((res) => res.data),
@@ -65,11 +123,13 @@ export const apiService = {
   updateAccessRequest: (id: number, data: any) =>
     client.patch(`/requests/${id}`, data).then((res) => res.data),
 
-  approveAccessRequest: (id: number, comment?: string) =>
-    client.post(`/requests/${id}/approve`, { approval_comment: comment }).then((res) => res.data),
+  approveAccessRequest: (id: number, comment: string | undefined, idempotencyKey: string) =>
+    client.post(`/requests/${id}/approve`, { approval_comment: comment }, idempotent(idempotencyKey))
+      .then((res) => res.data),
 
-  rejectAccessRequest: (id: number, reason: string) =>
-    client.post(`/requests/${id}/reject`, { rejection_reason: reason }).then((res) => res.data),
+  rejectAccessRequest: (id: number, reason: string, idempotencyKey: string) =>
+    client.post(`/requests/${id}/reject`, { rejection_reason: reason }, idempotent(idempotencyKey))
+      .then((res) => res.data),
 
   // Users
   getUserProfile: () =>